@@ -3,13 +3,21 @@ AI/Gemini Microservice for Job Chat
 Handles conversations about found jobs using Google Gemini API
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import google.generativeai as genai
 import os
+from contextlib import closing
 from datetime import datetime
 import json
+import threading
+import time
 from dotenv import load_dotenv
+from conversation_store import get_conversation_store
+from chat_sessions import ChatSessionCache, context_key
+from job_index import JOB_CONTEXT_TOKENS, JobIndexCache, estimate_tokens
+from response_cache import ResponseCache, response_key
+from history_summary import SUMMARY_PROMPT, HistoryCompactor, summary_prompt
 
 # Load environment variables from .env file
 load_dotenv()
@@ -34,8 +42,70 @@ else:
     except Exception as e:
         print(f"Error listing models: {str(e)}")
 
-# Store conversation history (in production, use a database)
-conversations = {}
+GEMINI_MODEL = "gemini-2.5-flash"
+DESCRIPTION_CHARS = 1000   # Description characters sent per retrieved job at most
+
+
+def create_model(system_prompt: str):
+    return genai.GenerativeModel(model_name=GEMINI_MODEL, system_instruction=system_prompt)
+
+
+_chat_sessions = None
+_chat_sessions_lock = threading.Lock()
+
+
+def get_chat_sessions() -> ChatSessionCache:
+    """Process-wide cache of Gemini models and chat sessions, created on first use"""
+    global _chat_sessions
+    with _chat_sessions_lock:
+        if _chat_sessions is None:
+            _chat_sessions = ChatSessionCache(create_model)
+        return _chat_sessions
+
+
+_job_indexes = None
+_job_indexes_lock = threading.Lock()
+
+
+def get_job_indexes() -> JobIndexCache:
+    """Process-wide BM25 indexes of each conversation's jobs, created on first use"""
+    global _job_indexes
+    with _job_indexes_lock:
+        if _job_indexes is None:
+            _job_indexes = JobIndexCache()
+        return _job_indexes
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide cache of answers to identical prompts, created on first use"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
+
+
+def summarize_history(summary: str, messages: list) -> str:
+    """Fold `messages` into the running `summary` of a conversation with Gemini"""
+    return create_model(SUMMARY_PROMPT).generate_content(summary_prompt(summary, messages)).text
+
+
+_history_compactor = None
+_history_compactor_lock = threading.Lock()
+
+
+def get_history_compactor() -> HistoryCompactor:
+    """Process-wide summarizer of long conversations, created on first use"""
+    global _history_compactor
+    with _history_compactor_lock:
+        if _history_compactor is None:
+            _history_compactor = HistoryCompactor(summarize_history)
+        return _history_compactor
+
 
 def create_system_prompt(jobs_context: str, search_history: str) -> str:
     """Create a system prompt with job context and search history"""
@@ -62,23 +132,36 @@ Guidelines:
 Always respond in a clear, concise manner and ask clarifying questions when needed."""
 
 
-def format_jobs_for_context(jobs: list) -> str:
-    """Format jobs into a readable context string"""
+def describe_job_set(jobs: list) -> str:
+    """Overview of the jobs for the system prompt; the jobs themselves are sent with each message"""
     if not jobs:
         return "No jobs available."
-    
+    return (f"The user's search found {len(jobs)} jobs, numbered 1 to {len(jobs)}. "
+            f"The jobs most relevant to each message are included with it, under their number.")
+
+
+def format_jobs_for_context(ranked_jobs: list, max_tokens: int = JOB_CONTEXT_TOKENS) -> str:
+    """Format (position, job) pairs, most relevant first, into as much context as fits in `max_tokens`"""
     formatted_jobs = []
-    for idx, job in enumerate(jobs[:10], 1):  # Limit to first 10 jobs
-        formatted_jobs.append(f"""
-Job {idx}:
+    used = 0
+    for position, job in ranked_jobs:
+        description = job.get('job_description') or 'N/A'
+        if len(description) > DESCRIPTION_CHARS:
+            description = description[:DESCRIPTION_CHARS] + "..."
+        formatted = f"""
+Job {position + 1}:
 - Title: {job.get('job_title', 'N/A')}
 - Company: {job.get('company_name', 'N/A')}
 - Location: {job.get('location', 'N/A')}
 - Posted: {job.get('posted', 'N/A')}
 - Benefits: {job.get('benefit', 'N/A')}
-- Description: {job.get('job_description', 'N/A')[:200]}...
-""")
-    return "\n".join(formatted_jobs)
+- Description: {description}
+"""
+        used += estimate_tokens(formatted)
+        if used > max_tokens and formatted_jobs:
+            break
+        formatted_jobs.append(formatted)
+    return "\n".join(formatted_jobs) if formatted_jobs else "No jobs available."
 
 
 def format_search_history(history: list) -> str:
@@ -102,6 +185,83 @@ Search {idx}:
     return "\n".join(formatted_history)
 
 
+def save_exchange(store, conversation_id: str, conversation: dict, user_message: str, assistant_message: str):
+    """
+    Append a user message and its answer to the conversation and store it,
+    then fold old turns into the summary in the background once the history
+    outgrows its token budget
+    """
+    conversation["history"].append({
+        "role": "user",
+        "content": user_message,
+        "timestamp": datetime.now().isoformat()
+    })
+    conversation["history"].append({
+        "role": "assistant",
+        "content": assistant_message,
+        "timestamp": datetime.now().isoformat()
+    })
+    store.save(conversation_id, conversation)
+    get_history_compactor().compact_later(store, conversation_id)
+
+
+def ndjson(event: dict) -> str:
+    return json.dumps(event) + "\n"
+
+
+def stream_chat(chunks, store, conversation_id: str, conversation: dict, user_message: str, cache_key: str,
+                cache: str = "miss", usage: dict = None):
+    """
+    Relay the answer's text chunks as NDJSON events, then store the
+    assembled answer, cache it under `cache_key` (handing it to the
+    identical requests waiting for it) if this request generated it, and
+    end with a "done" event carrying the timings and `usage`
+    """
+    started = time.perf_counter()
+    time_to_first_token = None
+    parts = []
+    try:
+        with closing(chunks):
+            for text in chunks:
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - started
+                parts.append(text)
+                yield ndjson({"type": "chunk", "text": text})
+    except GeneratorExit:
+        # The client went away; the requests waiting for this answer get an error instead of hanging
+        if cache == "miss":
+            get_response_cache().fail(cache_key, RuntimeError("The request generating this answer was cancelled"))
+        raise
+    except Exception as e:
+        if cache == "miss":
+            get_response_cache().fail(cache_key, e)
+        yield ndjson({
+            "type": "error",
+            "status": "error",
+            "error": f"Failed to generate response: {str(e)}",
+            "code": "GENERATION_ERROR"
+        })
+        return
+    generation_seconds = time.perf_counter() - started
+
+    assistant_message = "".join(parts)
+    if cache == "miss":
+        get_response_cache().finish(cache_key, assistant_message)
+    save_exchange(store, conversation_id, conversation, user_message, assistant_message)
+    yield ndjson({
+        "type": "done",
+        "status": "success",
+        "conversation_id": conversation_id,
+        "message": assistant_message,
+        "timestamp": datetime.now().isoformat(),
+        "history_length": len(conversation["history"]),
+        "time_to_first_token": time_to_first_token,
+        "generation_seconds": generation_seconds,
+        "cache": cache,
+        **(usage or {})
+    })
+
+
 @app.route("/health", methods=["GET"])
 def health():
     """Health check endpoint"""
@@ -109,6 +269,11 @@ def health():
         "status": "healthy",
         "service": "AI/Gemini Chat Service",
         "timestamp": datetime.now().isoformat(),
+        "conversations": get_conversation_store().stats(),
+        "chat_sessions": get_chat_sessions().to_dict(),
+        "job_indexes": get_job_indexes().to_dict(),
+        "response_cache": get_response_cache().to_dict(),
+        "history_summary": get_history_compactor().to_dict(),
     })
 
 
@@ -122,8 +287,14 @@ def chat():
         "conversation_id": "unique-id",
         "message": "user message",
         "jobs": [job objects],
-        "search_history": [search history items]
+        "search_history": [search history items],
+        "stream": false
     }
+
+    With "stream": true the answer is sent as newline-delimited JSON events
+    while it is generated: {"type": "chunk", "text": ...} for each chunk,
+    then {"type": "done", ...} with the full message, time_to_first_token
+    and generation_seconds, or {"type": "error", ...}.
     """
     if not GEMINI_API_KEY:
         return jsonify({
@@ -155,22 +326,22 @@ def chat():
                 "code": "EMPTY_MESSAGE"
             }), 400
 
-        # Initialize conversation if new
-        if conversation_id not in conversations:
-            conversations[conversation_id] = {
-                "history": [],
-                "created_at": datetime.now().isoformat(),
-            }
-
-        # Create or get chat session
+        # Load the conversation, or start a new one
+        store = get_conversation_store()
+        conversation = store.get(conversation_id) or {
+            "history": [],
+            "created_at": datetime.now().isoformat(),
+        }
+
+        # Reuse the model and chat session while the job set overview and search history stay the same
+        sessions = get_chat_sessions()
+        jobs_overview = describe_job_set(jobs)
+        key = context_key(GEMINI_MODEL, jobs_overview, search_history)
         try:
-            model = genai.GenerativeModel(
-                model_name="gemini-2.5-flash",
-                system_instruction=create_system_prompt(
-                    format_jobs_for_context(jobs),
-                    format_search_history(search_history)
-                )
-            )
+            model = sessions.model(key, lambda: create_system_prompt(
+                jobs_overview,
+                format_search_history(search_history)
+            ))
         except Exception as e:
             return jsonify({
                 "status": "error",
@@ -178,47 +349,56 @@ def chat():
                 "code": "MODEL_INIT_ERROR"
             }), 500
 
-        # Build chat history for context
-        chat_history = []
-        for msg in conversations[conversation_id]["history"]:
-            if msg["role"] == "user":
-                chat_history.append({
-                    "role": "user",
-                    "parts": [msg["content"]]
-                })
-            else:
-                chat_history.append({
-                    "role": "model",
-                    "parts": [msg["content"]]
-                })
-
         try:
-            # Start chat with history
-            chat_session = model.start_chat(history=chat_history)
-            
-            # Send user message
-            response = chat_session.send_message(user_message)
-            
-            assistant_message = response.text
-
-            # Store conversation
-            conversations[conversation_id]["history"].append({
-                "role": "user",
-                "content": user_message,
-                "timestamp": datetime.now().isoformat()
-            })
-            conversations[conversation_id]["history"].append({
-                "role": "assistant",
-                "content": assistant_message,
-                "timestamp": datetime.now().isoformat()
-            })
+            # Replay the summary in place of the turns it covers
+            session_history, history_tokens, tokens_saved = get_history_compactor().session_history(conversation)
+            usage = {"history_tokens": history_tokens, "tokens_saved": tokens_saved}
+            # A new summary means a new session history
+            session_key = context_key(key, conversation.get("summary"))
+
+            # Send the jobs most relevant to this message along with it
+            relevant_jobs = get_job_indexes().get(conversation_id, jobs).relevant_jobs(user_message) if jobs else []
+            prompt, history_message, jobs_context = user_message, None, ""
+            if relevant_jobs:
+                # The session keeps only the user's message, so the jobs are not resent with every later turn
+                jobs_context = format_jobs_for_context(relevant_jobs, JOB_CONTEXT_TOKENS)
+                prompt = f"Jobs relevant to this message:\n{jobs_context}\n\nMessage: {user_message}"
+                history_message = user_message
+
+            # The same question about the same jobs after the same history gets the same answer
+            cache = get_response_cache()
+            cache_key = response_key(key, jobs_context, session_history, user_message)
+
+            if data.get("stream"):
+                answer, source = cache.claim(cache_key)
+                if source == "hit":
+                    chunks = (text for text in [answer])
+                elif source == "coalesced":
+                    # Wait for the identical request being streamed and send its answer as one chunk
+                    chunks = (future.result() for future in [answer])
+                else:
+                    chunks = sessions.stream(conversation_id, session_key, model, session_history, prompt,
+                                             history_message=history_message)
+                return Response(
+                    stream_with_context(stream_chat(chunks, store, conversation_id, conversation, user_message,
+                                                    cache_key, source, usage)),
+                    mimetype="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}   # Don't let proxies buffer it
+                )
+
+            assistant_message, source = cache.get_or_create(cache_key, lambda: sessions.send(
+                conversation_id, session_key, model, session_history, prompt, history_message=history_message
+            ).text)
+            save_exchange(store, conversation_id, conversation, user_message, assistant_message)
 
             return jsonify({
                 "status": "success",
                 "conversation_id": conversation_id,
                 "message": assistant_message,
                 "timestamp": datetime.now().isoformat(),
-                "history_length": len(conversations[conversation_id]["history"])
+                "history_length": len(conversation["history"]),
+                "cache": source,
+                **usage
             }), 200
 
         except Exception as e:
@@ -245,7 +425,8 @@ def chat():
 @app.route("/conversation/<conversation_id>", methods=["GET"])
 def get_conversation(conversation_id):
     """Get conversation history"""
-    if conversation_id not in conversations:
+    conversation = get_conversation_store().get(conversation_id)
+    if conversation is None:
         return jsonify({
             "status": "error",
             "error": "Conversation not found",
@@ -255,16 +436,19 @@ def get_conversation(conversation_id):
     return jsonify({
         "status": "success",
         "conversation_id": conversation_id,
-        "created_at": conversations[conversation_id]["created_at"],
-        "history": conversations[conversation_id]["history"]
+        "created_at": conversation["created_at"],
+        "summary": conversation.get("summary"),
+        "summarized_upto": conversation.get("summarized_upto", 0),
+        "history": conversation["history"]
     }), 200
 
 
 @app.route("/conversation/<conversation_id>", methods=["DELETE"])
 def delete_conversation(conversation_id):
     """Delete conversation"""
-    if conversation_id in conversations:
-        del conversations[conversation_id]
+    get_chat_sessions().discard(conversation_id)
+    get_job_indexes().discard(conversation_id)
+    if get_conversation_store().delete(conversation_id):
         return jsonify({
             "status": "success",
             "message": "Conversation deleted"
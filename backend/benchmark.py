@@ -0,0 +1,342 @@
+"""
+Offline benchmarks for the LinkedIn scraper
+
+Runs against the recorded pages in fixtures/, no network needed. The
+browsers benchmark starts Chrome; pass --url to load real pages, which have
+the images, fonts and trackers the fast profile blocks.
+
+The scrape benchmark runs scrape_linkedin_jobs end to end against a local
+fixture_server.py with `--cards` postings (or the server at --base-url),
+once per engine, parser and detail worker count, each in a fresh process so
+peak memory is its own. The Selenium engine needs Chrome; the stand-in
+search page scrolls and shows a show-more button like the real one.
+
+The retrieval benchmark builds the chat service's BM25 job index over
+`--jobs` synthetic postings whose descriptions mix the recorded job pages'
+words with a Zipf-distributed vocabulary, then times an incremental update
+and queries.
+
+Usage:
+    python benchmark.py parsers [--cards 300] [--repeat 5]
+    python benchmark.py browsers [--pages 10] [--url URL]
+    python benchmark.py scrape [--engines http,selenium] [--parsers bs4,lxml] [--workers 1,3]
+                               [--cards 100] [--latency 0.05] [--base-url URL]
+    python benchmark.py retrieval [--jobs 10000] [--words 300] [--queries 1000]
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import itertools
+import logging
+import os
+import random
+import statistics
+import threading
+import time
+
+import parsers
+from driver_pool import driver_rss_mb
+from fixture_server import FIXTURES_DIR, FixtureServer, recorded_cards, synthetic_cards
+from job_index import JobIndex, tokenize
+from metrics import Timings
+
+try:
+    import psutil
+except ImportError:  # psutil is optional, peak memory then comes from getrusage
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def read_fixture(*path):
+    with open(os.path.join(FIXTURES_DIR, *path), encoding="utf-8") as f:
+        return f.read().replace("{{BASE_URL}}", "https://www.linkedin.com")
+
+
+def build_search_page(cards):
+    """A search result page with `cards` cards, repeating the recorded ones"""
+    page = read_fixture("search_results.html")
+    recorded = recorded_cards("https://www.linkedin.com")
+    start = page.index(recorded[0])
+    end = page.index(recorded[-1]) + len(recorded[-1])
+    return page[:start] + "".join(synthetic_cards(recorded, cards)) + page[end:]
+
+
+def best_of(repeat, func, *args):
+    """Fastest of `repeat` runs in seconds, and the last result"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_parsers(cards, repeat):
+    """Compare parser backends on a large search page and the recorded job pages"""
+    search_page = build_search_page(cards)
+    job_pages = [read_fixture("jobs", name) for name in sorted(os.listdir(os.path.join(FIXTURES_DIR, "jobs")))]
+
+    def parse_details(parser):
+        return [parser.parse_job_details(html) for html in job_pages]
+
+    print(f"Search page: {cards} cards, {len(search_page) / 1024:.0f} KB; {len(job_pages)} job pages")
+    print(f"{'parser':<8}{'cards (ms)':>12}{'per card (us)':>15}{'job pages (ms)':>16}")
+    results = {}
+    for name, parser in parsers.PARSERS.items():
+        cards_seconds, parsed_cards = best_of(repeat, parser.parse_job_cards, search_page)
+        details_seconds, parsed_details = best_of(repeat, parse_details, parser)
+        results[name] = (parsed_cards, parsed_details)
+        print(f"{name:<8}{cards_seconds * 1000:>12.1f}{cards_seconds / cards * 1e6:>15.1f}"
+              f"{details_seconds * 1000:>16.2f}")
+
+    reference = results.pop("bs4")
+    for name, result in results.items():
+        print(f"{name} output identical to bs4: {result == reference}")
+
+
+def bench_browsers(pages, url=None):
+    """Compare page-load time and browser memory of the Chrome profiles"""
+    import linkedin
+
+    server = None
+    if url is None:
+        server = FixtureServer().start()
+        url = f"{server.base_url}/jobs/search/"
+    print(f"Loading {url} {pages} times per profile")
+    print(f"{'profile':<10}{'startup (s)':>12}{'p50 load (s)':>14}{'max load (s)':>14}{'RSS (MB)':>10}")
+    try:
+        for profile in linkedin.BROWSER_PROFILES:
+            started = time.perf_counter()
+            driver = linkedin.setup_driver(profile)
+            startup = time.perf_counter() - started
+            loads = []
+            try:
+                for _ in range(pages):
+                    started = time.perf_counter()
+                    driver.get(url)
+                    loads.append(time.perf_counter() - started)
+                rss = driver_rss_mb(driver)
+            finally:
+                driver.quit()
+            rss = f"{rss:.0f}" if rss is not None else "n/a"
+            print(f"{profile:<10}{startup:>12.2f}{statistics.median(loads):>14.3f}{max(loads):>14.3f}{rss:>10}")
+    finally:
+        if server is not None:
+            server.stop()
+
+
+class PageTimings(Timings):
+    """Timings that also keep every page_load duration, for percentiles"""
+
+    def __init__(self):
+        super().__init__()
+        self.page_loads = []
+
+    def add(self, stage, seconds):
+        super().add(stage, seconds)
+        if stage == "page_load":
+            self.page_loads.append(seconds)
+
+
+class PeakRss:
+    """
+    Peak resident memory of this process and its children (browsers) in MB,
+    sampled with psutil when installed, otherwise this process's getrusage peak
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        process = psutil.Process()
+        total = 0
+        for proc in [process] + process.children(recursive=True):
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                pass
+        self.peak = max(self.peak, total / (1024 * 1024))
+
+    def __enter__(self):
+        if psutil is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self.sample()
+        elif resource is not None:
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+        else:
+            self.peak = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of `values` (0 for none)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def run_scrape_config(engine, parser, detail_workers, base_url, countries=1):
+    """
+    Scrape `countries` searches from the site at `base_url` with one engine,
+    parser and detail worker count; returns jobs/s, page latency and peak RSS
+    """
+    import linkedin
+
+    logging.getLogger().setLevel(logging.WARNING)
+    linkedin.LINKEDIN_BASE_URL = base_url
+    linkedin.DETAIL_PAUSE = 0   # Stand-in pages are complete once loaded
+    scraper = linkedin.create_engine(engine, parser=parser)
+    scraper.timings = PageTimings()
+    with PeakRss() as rss:
+        started = time.perf_counter()
+        jobs = linkedin.scrape_linkedin_jobs("developer", [f"Country {n}" for n in range(countries)], [], [], "any",
+                                             detail_workers=detail_workers, engine=scraper)
+        seconds = time.perf_counter() - started
+    page_loads = scraper.timings.page_loads
+    return {
+        "engine": engine, "parser": parser, "detail_workers": detail_workers,
+        "jobs": len(jobs), "seconds": seconds, "jobs_per_second": len(jobs) / seconds if seconds else 0.0,
+        "pages": len(page_loads), "p50_page": percentile(page_loads, 0.5), "p95_page": percentile(page_loads, 0.95),
+        "peak_rss_mb": rss.peak,
+    }
+
+
+def bench_scrape(engines, parser_names, workers, cards, latency, countries, base_url=None):
+    """End-to-end scrape throughput for every engine, parser and worker count"""
+    server = None
+    if base_url is None:
+        server = FixtureServer(latency=latency, cards=cards, scroll_page_size=25).start()
+        base_url = server.base_url
+        print(f"Fixture server with {cards} postings, {latency * 1000:.0f} ms latency per page")
+    print(f"{'engine':<10}{'parser':<8}{'workers':>8}{'jobs':>6}{'jobs/s':>9}{'pages':>7}"
+          f"{'p50 page (ms)':>15}{'p95 page (ms)':>15}{'peak RSS (MB)':>15}")
+    try:
+        for engine, parser, detail_workers in itertools.product(engines, parser_names, workers):
+            # A fresh process per run, so imports and caches of earlier runs don't count towards its memory
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result = executor.submit(run_scrape_config, engine, parser, detail_workers, base_url,
+                                         countries).result()
+            rss = f"{result['peak_rss_mb']:.0f}" if result["peak_rss_mb"] is not None else "n/a"
+            print(f"{engine:<10}{parser:<8}{detail_workers:>8}{result['jobs']:>6}{result['jobs_per_second']:>9.1f}"
+                  f"{result['pages']:>7}{result['p50_page'] * 1000:>15.1f}{result['p95_page'] * 1000:>15.1f}{rss:>15}")
+    finally:
+        if server is not None:
+            server.stop()
+
+
+def synthetic_jobs(count, words, vocabulary=20000, seed=0):
+    """`count` job dicts with `words`-word descriptions built from the recorded job pages"""
+    rng = random.Random(seed)
+    recorded = []
+    for name in sorted(os.listdir(os.path.join(FIXTURES_DIR, "jobs"))):
+        card, _ = parsers.get_parser().parse_job_details(read_fixture("jobs", name))
+        recorded.append((name.rsplit("-", 1)[0].replace("-", " ").title(), card))
+    recorded_words = sorted({token for _, text in recorded for token in tokenize(text)})
+    # Word frequencies in text roughly follow Zipf's law
+    terms = recorded_words + [f"term{n}" for n in range(vocabulary)]
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, len(terms) + 1)))
+    jobs = []
+    for n in range(count):
+        title, description = recorded[n % len(recorded)]
+        filler = " ".join(rng.choices(terms, cum_weights=weights, k=words))
+        jobs.append({"job_url": f"https://www.linkedin.com/jobs/view/{4000000000 + n}", "job_title": title,
+                     "company_name": f"Company {n % 500}", "location": f"City {n % 50}",
+                     "job_description": f"{description}\n{filler}"})
+    return jobs, terms
+
+
+def bench_retrieval(count, words, queries, seed=0):
+    """Build time, incremental update time and query latency of the chat service's job index"""
+    rng = random.Random(seed)
+    jobs, terms = synthetic_jobs(count, words, seed=seed)
+    print(f"{count} jobs, {words} description words each")
+
+    index = JobIndex()
+    started = time.perf_counter()
+    index.update(jobs)
+    build = time.perf_counter() - started
+    print(f"build: {build * 1000:.0f} ms, {len(index.vocabulary)} terms, {len(index.postings)} postings")
+
+    changed = max(1, count // 100)
+    fresh, _ = synthetic_jobs(changed, words, seed=seed + 1)
+    for job in fresh:
+        job["job_url"] += "-new"
+    started = time.perf_counter()
+    index.update(jobs[changed:] + fresh)
+    print(f"update replacing {changed} jobs: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    latencies = []
+    for _ in range(queries):
+        query = " ".join(rng.choices(terms[:2000], k=rng.randint(2, 8)))
+        started = time.perf_counter()
+        index.relevant_jobs(query)
+        latencies.append(time.perf_counter() - started)
+    print(f"{queries} queries: p50 {percentile(latencies, 0.5) * 1000:.2f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.2f} ms, max {max(latencies) * 1000:.2f} ms")
+
+
+def split_list(value, cast=str):
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    parsers_cmd = commands.add_parser("parsers", help="compare HTML parser backends")
+    parsers_cmd.add_argument("--cards", type=int, default=300)
+    parsers_cmd.add_argument("--repeat", type=int, default=5)
+
+    browsers_cmd = commands.add_parser("browsers", help="compare Chrome profiles (needs Chrome)")
+    browsers_cmd.add_argument("--pages", type=int, default=10)
+    browsers_cmd.add_argument("--url", help="page to load instead of the local fixture search page")
+
+    scrape_cmd = commands.add_parser("scrape", help="end-to-end scrape throughput, latency and memory")
+    scrape_cmd.add_argument("--engines", type=split_list, default=["http"], help="comma-separated engines")
+    scrape_cmd.add_argument("--parsers", type=split_list, default=list(parsers.PARSERS),
+                            help="comma-separated parser backends")
+    scrape_cmd.add_argument("--workers", type=lambda value: split_list(value, int), default=[1, 3],
+                            help="comma-separated detail worker counts")
+    scrape_cmd.add_argument("--cards", type=int, default=100, help="postings on the fixture server")
+    scrape_cmd.add_argument("--latency", type=float, default=0.05, help="seconds the fixture server adds per page")
+    scrape_cmd.add_argument("--countries", type=int, default=1, help="searches per scrape")
+    scrape_cmd.add_argument("--base-url", help="scrape this server instead of starting a fixture server")
+
+    retrieval_cmd = commands.add_parser("retrieval", help="chat job index build time and query latency")
+    retrieval_cmd.add_argument("--jobs", type=int, default=10000)
+    retrieval_cmd.add_argument("--words", type=int, default=300, help="description words per job")
+    retrieval_cmd.add_argument("--queries", type=int, default=1000)
+
+    args = arg_parser.parse_args()
+    if args.command == "parsers":
+        bench_parsers(args.cards, args.repeat)
+    elif args.command == "browsers":
+        bench_browsers(args.pages, args.url)
+    elif args.command == "scrape":
+        bench_scrape(args.engines, args.parsers, args.workers, args.cards, args.latency, args.countries,
+                     args.base_url)
+    elif args.command == "retrieval":
+        bench_retrieval(args.jobs, args.words, args.queries)
+
+
+if __name__ == "__main__":
+    main()
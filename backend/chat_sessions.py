@@ -0,0 +1,160 @@
+"""
+Reuse of Gemini models and chat sessions between /chat calls
+
+Building a GenerativeModel renders the system prompt from the jobs and
+search history, and starting a chat replays the whole stored history, so
+doing both on every message makes each turn slower and costlier than the
+last. ChatSessionCache keeps:
+
+- models by context key (a hash of the jobs and search history the system
+  prompt is built from), shared by conversations with the same context;
+- one live chat session per conversation, reused while its context key is
+  unchanged and it has seen exactly the stored history. Otherwise (new
+  jobs, another worker process answered in between, or the store trimmed
+  the history) the session is started again from the stored history.
+
+Both are evicted least recently used first. Sessions live in the process;
+the conversation store remains the source of truth.
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+
+MAX_CHAT_SESSIONS = 200   # Live chat sessions kept, one per conversation
+MAX_MODELS = 50           # Models kept, one per distinct job/search history context
+
+
+def context_key(*parts):
+    """Stable hash of the JSON-serializable values a system prompt is built from"""
+    data = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def gemini_history(history):
+    """Stored messages in the shape ChatSession expects"""
+    return [{"role": "user" if message["role"] == "user" else "model", "parts": [message["content"]]}
+            for message in history]
+
+
+def chunk_text(chunk):
+    """Text of a streamed response chunk; chunks carrying only a finish reason have none"""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+
+class CachedSession:
+    def __init__(self, key, chat, messages):
+        self.key = key
+        self.chat = chat
+        self.messages = messages   # Stored messages this session has seen
+        self.lock = threading.Lock()
+
+
+class ChatSessionCache:
+    """Gemini models by context key and chat sessions by conversation, built with `create_model(system_prompt)`"""
+
+    def __init__(self, create_model, max_sessions=MAX_CHAT_SESSIONS, max_models=MAX_MODELS):
+        self.create_model = create_model
+        self.max_sessions = max_sessions
+        self.max_models = max_models
+        self.models = OrderedDict()
+        self.sessions = OrderedDict()
+        self.stats = {"models_built": 0, "sessions_started": 0, "sessions_reused": 0}
+        self._lock = threading.Lock()
+
+    def model(self, key, system_prompt):
+        """The model for a context key; `system_prompt()` is only called to build a new one"""
+        with self._lock:
+            if key in self.models:
+                self.models.move_to_end(key)
+                return self.models[key]
+        model = self.create_model(system_prompt())
+        with self._lock:
+            self.models[key] = model
+            self.stats["models_built"] += 1
+            while len(self.models) > self.max_models:
+                self.models.popitem(last=False)
+        return model
+
+    def send(self, conversation_id, key, model, history, message, history_message=None, **kwargs):
+        """
+        Send `message` on the conversation's chat session, starting one from
+        the stored `history` when the cached session cannot be reused.
+        `history_message`, if given, replaces `message` in the session's
+        history afterwards, so one-off context sent along with it is not
+        resent with every later turn. Returns the model's response; a failed
+        send drops the session.
+        """
+        cached = self._session(conversation_id, key)
+        with cached.lock:
+            self._prepare(cached, model, history)
+            try:
+                response = cached.chat.send_message(message, **kwargs)
+            except Exception:
+                cached.chat = None
+                raise
+            self._sent(cached, history_message)
+            return response
+
+    def stream(self, conversation_id, key, model, history, message, history_message=None, **kwargs):
+        """
+        Like send(), but yield the text of the response's chunks as Gemini
+        streams them. The session is locked until the stream is exhausted; a
+        stream that fails or is abandoned part way drops the session.
+        """
+        cached = self._session(conversation_id, key)
+        with cached.lock:
+            self._prepare(cached, model, history)
+            try:
+                for chunk in cached.chat.send_message(message, stream=True, **kwargs):
+                    text = chunk_text(chunk)
+                    if text:
+                        yield text
+            except BaseException:   # Including GeneratorExit when the client goes away
+                cached.chat = None
+                raise
+            self._sent(cached, history_message)
+
+    def _session(self, conversation_id, key):
+        with self._lock:
+            cached = self.sessions.get(conversation_id)
+            if cached is None or cached.key != key:
+                cached = CachedSession(key, None, 0)
+                self.sessions[conversation_id] = cached
+            self.sessions.move_to_end(conversation_id)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+            return cached
+
+    def _prepare(self, cached, model, history):
+        """Start the session from `history` unless it has seen exactly that; call with cached.lock held"""
+        if cached.chat is None or cached.messages != len(history):
+            cached.chat = model.start_chat(history=gemini_history(history))
+            cached.messages = len(history)
+            self._count("sessions_started")
+        else:
+            self._count("sessions_reused")
+
+    @staticmethod
+    def _sent(cached, history_message):
+        """Record a completed exchange; call with cached.lock held"""
+        if history_message is not None:
+            *earlier, _, answer = cached.chat.history
+            cached.chat.history = earlier + [{"role": "user", "parts": [history_message]}, answer]
+        cached.messages += 2
+
+    def discard(self, conversation_id):
+        with self._lock:
+            self.sessions.pop(conversation_id, None)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def to_dict(self):
+        with self._lock:
+            return dict(self.stats, models=len(self.models), sessions=len(self.sessions))
@@ -0,0 +1,66 @@
+"""
+Compression of large JSON responses
+
+Scrape results are mostly repetitive description text, which compresses
+well. JSON bodies above COMPRESS_MIN_SIZE are sent with zstd when the client
+accepts it and the `zstandard` package is installed, otherwise with gzip.
+Streamed responses (NDJSON) are left alone so lines still arrive one by one.
+"""
+
+import gzip
+
+from flask import request
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, gzip is always available
+    zstandard = None
+
+COMPRESS_MIN_SIZE = 1024   # Bytes below which a body is sent as is
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+COMPRESSIBLE_MIMETYPES = ("application/json",)
+
+
+def accepted_encodings(header):
+    """Encodings listed in an Accept-Encoding header, without those refused with q=0"""
+    encodings = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q=") and quality[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+def choose_encoding(header):
+    """Best encoding this server can produce for an Accept-Encoding header, or None"""
+    encodings = accepted_encodings(header or "")
+    if zstandard is not None and "zstd" in encodings:
+        return "zstd"
+    if "gzip" in encodings:
+        return "gzip"
+    return None
+
+
+def compress(data, encoding):
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def compress_response(response):
+    """Flask after_request hook compressing JSON bodies for clients that accept it"""
+    if response.direct_passthrough or response.is_streamed or "Content-Encoding" in response.headers \
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+    data = response.get_data()
+    if encoding is None or len(data) < COMPRESS_MIN_SIZE:
+        return response
+    response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
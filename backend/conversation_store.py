@@ -0,0 +1,193 @@
+"""
+Conversation storage for the AI chat service
+
+Conversations are dicts with at least a "history" list of messages and a
+"created_at" timestamp. Two stores are available, picked with the
+CONVERSATION_STORE environment variable:
+
+- "memory" (default): an LRU dict in the process. Conversations expire
+  CONVERSATION_TTL seconds after their last use and the least recently
+  used ones are evicted above MAX_CONVERSATIONS.
+- "sqlite": a SQLite database at CONVERSATION_DB_PATH with the same limits,
+  which survives restarts and is shared by all worker processes (e.g.
+  several gunicorn workers) on the same machine.
+
+Both keep only the last MAX_TURNS turns (a user message and its answer) of
+each conversation.
+"""
+
+from collections import OrderedDict
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CONVERSATION_STORE = os.getenv("CONVERSATION_STORE", "memory")
+CONVERSATION_DB_PATH = os.getenv("CONVERSATION_DB_PATH",
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), "conversations.db"))
+CONVERSATION_STORES = ["memory", "sqlite"]
+MAX_CONVERSATIONS = 1000        # Conversations kept before the least recently used is evicted
+CONVERSATION_TTL = 24 * 3600    # Seconds a conversation is kept after its last message
+MAX_TURNS = 50                  # User/assistant exchanges kept per conversation
+
+
+def trim_history(conversation, max_turns):
+    """Drop the oldest messages beyond `max_turns` exchanges (two messages each), moving `summarized_upto` along"""
+    history = conversation.get("history", [])
+    if max_turns and len(history) > 2 * max_turns:
+        dropped = len(history) - 2 * max_turns
+        conversation["history"] = history[dropped:]
+        if conversation.get("summarized_upto"):
+            conversation["summarized_upto"] = max(conversation["summarized_upto"] - dropped, 0)
+    return conversation
+
+
+class MemoryConversationStore:
+    """Conversations in an LRU dict, expiring `ttl` seconds after their last use"""
+
+    backend = "memory"
+
+    def __init__(self, max_conversations=MAX_CONVERSATIONS, ttl=CONVERSATION_TTL, max_turns=MAX_TURNS,
+                 clock=time.time):
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.clock = clock
+        self.conversations = OrderedDict()   # id -> (serialized conversation, last used)
+        self.bytes = 0
+        self.evicted = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id):
+        """A copy of the conversation, or None if it is unknown or expired"""
+        with self._lock:
+            entry = self.conversations.get(conversation_id)
+            if entry is None:
+                return None
+            data, last_used = entry
+            if self.clock() - last_used > self.ttl:
+                self._remove(conversation_id)
+                self.expired += 1
+                return None
+            self.conversations[conversation_id] = (data, self.clock())
+            self.conversations.move_to_end(conversation_id)
+            return json.loads(data)
+
+    def save(self, conversation_id, conversation):
+        data = json.dumps(trim_history(conversation, self.max_turns))
+        with self._lock:
+            if conversation_id in self.conversations:
+                self._remove(conversation_id)
+            self.conversations[conversation_id] = (data, self.clock())
+            self.bytes += len(data.encode("utf-8"))
+            while len(self.conversations) > self.max_conversations:
+                self._remove(next(iter(self.conversations)))
+                self.evicted += 1
+
+    def delete(self, conversation_id):
+        with self._lock:
+            if conversation_id not in self.conversations:
+                return False
+            self._remove(conversation_id)
+            return True
+
+    def _remove(self, conversation_id):
+        data, _ = self.conversations.pop(conversation_id)
+        self.bytes -= len(data.encode("utf-8"))
+
+    def stats(self):
+        with self._lock:
+            return {"backend": self.backend, "conversations": len(self.conversations), "bytes": self.bytes,
+                    "evicted": self.evicted, "expired": self.expired}
+
+
+class SqliteConversationStore:
+    """Conversations in SQLite, shared by every process using the same database file"""
+
+    backend = "sqlite"
+
+    def __init__(self, path=CONVERSATION_DB_PATH, max_conversations=MAX_CONVERSATIONS, ttl=CONVERSATION_TTL,
+                 max_turns=MAX_TURNS, clock=time.time):
+        self.path = path
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.clock = clock
+        self.evicted = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+        # Other processes may be writing; wait for their locks instead of failing
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS conversations (
+                    id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_last_used ON conversations (last_used)")
+
+    def get(self, conversation_id):
+        now = self.clock()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT data, last_used FROM conversations WHERE id = ?",
+                                     (conversation_id,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+                self.expired += 1
+                return None
+            self._conn.execute("UPDATE conversations SET last_used = ? WHERE id = ?", (now, conversation_id))
+        return json.loads(row[0])
+
+    def save(self, conversation_id, conversation):
+        data = json.dumps(trim_history(conversation, self.max_turns))
+        now = self.clock()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO conversations VALUES (?, ?, ?)", (conversation_id, data, now))
+            self.expired += self._conn.execute("DELETE FROM conversations WHERE last_used < ?",
+                                               (now - self.ttl,)).rowcount
+            self.evicted += self._conn.execute("""
+                DELETE FROM conversations WHERE id IN (
+                    SELECT id FROM conversations ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_conversations,)).rowcount
+
+    def delete(self, conversation_id):
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,)).rowcount > 0
+
+    def stats(self):
+        """Counts across all processes; evicted/expired only count this process's removals"""
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(data AS BLOB))), 0) FROM conversations").fetchone()
+        return {"backend": self.backend, "conversations": count, "bytes": size,
+                "evicted": self.evicted, "expired": self.expired}
+
+    def close(self):
+        self._conn.close()
+
+
+def create_conversation_store(backend=CONVERSATION_STORE):
+    if backend not in CONVERSATION_STORES:
+        raise ValueError(f"unknown conversation store: {backend}")
+    return SqliteConversationStore() if backend == "sqlite" else MemoryConversationStore()
+
+
+_conversation_store = None
+_conversation_store_lock = threading.Lock()
+
+
+def get_conversation_store():
+    """Process-wide conversation store chosen by CONVERSATION_STORE, created on first use"""
+    global _conversation_store
+    with _conversation_store_lock:
+        if _conversation_store is None:
+            _conversation_store = create_conversation_store()
+        return _conversation_store
@@ -0,0 +1,147 @@
+"""
+Deduplication of job cards across countries and runs
+
+The same posting (often a remote one) shows up under several countries.
+Postings are keyed by the LinkedIn job ID in job_url, or by a
+title + company + location fingerprint when the URL carries no ID. Within a
+run only the first occurrence is kept and fetched, and it collects every
+country it matched. Optionally, postings returned by earlier runs (keys
+stored in SQLite) are not fetched again: they are still returned, with the
+details a job store kept from the earlier run. Keys not seen for
+JOB_STORE_RETENTION_DAYS are forgotten, like the runs whose details they
+point at.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+
+from job_cache import CACHE_DB_PATH, job_id_from_url
+from job_store import JOB_STORE_RETENTION_DAYS
+
+
+def fingerprint(card):
+    """Stable hash of a card's normalized title, company and location"""
+    parts = [" ".join((card.get(field) or "").lower().split())
+             for field in ("job_title", "company_name", "location")]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def dedup_key(card):
+    """Key of the posting behind a card: its job ID, or the fingerprint"""
+    job_id = job_id_from_url(card.get("job_url"))
+    return f"id:{job_id}" if job_id else f"fp:{fingerprint(card)}"
+
+
+class SeenJobsStore:
+    """Posting keys returned by earlier runs within the last `retention_days`"""
+
+    def __init__(self, path=CACHE_DB_PATH, retention_days=JOB_STORE_RETENTION_DAYS):
+        self.path = path
+        self.ttl = retention_days * 24 * 3600
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS seen_jobs (
+                    key TEXT PRIMARY KEY,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_jobs_last_seen ON seen_jobs (last_seen)")
+
+    def contains(self, key):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM seen_jobs WHERE key = ? AND last_seen >= ?",
+                                      (key, time.time() - self.ttl)).fetchone() is not None
+
+    def add(self, keys):
+        """Record `keys` as seen now and forget those not seen within the retention period"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT INTO seen_jobs VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET last_seen = excluded.last_seen
+            """, [(key, now, now) for key in keys])
+            self._conn.execute("DELETE FROM seen_jobs WHERE last_seen < ?", (now - self.ttl,))
+
+    def close(self):
+        self._conn.close()
+
+
+class DedupIndex:
+    """
+    First occurrence of every posting in a run and all the countries it
+    matched. With a `seen_store`, postings returned by earlier runs reuse the
+    details `job_store` (a JobStore) kept for them instead of being fetched.
+    """
+
+    def __init__(self, seen_store=None, job_store=None):
+        self.seen_store = seen_store
+        self.job_store = job_store
+        self.first = {}
+        self.countries = {}
+        self.seen_before = set()   # Positions of postings returned by an earlier run
+        self.stats = {"unique": 0, "duplicates": 0, "seen_before": 0, "reused": 0}
+        self._lock = threading.Lock()
+
+    def add(self, card, country, position):
+        """
+        Register a card found under `country`. Returns True when this is the
+        first occurrence of the posting in the run. A duplicate only adds its
+        country to the first occurrence, which is identified by `position`.
+        """
+        key = dedup_key(card)
+        with self._lock:
+            if key in self.first:
+                countries = self.countries[self.first[key]]
+                if country not in countries:
+                    countries.append(country)
+                self.stats["duplicates"] += 1
+                return False
+            self.first[key] = position
+            self.countries[position] = [country]
+            self.stats["unique"] += 1
+        if self.seen_store is not None and self.seen_store.contains(key):
+            with self._lock:
+                self.seen_before.add(position)
+                self.stats["seen_before"] += 1
+        return True
+
+    def known_details(self, position, job_url):
+        """
+        Stored (job_description, company_description) of a posting an earlier
+        run returned, or None when it is new or its details were not kept
+        """
+        with self._lock:
+            if position not in self.seen_before:
+                return None
+        details = self.job_store.job_details(job_url) if self.job_store is not None else None
+        if details is not None:
+            with self._lock:
+                self.stats["reused"] += 1
+        return details
+
+    def countries_for(self, position):
+        with self._lock:
+            return list(self.countries.get(position, []))
+
+    def commit(self):
+        """Remember this run's postings for later runs"""
+        if self.seen_store is not None:
+            self.seen_store.add(list(self.first))
+
+
+_seen_jobs_store = None
+_seen_jobs_lock = threading.Lock()
+
+
+def get_seen_jobs_store():
+    """Process-wide SeenJobsStore, opened on first use"""
+    global _seen_jobs_store
+    with _seen_jobs_lock:
+        if _seen_jobs_store is None:
+            _seen_jobs_store = SeenJobsStore()
+        return _seen_jobs_store
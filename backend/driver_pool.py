@@ -0,0 +1,206 @@
+"""
+Warm pool of Chrome drivers shared by /scrape requests
+
+Starting Chrome costs a few seconds per driver, so drivers are started once
+and checked out and back in by the search and detail workers. Between uses
+a driver's cookies (of every domain) and the storage of every origin it
+loaded are cleared over CDP, and it is parked on about:blank. A driver is
+quit and replaced after DRIVER_MAX_PAGES page loads, or when its browser
+processes use more than DRIVER_MAX_RSS_MB (checked with psutil when it is
+installed). At most `size` drivers exist at once, whatever their kind (the
+browser profile they were started with); a checkout that cannot be served
+within its timeout raises PoolExhausted.
+"""
+
+from collections import Counter
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+from metrics import observe_stage
+
+try:
+    import psutil
+except ImportError:  # psutil is optional, only the memory check is skipped
+    psutil = None
+
+DRIVER_POOL_SIZE = 6            # Drivers alive at the same time across all requests
+DRIVER_WARM = 2                 # Drivers started ahead of the first request
+DRIVER_MAX_PAGES = 200          # Page loads before a driver is replaced
+DRIVER_MAX_RSS_MB = 1500        # Browser memory (chromedriver and Chrome processes) before a driver is replaced
+DRIVER_CHECKOUT_TIMEOUT = 120   # Seconds a worker waits for a free driver
+
+
+class PoolExhausted(Exception):
+    """No driver became free within the checkout timeout"""
+
+
+def driver_rss_mb(driver):
+    """Resident memory of a driver's chromedriver process and its children, or None"""
+    service = getattr(driver, "service", None)
+    process = getattr(service, "process", None)
+    if psutil is None or process is None:
+        return None
+    try:
+        root = psutil.Process(process.pid)
+        return sum(p.memory_info().rss for p in [root] + root.children(recursive=True)) / 2 ** 20
+    except psutil.Error:
+        return None
+
+
+def reset_driver(driver, origins):
+    """Clear all cookies and the storage of `origins`, then park the driver on about:blank"""
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    for origin in sorted(origins):
+        driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+    driver.get("about:blank")
+
+
+class DriverPool:
+    """
+    Size-bounded pool of reusable drivers created by `factory`.
+
+    Drivers of different kinds share the one size limit: a checkout of
+    `kind` takes an idle driver of that kind, starts one with
+    factory(kind) if there is room, or else replaces an idle driver of
+    another kind. Without a kind factory() is called with no arguments.
+    """
+
+    def __init__(self, factory, size=DRIVER_POOL_SIZE, max_pages=DRIVER_MAX_PAGES,
+                 max_rss_mb=DRIVER_MAX_RSS_MB, checkout_timeout=DRIVER_CHECKOUT_TIMEOUT):
+        self.factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.checkout_timeout = checkout_timeout
+        self.idle = []
+        self.pages = {}
+        self.origins = {}   # id(driver) -> origins loaded since its last reset
+        self.kinds = {}
+        self.in_use = 0
+        self.stats = {"created": 0, "reused": 0, "recycled": 0, "rejected": 0}
+        self._cond = threading.Condition()
+
+    @property
+    def alive(self):
+        return len(self.idle) + self.in_use
+
+    def warm(self, count=DRIVER_WARM, kind=None):
+        """Start drivers of `kind` until `count` are idle (bounded by the pool size)"""
+        while True:
+            with self._cond:
+                if len(self.idle) >= count or self.alive >= self.size:
+                    return self
+                self.in_use += 1
+            try:
+                driver = self._create(kind)
+            except Exception:
+                self._release()
+                raise
+            self.checkin(driver)
+
+    def is_full(self):
+        """True when every driver is checked out and no new one may be started"""
+        with self._cond:
+            return not self.idle and self.alive >= self.size
+
+    def checkout(self, timeout=None, kind=None):
+        """
+        Take an idle driver of `kind`, start a new one if there is room (in
+        place of an idle driver of another kind if need be), or wait for one
+        """
+        timeout = self.checkout_timeout if timeout is None else timeout
+        replaced = None
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.idle or self.alive < self.size, timeout):
+                self.stats["rejected"] += 1
+                raise PoolExhausted(f"All {self.size} browsers are busy")
+            self.in_use += 1
+            same_kind = [driver for driver in self.idle if self.kinds.get(id(driver)) == kind]
+            if same_kind:
+                self.idle.remove(same_kind[-1])
+                self.stats["reused"] += 1
+                return same_kind[-1]
+            if self.alive > self.size:
+                replaced = self.idle.pop(0)
+                self.stats["recycled"] += 1
+        if replaced is not None:
+            self._quit(replaced)
+        try:
+            return self._create(kind)
+        except Exception:
+            self._release()
+            raise
+
+    def note_page(self, driver, url=None):
+        """Count a page load for the recycling limit and remember its origin for the reset"""
+        with self._cond:
+            self.pages[id(driver)] = self.pages.get(id(driver), 0) + 1
+            if url:
+                parts = urlsplit(url)
+                self.origins.setdefault(id(driver), set()).add(f"{parts.scheme}://{parts.netloc}")
+
+    def checkin(self, driver):
+        """Reset a driver and make it available again, or replace it if it is worn out"""
+        with self._cond:
+            pages = self.pages.get(id(driver), 0)
+            origins = self.origins.pop(id(driver), set())
+        rss = driver_rss_mb(driver)
+        worn = pages >= self.max_pages or (rss is not None and rss > self.max_rss_mb)
+        if not worn:
+            try:
+                reset_driver(driver, origins)
+            except Exception as e:
+                logging.warning(f"Could not reset browser, replacing it: {e}")
+                worn = True
+        if worn:
+            self._quit(driver)
+            with self._cond:
+                self.stats["recycled"] += 1
+            self._release()
+            return
+        with self._cond:
+            self.in_use -= 1
+            self.idle.append(driver)
+            self._cond.notify()
+
+    def close(self):
+        """Quit every idle driver; checked-out drivers are quit on checkin"""
+        with self._cond:
+            idle, self.idle = self.idle, []
+            self.max_pages = 0
+        for driver in idle:
+            self._quit(driver)
+
+    def to_dict(self):
+        with self._cond:
+            kinds = Counter("default" if kind is None else kind for kind in self.kinds.values())
+            return dict(self.stats, size=self.size, idle=len(self.idle), in_use=self.in_use, kinds=dict(kinds))
+
+    def _create(self, kind=None):
+        started = time.perf_counter()
+        driver = self.factory() if kind is None else self.factory(kind)
+        elapsed = time.perf_counter() - started
+        observe_stage("driver_startup", elapsed)
+        logging.info(f"Started pooled browser in {elapsed:.1f}s")
+        with self._cond:
+            self.stats["created"] += 1
+            self.pages[id(driver)] = 0
+            self.kinds[id(driver)] = kind
+        return driver
+
+    def _quit(self, driver):
+        with self._cond:
+            self.pages.pop(id(driver), None)
+            self.origins.pop(id(driver), None)
+            self.kinds.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.warning(f"Error closing browser: {e}")
+
+    def _release(self):
+        with self._cond:
+            self.in_use -= 1
+            self._cond.notify()
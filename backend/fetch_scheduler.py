@@ -0,0 +1,239 @@
+"""
+Rate limiting, retries and circuit breaking for page fetches
+
+Every page a scrape loads (search and job detail pages, in Chrome or over
+HTTP) goes through one process-wide FetchScheduler:
+
+- a token bucket per host allows HOST_RATE requests per second with bursts
+  of up to HOST_BURST, shared by all workers of all requests;
+- timeouts, dropped connections and throttling responses (HTTP 429 and
+  LinkedIn's 999) are retried up to FETCH_RETRIES times, after an
+  exponential backoff with full jitter or the server's Retry-After;
+- after BREAKER_THRESHOLD such failures in a row the host's circuit opens
+  and its fetches fail at once for BREAKER_COOLDOWN seconds, after which a
+  single trial fetch decides whether it closes again.
+
+A fetch that still fails raises FetchError, so callers can report the page
+instead of silently returning it empty.
+"""
+
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from selenium.common.exceptions import TimeoutException as BrowserTimeout
+
+HOST_RATE = 2.0          # Requests per second per host, on average
+HOST_BURST = 4           # Requests a host may get at once after being idle
+FETCH_RETRIES = 3        # Retries after the first attempt
+RETRY_BASE_DELAY = 1.0   # Backoff ceiling of the first retry, doubled for each next one
+RETRY_MAX_DELAY = 30.0
+BREAKER_THRESHOLD = 5    # Throttled or timed-out fetches in a row that open a host's circuit
+BREAKER_COOLDOWN = 60    # Seconds an open circuit rejects fetches
+RETRY_STATUSES = (429, 999)   # 999 is LinkedIn's "request denied"
+
+
+class FetchError(Exception):
+    """A page could not be loaded, after `attempts` tries"""
+
+    def __init__(self, url, reason, attempts=1):
+        super().__init__(f"{url}: {reason}")
+        self.url = url
+        self.reason = reason
+        self.attempts = attempts
+
+
+class CircuitOpen(FetchError):
+    """The host's circuit is open, so the page was not requested"""
+
+    def __init__(self, url, host, retry_in):
+        super().__init__(url, f"too many failed requests to {host}, retrying in {retry_in:.0f}s", attempts=0)
+        self.retry_in = retry_in
+
+
+def describe_error(error):
+    """Exception type and the first line of its message (Selenium appends stack traces)"""
+    message = str(error).strip().splitlines()
+    return f"{type(error).__name__}: {message[0]}" if message else type(error).__name__
+
+
+def status_code(error):
+    response = getattr(error, "response", None)
+    return response.status_code if isinstance(error, requests.HTTPError) and response is not None else None
+
+
+def is_retryable(error):
+    """Timeouts, dropped connections and throttling responses are worth retrying"""
+    return isinstance(error, (requests.Timeout, requests.ConnectionError, BrowserTimeout)) \
+        or status_code(error) in RETRY_STATUSES
+
+
+def retry_after(error):
+    """Seconds asked for in a throttling response's Retry-After header, or None"""
+    response = getattr(error, "response", None)
+    value = response.headers.get("Retry-After", "") if response is not None else ""
+    return float(value) if value.strip().isdigit() else None
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` per second up to `burst`; a rate of 0 means unlimited"""
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return the seconds to wait before using it"""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class CircuitBreaker:
+    """Closed, open for `cooldown` seconds after `threshold` failures in a row, then half open"""
+
+    def __init__(self, threshold, cooldown, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait_time(self):
+        """0 when a fetch may go ahead, otherwise seconds until the circuit is tried again"""
+        with self._lock:
+            if self.state == "closed":
+                return 0.0
+            remaining = self.opened_at + self.cooldown - self.clock()
+            if self.state == "open" and remaining <= 0:
+                self.state = "half_open"   # Let this one fetch through as the trial
+                return 0.0
+            return max(remaining, 0.0) if self.state == "open" else float(self.cooldown)
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.threshold and self.failures >= self.threshold):
+                self.state = "open"
+                self.opened_at = self.clock()
+
+
+class FetchScheduler:
+    """Run page fetches through per-host rate limits, retries and circuit breakers"""
+
+    def __init__(self, rate=HOST_RATE, burst=HOST_BURST, retries=FETCH_RETRIES, base_delay=RETRY_BASE_DELAY,
+                 max_delay=RETRY_MAX_DELAY, breaker_threshold=BREAKER_THRESHOLD, breaker_cooldown=BREAKER_COOLDOWN,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.clock = clock
+        self.sleep = sleep
+        self.hosts = {}
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "timeouts": 0, "failed": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+    def host(self, url):
+        """(TokenBucket, CircuitBreaker) of the host of `url`"""
+        name = urlsplit(url).netloc
+        with self._lock:
+            if name not in self.hosts:
+                self.hosts[name] = (TokenBucket(self.rate, self.burst, self.clock),
+                                    CircuitBreaker(self.breaker_threshold, self.breaker_cooldown, self.clock))
+            return self.hosts[name]
+
+    def backoff(self, attempt, error):
+        """Full-jitter exponential delay before retry `attempt` (0-based), at least the server's Retry-After"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        hint = retry_after(error)
+        return max(delay, min(hint, self.max_delay)) if hint is not None else delay
+
+    def fetch(self, url, func, *args):
+        """
+        Return func(*args), which loads `url`, once the host's rate limit
+        allows it. Retryable errors are retried with backoff; anything else,
+        or running out of retries, raises FetchError.
+        """
+        bucket, breaker = self.host(url)
+        for attempt in range(self.retries + 1):
+            wait = breaker.wait_time()
+            if wait:
+                self._count("rejected")
+                raise CircuitOpen(url, urlsplit(url).netloc, wait)
+            delay = bucket.reserve()
+            if delay:
+                self.sleep(delay)
+            self._count("requests")
+            try:
+                result = func(*args)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The host answered; the error says nothing about its load
+                    breaker.record_success()
+                    self._count("failed")
+                    raise FetchError(url, describe_error(e), attempt + 1) from e
+                breaker.record_failure()
+                self._count("throttled" if status_code(e) in RETRY_STATUSES else "timeouts")
+                if attempt == self.retries:
+                    self._count("failed")
+                    raise FetchError(url, describe_error(e), attempt + 1) from e
+                self._count("retries")
+                delay = self.backoff(attempt, e)
+                logging.warning(f"Fetching {url} failed ({describe_error(e)}), retrying in {delay:.1f}s")
+                self.sleep(delay)
+            else:
+                breaker.record_success()
+                return result
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def to_dict(self):
+        with self._lock:
+            hosts = {name: breaker.state for name, (_, breaker) in self.hosts.items()}
+            return dict(self.stats, rate=self.rate, burst=self.burst, hosts=hosts)
+
+
+def fetch_once(url, func, *args):
+    """func(*args) without scheduling, raising FetchError when it fails"""
+    try:
+        return func(*args)
+    except Exception as e:
+        raise FetchError(url, describe_error(e)) from e
+
+
+_fetch_scheduler = None
+_fetch_scheduler_lock = threading.Lock()
+
+
+def get_fetch_scheduler():
+    """Process-wide FetchScheduler shared by all scrapes, created on first use"""
+    global _fetch_scheduler
+    with _fetch_scheduler_lock:
+        if _fetch_scheduler is None:
+            _fetch_scheduler = FetchScheduler()
+        return _fetch_scheduler
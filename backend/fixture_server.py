@@ -0,0 +1,182 @@
+"""
+Local stand-in for the public LinkedIn job pages.
+
+Serves the recorded HTML in fixtures/ so the scraper can be exercised
+without network access:
+
+    /jobs/search/...         -> fixtures/search_results.html
+    /jobs-guest/.../search   -> the same cards, `guest_page_size` per `start`
+    /jobs/view/<slug>        -> fixtures/jobs/<slug>.html
+
+"{{BASE_URL}}" inside a fixture is replaced with the server address, so
+links in the recorded pages point back at the stand-in server.
+
+With `cards` the result list holds that many postings, repeating the
+recorded cards under new job IDs; their view pages are the recorded page of
+the card they copy. With `scroll_page_size` the search page behaves like
+LinkedIn's infinite scroller in a browser: it starts with that many cards,
+loads the next guest page when scrolled to the bottom, and after
+`show_more_after` loads only continues when the show-more button is clicked.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import argparse
+import os
+import re
+import threading
+import time
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+GUEST_SEARCH_PATH = "/jobs-guest/jobs/api/seeMoreJobPostings/search"
+SYNTHETIC_JOB_ID = 4000000000   # First job ID of the cards made up with `cards`
+
+# Appended to the search page when the server mimics the infinite scroller
+INFINITE_SCROLLER = """
+<button class="infinite-scroller__show-more-button" style="display: none">See more jobs</button>
+<script>
+(function () {
+  var list = document.querySelector('.jobs-search__results-list');
+  var button = document.querySelector('.infinite-scroller__show-more-button');
+  var loaded = list.querySelectorAll('li').length, loads = 0, loading = false, done = false;
+  function load() {
+    if (loading || done) return;
+    loading = true;
+    fetch('GUEST_SEARCH_PATH?start=' + loaded).then(function (response) {
+      return response.text();
+    }).then(function (html) {
+      var page = document.createElement('ul');
+      page.innerHTML = html;
+      var items = page.querySelectorAll('li');
+      for (var i = 0; i < items.length; i++) list.appendChild(items[i]);
+      loaded += items.length;
+      loads += 1;
+      done = items.length === 0;
+      button.style.display = !done && loads >= SHOW_MORE_AFTER ? 'block' : 'none';
+      loading = false;
+    });
+  }
+  window.addEventListener('scroll', function () {
+    if (loads < SHOW_MORE_AFTER && window.innerHeight + window.scrollY >= document.body.scrollHeight - 10) load();
+  });
+  button.addEventListener('click', load);
+})();
+</script>
+"""
+
+
+def recorded_cards(base_url):
+    """The <li> cards of the recorded search page"""
+    with open(os.path.join(FIXTURES_DIR, "search_results.html"), encoding="utf-8") as f:
+        page = f.read().replace("{{BASE_URL}}", base_url)
+    return re.findall(r"<li>.*?</li>", page, re.DOTALL)
+
+
+def synthetic_cards(recorded, count):
+    """`count` cards repeating the `recorded` ones with job IDs from SYNTHETIC_JOB_ID"""
+    return [re.sub(r"3790000\d{3}", str(SYNTHETIC_JOB_ID + n), recorded[n % len(recorded)])
+            for n in range(count)]
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Map LinkedIn paths to fixture files"""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if path == GUEST_SEARCH_PATH:
+            start = int(parse_qs(url.query).get("start", ["0"])[0])
+            self._send_html("".join(self.server.cards[start:start + self.server.guest_page_size]))
+            return
+
+        if path.startswith("/jobs/search"):
+            self._send_html(self._search_page())
+            return
+
+        fixture = None
+        if path.startswith("/jobs/view/"):
+            fixture = self._job_fixture(os.path.basename(path.rstrip("/")))
+        if not fixture or not os.path.isfile(os.path.join(FIXTURES_DIR, fixture)):
+            self.send_error(404)
+            return
+        self._send_html(self._read_fixture(fixture))
+
+    def _search_page(self):
+        page = self._read_fixture("search_results.html")
+        recorded = re.findall(r"<li>.*?</li>", page, re.DOTALL)
+        start = page.index(recorded[0])
+        end = page.index(recorded[-1]) + len(recorded[-1])
+        if self.server.scroll_page_size is None:
+            return page[:start] + "".join(self.server.cards) + page[end:]
+        scroller = INFINITE_SCROLLER.replace("GUEST_SEARCH_PATH", GUEST_SEARCH_PATH) \
+            .replace("SHOW_MORE_AFTER", str(self.server.show_more_after))
+        page = page[:start] + "".join(self.server.cards[:self.server.scroll_page_size]) + page[end:]
+        return page.replace("</main>", scroller + "</main>")
+
+    def _job_fixture(self, slug):
+        """Fixture of a job view page; synthetic job IDs get the recorded page they copy"""
+        fixture = os.path.join("jobs", slug + ".html")
+        match = re.fullmatch(r"(.+)-(\d+)", slug)
+        if match and int(match.group(2)) >= SYNTHETIC_JOB_ID:
+            for name in os.listdir(os.path.join(FIXTURES_DIR, "jobs")):
+                if name.startswith(match.group(1) + "-"):
+                    return os.path.join("jobs", name)
+        return fixture
+
+    def _read_fixture(self, fixture):
+        with open(os.path.join(FIXTURES_DIR, fixture), encoding="utf-8") as f:
+            return f.read().replace("{{BASE_URL}}", self.server.base_url)
+
+    def _send_html(self, body, status=200):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """HTTP server serving fixtures on a background thread"""
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, guest_page_size=10, cards=None,
+                 scroll_page_size=None, show_more_after=3):
+        super().__init__((host, port), FixtureHandler)
+        self.latency = latency
+        self.guest_page_size = guest_page_size
+        self.scroll_page_size = scroll_page_size
+        self.show_more_after = show_more_after
+        self.base_url = f"http://{host}:{self.server_address[1]}"
+        recorded = recorded_cards(self.base_url)
+        self.cards = recorded if cards is None else synthetic_cards(recorded, cards)
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Serve the recorded LinkedIn pages")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--cards", type=int, help="postings in the result list (default: the recorded ones)")
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    arg_parser.add_argument("--scroll-page-size", type=int, help="cards shown before the page has to scroll")
+    args = arg_parser.parse_args()
+    server = FixtureServer(port=args.port, latency=args.latency, cards=args.cards,
+                           scroll_page_size=args.scroll_page_size)
+    print(f"Serving fixtures on {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,166 @@
+"""
+Rolling summarization of long conversations
+
+A chat session sends its whole history with every message, so without a
+bound each turn costs more input tokens and time than the last. Once a
+conversation's history (and its summary so far) is estimated above
+HISTORY_TOKEN_BUDGET tokens, HistoryCompactor keeps the last
+HISTORY_KEEP_TURNS turns verbatim and folds the older ones into a running
+summary, written by the model. The summary is stored with the conversation,
+next to the `summarized_upto` offset of the first message it does not cover,
+and replayed at the start of the chat session in place of the turns it
+covers; the stored history itself is kept whole (MAX_TURNS bounds it).
+
+Summaries are written in the background once an exchange has been stored, so
+no answer waits for one; the next turn picks the summary up.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+import logging
+import os
+import threading
+
+from job_index import estimate_tokens
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "4000"))   # History tokens that trigger a summary
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "4"))         # Latest exchanges always kept verbatim
+HISTORY_SUMMARY_WORKERS = 2                                             # Summaries written at the same time at most
+
+SUMMARY_PROMPT = """You summarize conversations between a job seeker and a job search assistant.
+Write a concise summary (at most about 300 words) that keeps everything needed to continue the conversation:
+the user's skills, experience, preferences and constraints, the jobs discussed (with their numbers) and what
+was concluded about them, advice given, and open questions. Write plain text, no preamble."""
+
+
+def history_tokens(messages):
+    return sum(estimate_tokens(message["content"]) for message in messages)
+
+
+def summary_prompt(summary, messages):
+    """What the summarizer is asked to fold `messages` into the running `summary`"""
+    lines = [f"{'User' if message['role'] == 'user' else 'Assistant'}: {message['content']}" for message in messages]
+    previous = f"Summary of the conversation so far:\n{summary}\n\n" if summary else ""
+    return f"{previous}Continue the summary with these messages:\n\n" + "\n\n".join(lines)
+
+
+def summary_messages(conversation):
+    """The summary as an exchange to start a chat session with, or nothing before the first summary"""
+    summary = conversation.get("summary")
+    if not summary:
+        return []
+    return [{"role": "user", "content": f"Summary of our conversation so far:\n{summary['text']}"},
+            {"role": "assistant", "content": "Thanks, I'll keep that in mind."}]
+
+
+class HistoryCompactor:
+    """Fold old turns of conversations into a summary written by `summarize(summary, messages)`"""
+
+    def __init__(self, summarize, token_budget=HISTORY_TOKEN_BUDGET, keep_turns=HISTORY_KEEP_TURNS,
+                 workers=HISTORY_SUMMARY_WORKERS):
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.stats = {"turns": 0, "compactions": 0, "failures": 0, "messages_folded": 0, "tokens_saved": 0}
+        self.pending = {}   # conversation id -> Future of its compaction in the background
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="history-summary")
+        self._lock = threading.Lock()
+
+    def compact(self, conversation):
+        """
+        Fold the messages after `summarized_upto` but the last `keep_turns`
+        exchanges into the conversation's summary if it is over the token
+        budget; returns True if it did. The history is left whole and a
+        failed summary leaves the conversation as it was.
+        """
+        history = conversation["history"]
+        upto = conversation.get("summarized_upto", 0)
+        summary = conversation.get("summary") or {"text": "", "messages": 0, "tokens": 0}
+        recent = history[upto:]
+        keep = 2 * self.keep_turns
+        if len(recent) <= keep or estimate_tokens(summary["text"]) + history_tokens(recent) <= self.token_budget:
+            return False
+
+        folded = recent[:-keep] if keep else recent
+        try:
+            text = self.summarize(summary["text"], folded).strip()
+        except Exception as e:
+            logging.warning(f"Summarizing {len(folded)} messages failed: {e}")
+            self._count("failures")
+            return False
+        conversation["summary"] = {
+            "text": text,
+            "messages": summary["messages"] + len(folded),
+            "tokens": summary["tokens"] + history_tokens(folded),   # What the folded messages would cost
+            "updated_at": datetime.now().isoformat(),
+        }
+        conversation["summarized_upto"] = upto + len(folded)
+        self._count("compactions")
+        self._count("messages_folded", len(folded))
+        return True
+
+    def compact_later(self, store, conversation_id):
+        """Compact the stored conversation in the background, unless that is already under way"""
+        with self._lock:
+            future = self.pending.get(conversation_id)
+            started = future is None
+            if started:
+                future = self.pending[conversation_id] = self._executor.submit(
+                    self._compact_stored, store, conversation_id)
+        if started:
+            future.add_done_callback(lambda done: self._done(conversation_id, done))
+        return future
+
+    def _compact_stored(self, store, conversation_id):
+        conversation = store.get(conversation_id)
+        if conversation is None:
+            return False
+        summary = conversation.get("summary")
+        if not self.compact(conversation):
+            return False
+        last_folded = conversation["history"][conversation["summarized_upto"] - 1]
+
+        # Keep the exchanges stored while the summary was written; the store
+        # may also have trimmed the oldest turns in the meantime
+        latest = store.get(conversation_id)
+        if latest is None or latest.get("summary") != summary:
+            return False   # Deleted, or summarized elsewhere meanwhile
+        history = latest["history"]
+        latest["summarized_upto"] = history.index(last_folded) + 1 if last_folded in history else 0
+        latest["summary"] = conversation["summary"]
+        store.save(conversation_id, latest)
+        return True
+
+    def session_history(self, conversation):
+        """
+        The history to start the conversation's chat session with (summary
+        first, then the turns after `summarized_upto`), its estimated tokens,
+        and the tokens it saves this turn over replaying every message
+        """
+        recent = conversation["history"][conversation.get("summarized_upto", 0):]
+        session_history = summary_messages(conversation) + recent
+        summary = conversation.get("summary")
+        saved = summary["tokens"] - history_tokens(summary_messages(conversation)) if summary else 0
+        self._count("turns")
+        self._count("tokens_saved", saved)
+        return session_history, history_tokens(session_history), saved
+
+    def join(self):
+        """Wait for the compactions under way"""
+        with self._lock:
+            futures = list(self.pending.values())
+        wait(futures)
+
+    def _done(self, conversation_id, future):
+        with self._lock:
+            self.pending.pop(conversation_id, None)
+        if future.exception() is not None:
+            logging.warning(f"Compacting conversation {conversation_id} failed: {future.exception()}")
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def to_dict(self):
+        with self._lock:
+            return dict(self.stats, token_budget=self.token_budget, keep_turns=self.keep_turns)
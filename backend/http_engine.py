@@ -0,0 +1,82 @@
+"""
+HTTP-only fetch engine for the public LinkedIn job pages
+
+The guest job search API and the public job-view pages are server-rendered
+HTML, so they can be fetched with plain HTTP requests instead of a browser.
+Sessions keep pooled keep-alive connections, which costs a few MB instead of
+a Chrome process per worker. Parsing is done by parsers.py and is shared
+with the Selenium engine.
+"""
+
+from urllib.parse import urlsplit, urlunsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+GUEST_SEARCH_PATH = "/jobs-guest/jobs/api/seeMoreJobPostings/search"
+HTTP_TIMEOUT = 15         # Seconds per request
+HTTP_POOL_SIZE = 4        # Keep-alive connections kept per host
+MAX_SEARCH_PAGES = 40     # Guest search pages fetched per search (about 10 cards each)
+
+HEADERS = {
+    "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                   "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"),
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+
+def create_session(pool_size=HTTP_POOL_SIZE):
+    """Create a requests session with a pool of keep-alive connections"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+def fetch_page(session, url):
+    """GET a page and return its HTML, raising on HTTP errors"""
+    response = session.get(url, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    return response.text
+
+
+def get_search_page(session, url):
+    """GET a guest search page, raising on HTTP errors other than the 400/404 past the last page"""
+    response = session.get(url, timeout=HTTP_TIMEOUT)
+    if response.status_code not in (400, 404):
+        response.raise_for_status()
+    return response
+
+
+def build_guest_search_url(search_url, start):
+    """Turn a /jobs/search/ URL into the guest API URL for the page at `start`"""
+    parts = urlsplit(search_url)
+    query = f"{parts.query}&start={start}" if parts.query else f"start={start}"
+    return urlunsplit((parts.scheme, parts.netloc, GUEST_SEARCH_PATH, query, ""))
+
+
+def iter_search_pages(session, search_url, max_pages=MAX_SEARCH_PAGES, scheduler=None):
+    """
+    Yield the guest search result pages for a search URL as they arrive.
+
+    The guest API returns one HTML fragment of cards per `start` offset, the
+    same markup the infinite scroller appends in the browser. Paging stops at
+    the first page without cards. With a `scheduler` (a FetchScheduler) each
+    page is rate limited and retried.
+    """
+    start = 0
+    for _ in range(max_pages):
+        url = build_guest_search_url(search_url, start)
+        if scheduler is not None:
+            response = scheduler.fetch(url, get_search_page, session, url)
+        else:
+            response = get_search_page(session, url)
+        if response.status_code in (400, 404):
+            break
+        cards = response.text.count("base-card__full-link")
+        if not cards:
+            break
+        yield response.text
+        start += cards
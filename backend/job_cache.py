@@ -0,0 +1,198 @@
+"""
+Persistent cache of fetched job details
+
+A posting's description almost never changes, so job and company
+descriptions are stored in SQLite keyed by the LinkedIn job ID (or the
+normalized job URL when no ID can be found). Entries expire after a TTL
+and the least recently used ones are evicted above a size limit.
+
+Company descriptions are shared by every posting of a company, so they are
+also kept once per company_url, in memory and in the same database.
+"""
+
+from urllib.parse import urlsplit, urlunsplit
+import os
+import re
+import sqlite3
+import threading
+import time
+
+CACHE_DB_PATH = os.getenv("JOB_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_cache.db"))
+CACHE_TTL = 7 * 24 * 3600     # Seconds a cached job stays valid
+CACHE_MAX_ENTRIES = 20000     # Least recently used jobs are evicted above this
+COMPANY_CACHE_TTL = 30 * 24 * 3600
+
+JOB_ID_PATTERNS = [
+    re.compile(r"/jobs/view/(?:[^/?#]*-)?(\d+)"),
+    re.compile(r"[?&]currentJobId=(\d+)"),
+    re.compile(r"jobPosting[:/](\d+)"),
+]
+
+
+def job_id_from_url(job_url):
+    """Return the LinkedIn job ID in a job URL, or None"""
+    for pattern in JOB_ID_PATTERNS:
+        match = pattern.search(job_url or "")
+        if match:
+            return match.group(1)
+    return None
+
+
+def normalize_job_url(job_url):
+    """Drop tracking query parameters and fragments from a job URL"""
+    parts = urlsplit((job_url or "").strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), "", ""))
+
+
+def normalize_company_url(company_url):
+    """Company page URL without tracking parameters, used as the company key"""
+    return normalize_job_url(company_url)
+
+
+def job_key(job_url):
+    """Cache key for a job: its LinkedIn ID, or the normalized URL"""
+    job_id = job_id_from_url(job_url)
+    return f"id:{job_id}" if job_id else f"url:{normalize_job_url(job_url)}"
+
+
+class JobCache:
+    """SQLite-backed TTL + LRU cache of (job_description, company_description)"""
+
+    def __init__(self, path=CACHE_DB_PATH, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    key TEXT PRIMARY KEY,
+                    job_description TEXT NOT NULL,
+                    company_description TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_accessed_at ON jobs (accessed_at)")
+
+    def get(self, job_url):
+        """Return cached (job_description, company_description) or None"""
+        key = job_key(job_url)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT job_description, company_description, fetched_at FROM jobs WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[2] > self.ttl:
+                self._conn.execute("DELETE FROM jobs WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE jobs SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0], row[1]
+
+    def put(self, job_url, details):
+        """Store fetched details; empty results (failed fetches) are not cached"""
+        job_description, company_description = details
+        if not job_description and not company_description:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?)",
+                (job_key(job_url), job_description, company_description, now, now)
+            )
+            self._conn.execute("""
+                DELETE FROM jobs WHERE key IN (
+                    SELECT key FROM jobs ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class CompanyCache:
+    """company_description per company_url, memoized in process and stored in SQLite"""
+
+    def __init__(self, path=CACHE_DB_PATH, ttl=COMPANY_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._memo = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS companies (
+                    key TEXT PRIMARY KEY,
+                    company_description TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+
+    def get(self, company_url):
+        """Return the cached company_description or None"""
+        key = normalize_company_url(company_url)
+        if not key:
+            return None
+        now = time.time()
+        with self._lock:
+            cached = self._memo.get(key)
+            if cached is None:
+                row = self._conn.execute(
+                    "SELECT company_description, fetched_at FROM companies WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                cached = self._memo[key] = row
+            if now - cached[1] > self.ttl:
+                del self._memo[key]
+                with self._conn:
+                    self._conn.execute("DELETE FROM companies WHERE key = ?", (key,))
+                return None
+        return cached[0]
+
+    def put(self, company_url, company_description):
+        key = normalize_company_url(company_url)
+        if not key or not company_description:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._memo[key] = (company_description, now)
+            self._conn.execute("INSERT OR REPLACE INTO companies VALUES (?, ?, ?)",
+                               (key, company_description, now))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+_job_cache = None
+_company_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_job_cache():
+    """Process-wide JobCache, opened on first use"""
+    global _job_cache
+    with _cache_lock:
+        if _job_cache is None:
+            _job_cache = JobCache()
+        return _job_cache
+
+
+def get_company_cache():
+    """Process-wide CompanyCache, opened on first use"""
+    global _company_cache
+    with _cache_lock:
+        if _company_cache is None:
+            _company_cache = CompanyCache()
+        return _company_cache
@@ -0,0 +1,225 @@
+"""
+BM25 retrieval over a conversation's jobs
+
+The chat prompt only has room for a handful of postings, so each message is
+matched against all of the conversation's jobs and only the most relevant
+ones are sent along, as many as fit in JOB_CONTEXT_TOKENS.
+
+A JobIndex tokenizes each job text once. Jobs are identified by a hash of
+their text and its occurrence in the list, so duplicates each keep their
+position and a job whose text changed is tokenized again. update()
+tokenizes only the texts it has not seen and drops the jobs that are gone
+(returning early when the indexed fields match the last call), renumbers
+the vocabulary once enough of its terms went unused, then reassembles the
+term/doc matrix with NumPy: postings are sorted by term into a compressed sparse
+column layout with the BM25 weight of every (term, job) pair precomputed, so
+a query is one vectorized scatter-add per query term.
+"""
+
+from collections import Counter, OrderedDict
+import hashlib
+import string
+import threading
+
+import numpy as np
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+TITLE_WEIGHT = 3            # Times a job's title counts in its text
+TOP_K = 20                  # Jobs retrieved per message at most
+JOB_CONTEXT_TOKENS = 3000   # Prompt tokens the retrieved jobs may use
+CHARS_PER_TOKEN = 4         # Rough token estimate for English text
+MAX_JOB_INDEXES = 100       # Conversations whose index is kept
+VOCABULARY_SLACK = 0.5      # Share of unused terms at which the vocabulary is compacted
+
+# Punctuation splits words, except "+" and "#" so "c++" and "c#" stay whole
+SEPARATORS = str.maketrans({char: " " for char in string.punctuation if char not in "+#"})
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or our that the their this to we will with you your
+""".split())
+
+
+def tokenize(text):
+    return [token for token in text.lower().translate(SEPARATORS).split() if token not in STOPWORDS]
+
+
+def term_counts(text):
+    counts = Counter(text.lower().translate(SEPARATORS).split())
+    for stopword in STOPWORDS.intersection(counts):
+        del counts[stopword]
+    return counts
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def job_text(job):
+    title = job.get("job_title") or ""
+    return " ".join([title] * TITLE_WEIGHT + [job.get("company_name") or "", job.get("location") or "",
+                                               job.get("benefit") or "", job.get("job_description") or ""])
+
+
+def jobs_fingerprint(jobs):
+    """The indexed fields of every job, in order; equal when update() would change nothing"""
+    return tuple((job.get("job_title"), job.get("company_name"), job.get("location"), job.get("benefit"),
+                  job.get("job_description")) for job in jobs)
+
+
+def doc_keys(texts):
+    """(text hash, occurrence) of each text, unique even when texts repeat"""
+    keys, seen = [], Counter()
+    for text in texts:
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        keys.append((digest, seen[digest]))
+        seen[digest] += 1
+    return keys
+
+
+class JobIndex:
+    """BM25 index over a list of job dicts, updated in place as the list changes"""
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}
+        self.docs = OrderedDict()   # (text hash, occurrence) -> (job, (term ids, term counts))
+        self.jobs = []
+        self.stats = {"builds": 0, "added": 0, "removed": 0, "compactions": 0}
+        self._fingerprint = ()
+        self._lock = threading.Lock()
+        self._build()
+
+    def update(self, jobs):
+        """Index `jobs`, tokenizing only new texts; returns True if the index changed"""
+        fingerprint = jobs_fingerprint(jobs)
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                # Same texts in the same order: only the job dicts themselves are swapped in
+                self.docs = OrderedDict((key, (job, job_terms)) for (key, (_, job_terms)), job in zip(self.docs.items(), jobs))
+                self.jobs = list(jobs)
+                return False
+        texts = [job_text(job) for job in jobs]
+        keyed = OrderedDict(zip(doc_keys(texts), zip(jobs, texts)))
+        with self._lock:
+            removed = [key for key in self.docs if key not in keyed]
+            added = [key for key in keyed if key not in self.docs]
+            unchanged = not added and not removed and list(self.docs) == list(keyed)
+            terms = {key[0]: job_terms for key, (_, job_terms) in self.docs.items()}
+            for digest, _ in added:
+                if digest not in terms:
+                    terms[digest] = self._terms(keyed[digest, 0][1])
+            # Keep the order of `jobs`; texts seen before keep their tokens
+            self.docs = OrderedDict((key, (job, terms[key[0]])) for key, (job, _) in keyed.items())
+            self._fingerprint = fingerprint
+            if unchanged:
+                self.jobs = list(jobs)
+                return False
+            self.stats["added"] += len(added)
+            self.stats["removed"] += len(removed)
+            self._build()
+            return True
+
+    def _terms(self, text):
+        """(term ids, counts) of a job's text, adding new terms to the vocabulary"""
+        counts = term_counts(text)
+        vocabulary = self.vocabulary
+        ids = [vocabulary.setdefault(term, len(vocabulary)) for term in counts]
+        return np.array(ids, dtype=np.int64), np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+
+    def _compact(self):
+        """Drop the terms no job uses any more and renumber the rest, once they pass VOCABULARY_SLACK"""
+        used = [ids for _, (ids, _) in self.docs.values() if len(ids)]
+        used = np.unique(np.concatenate(used)) if used else np.zeros(0, dtype=np.int64)
+        if len(self.vocabulary) - len(used) <= VOCABULARY_SLACK * len(self.vocabulary):
+            return
+        renumber = np.full(len(self.vocabulary), -1, dtype=np.int64)
+        renumber[used] = np.arange(len(used))
+        self.vocabulary = {term: int(renumber[i]) for term, i in self.vocabulary.items() if renumber[i] >= 0}
+        remapped = {}   # Duplicate texts share their (ids, counts), so remap each once
+        for job, (ids, counts) in self.docs.values():
+            remapped.setdefault(id(ids), (renumber[ids], counts))
+        self.docs = OrderedDict((key, (job, remapped[id(ids)])) for key, (job, (ids, _)) in self.docs.items())
+        self.stats["compactions"] += 1
+
+    def _build(self):
+        """Assemble the term-sorted postings and their BM25 weights from the tokenized jobs"""
+        self._compact()
+        self.jobs = [job for job, _ in self.docs.values()]
+        terms = [job_terms for _, job_terms in self.docs.values()]
+        docs, vocabulary_size = len(terms), len(self.vocabulary)
+        unique_terms = np.array([len(ids) for ids, _ in terms], dtype=np.int64)
+        if not unique_terms.any():
+            self.indptr = np.zeros(vocabulary_size + 1, dtype=np.int64)
+            self.postings = np.zeros(0, dtype=np.int64)
+            self.weights = np.zeros(0, dtype=np.float64)
+            self.stats["builds"] += 1
+            return
+
+        cols = np.concatenate([ids for ids, _ in terms])
+        tf = np.concatenate([counts for _, counts in terms])
+        rows = np.repeat(np.arange(docs, dtype=np.int64), unique_terms)
+        lengths = np.bincount(rows, weights=tf, minlength=docs)
+        order = np.argsort(cols * docs + rows)   # By term, then job (keys are unique)
+        term, doc, tf = cols[order], rows[order], tf[order]
+        self.indptr = np.searchsorted(term, np.arange(vocabulary_size + 1))
+        self.postings = doc
+
+        df = np.diff(self.indptr)
+        idf = np.log(1 + (docs - df + 0.5) / (df + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * lengths / lengths.mean())
+        self.weights = idf[term] * tf * (self.k1 + 1) / (tf + norm[doc])
+        self.stats["builds"] += 1
+
+    def search(self, query, k=TOP_K):
+        """Up to `k` (position, score) pairs of the jobs best matching `query`, best first"""
+        with self._lock:
+            terms = {self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary}
+            if not terms or not self.jobs:
+                return []
+            scores = np.zeros(len(self.jobs))
+            for term in terms:
+                start, end = self.indptr[term], self.indptr[term + 1]
+                scores[self.postings[start:end]] += self.weights[start:end]
+            candidates = np.flatnonzero(scores)
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            best = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [(int(i), float(scores[i])) for i in best]
+
+    def relevant_jobs(self, query, k=TOP_K):
+        """(position, job) of the best matches for `query`, or of the first `k` jobs when nothing matches"""
+        positions = [position for position, _ in self.search(query, k)] or range(min(k, len(self.jobs)))
+        return [(position, self.jobs[position]) for position in positions]
+
+    def __len__(self):
+        return len(self.jobs)
+
+
+class JobIndexCache:
+    """One JobIndex per conversation, least recently used evicted above `max_indexes`"""
+
+    def __init__(self, max_indexes=MAX_JOB_INDEXES):
+        self.max_indexes = max_indexes
+        self.indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id, jobs):
+        """The conversation's index, updated to `jobs`"""
+        with self._lock:
+            index = self.indexes.get(conversation_id)
+            if index is None:
+                index = self.indexes[conversation_id] = JobIndex()
+            self.indexes.move_to_end(conversation_id)
+            while len(self.indexes) > self.max_indexes:
+                self.indexes.popitem(last=False)
+        index.update(jobs)
+        return index
+
+    def discard(self, conversation_id):
+        with self._lock:
+            self.indexes.pop(conversation_id, None)
+
+    def to_dict(self):
+        with self._lock:
+            return {"indexes": len(self.indexes), "jobs": sum(len(index) for index in self.indexes.values())}
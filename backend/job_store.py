@@ -0,0 +1,294 @@
+"""
+Persistent store of scrape runs, their jobs and saved searches
+
+Every scrape (from /scrape or the scheduler) is recorded as a run, and its
+jobs are stored one row each in SQLite with indexes on job ID, country and
+posted date, so results can be queried page by page instead of being kept
+as one big blob by the client. Saved searches are the /scrape parameters
+plus an interval the scheduler runs them at.
+
+Finished runs are pruned with their jobs as each run finishes: only the
+latest JOB_STORE_MAX_RUNS runs of every saved search (and of ad-hoc
+scrapes, counted together) are kept, and none older than
+JOB_STORE_RETENTION_DAYS.
+"""
+
+from datetime import datetime, timedelta
+import base64
+import binascii
+import json
+import os
+import sqlite3
+import threading
+import uuid
+
+from job_cache import job_id_from_url
+
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_store.db"))
+JOB_STORE_MAX_RUNS = int(os.getenv("JOB_STORE_MAX_RUNS", "50"))               # Runs kept per saved search
+JOB_STORE_RETENTION_DAYS = int(os.getenv("JOB_STORE_RETENTION_DAYS", "30"))   # Days a finished run is kept
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    search_id TEXT,
+    parameters TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    total_jobs INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_search_id ON runs (search_id, started_at);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    job_id TEXT,
+    country TEXT NOT NULL,
+    posted_date TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_run_id ON jobs (run_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_job_id ON jobs (job_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_country ON jobs (country);
+CREATE INDEX IF NOT EXISTS idx_jobs_posted_date ON jobs (posted_date);
+
+-- Every country a (deduplicated) job was found in, not only the one in jobs.country
+CREATE TABLE IF NOT EXISTS job_countries (
+    job_row INTEGER NOT NULL,
+    country TEXT NOT NULL,
+    PRIMARY KEY (country, job_row)
+);
+CREATE INDEX IF NOT EXISTS idx_job_countries_job_row ON job_countries (job_row);
+
+CREATE TABLE IF NOT EXISTS saved_searches (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    parameters TEXT NOT NULL,
+    interval_minutes INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    last_run_at TEXT
+);
+"""
+
+
+def page_bounds(page, page_size):
+    """Clamp 1-based `page` and `page_size` and return (page, page_size, offset)"""
+    page = max(int(page), 1)
+    page_size = min(max(int(page_size), 1), MAX_PAGE_SIZE)
+    return page, page_size, (page - 1) * page_size
+
+
+def encode_cursor(row_id):
+    """Opaque cursor pointing after the job row `row_id`"""
+    return base64.urlsafe_b64encode(f"job:{row_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Row ID in a cursor from encode_cursor; raises ValueError for anything else"""
+    try:
+        text = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"invalid cursor: {cursor}") from e
+    prefix, _, row_id = text.partition(":")
+    if prefix != "job" or not row_id.isdigit():
+        raise ValueError(f"invalid cursor: {cursor}")
+    return int(row_id)
+
+
+def run_row(row):
+    run_id, search_id, parameters, status, started_at, finished_at, total_jobs, error = row
+    run = {
+        "run_id": run_id,
+        "search_id": search_id,
+        "parameters": json.loads(parameters),
+        "status": status,
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "total_jobs": total_jobs,
+    }
+    if error:
+        run["error"] = error
+    return run
+
+
+def search_row(row):
+    search_id, name, parameters, interval_minutes, created_at, last_run_at = row
+    return {
+        "search_id": search_id,
+        "name": name,
+        "parameters": json.loads(parameters),
+        "interval_minutes": interval_minutes,
+        "created_at": created_at,
+        "last_run_at": last_run_at,
+    }
+
+
+class JobStore:
+    """Runs, jobs and saved searches in one SQLite database"""
+
+    def __init__(self, path=JOB_STORE_PATH, max_runs=JOB_STORE_MAX_RUNS, retention_days=JOB_STORE_RETENTION_DAYS):
+        self.path = path
+        self.max_runs = max_runs
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    # --- RUNS ---
+    def start_run(self, parameters, search_id=None):
+        run_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO runs (id, search_id, parameters, status, started_at) VALUES (?, ?, ?, ?, ?)",
+                               (run_id, search_id, json.dumps(parameters), "running", datetime.now().isoformat()))
+        return run_id
+
+    def finish_run(self, run_id, jobs=(), error=None):
+        """
+        Store a run's jobs and mark it finished ("error" when `error` is
+        given), then prune old runs of the same search
+        """
+        jobs = list(jobs)
+        rows = [(run_id, job_id_from_url(job.get("job_url")), job.get("country", ""),
+                 job.get("posted_date", ""), json.dumps(job)) for job in jobs]
+        with self._lock, self._conn:
+            for row, job in zip(rows, jobs):
+                job_row = self._conn.execute("INSERT INTO jobs (run_id, job_id, country, posted_date, data) "
+                                             "VALUES (?, ?, ?, ?, ?)", row).lastrowid
+                self._conn.executemany("INSERT OR IGNORE INTO job_countries VALUES (?, ?)",
+                                       [(job_row, country) for country in job.get("countries") or [row[2]]])
+            self._conn.execute("UPDATE runs SET status = ?, finished_at = ?, total_jobs = ?, error = ? WHERE id = ?",
+                               ("error" if error else "success", datetime.now().isoformat(), len(rows), error,
+                                run_id))
+            self._prune(run_id)
+
+    def _prune(self, run_id):
+        """Delete finished runs (and their jobs) of `run_id`'s search beyond max_runs or retention_days"""
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        expired = [old_id for old_id, in self._conn.execute("""
+            SELECT id FROM runs
+            WHERE status != 'running' AND search_id IS (SELECT search_id FROM runs WHERE id = ?)
+            ORDER BY started_at DESC LIMIT -1 OFFSET ?
+        """, (run_id, self.max_runs))]
+        expired += [old_id for old_id, in self._conn.execute(
+            "SELECT id FROM runs WHERE status != 'running' AND started_at < ?", (cutoff,))]
+        if expired:
+            self._conn.executemany("DELETE FROM job_countries WHERE job_row IN (SELECT id FROM jobs WHERE run_id = ?)",
+                                   [(old_id,) for old_id in set(expired)])
+            self._conn.executemany("DELETE FROM jobs WHERE run_id = ?", [(old_id,) for old_id in set(expired)])
+            self._conn.executemany("DELETE FROM runs WHERE id = ?", [(old_id,) for old_id in set(expired)])
+
+    def get_run(self, run_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return run_row(row) if row else None
+
+    def list_runs(self, search_id=None, page=1, page_size=DEFAULT_PAGE_SIZE):
+        """Runs newest first, optionally only those of one saved search"""
+        page, page_size, offset = page_bounds(page, page_size)
+        where, args = ("WHERE search_id = ?", [search_id]) if search_id else ("", [])
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM runs {where}", args).fetchone()[0]
+            rows = self._conn.execute(f"SELECT * FROM runs {where} ORDER BY started_at DESC LIMIT ? OFFSET ?",
+                                      args + [page_size, offset]).fetchall()
+        return {"runs": [run_row(row) for row in rows], "page": page, "page_size": page_size, "total": total}
+
+    # --- JOBS ---
+    def query_jobs(self, run_id=None, job_id=None, country=None, posted_since=None, page=1,
+                   page_size=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        One page of stored jobs matching every given filter, in the order
+        they were stored. `posted_since` is an ISO date compared with
+        posted_date. `country` matches every country a deduplicated job
+        was found in. Pages are picked by number, or by the `cursor` a
+        previous page returned as next_cursor, which stays stable while new
+        jobs are stored. next_cursor is None on the last page.
+        """
+        page, page_size, offset = page_bounds(page, page_size)
+        conditions, args = [], []
+        for column, value in (("run_id", run_id), ("job_id", job_id)):
+            if value:
+                conditions.append(f"{column} = ?")
+                args.append(value)
+        if country:
+            # Jobs stored before job_countries existed only have jobs.country
+            conditions.append("(country = ? OR id IN (SELECT job_row FROM job_countries WHERE country = ?))")
+            args += [country, country]
+        if posted_since:
+            conditions.append("posted_date >= ?")
+            args.append(posted_since)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        page_where, page_args = where, list(args)
+        if cursor:
+            page_where = f"{where} AND id > ?" if where else "WHERE id > ?"
+            page_args.append(decode_cursor(cursor))
+            offset = 0
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM jobs {where}", args).fetchone()[0]
+            rows = self._conn.execute(f"SELECT id, data FROM jobs {page_where} ORDER BY id LIMIT ? OFFSET ?",
+                                      page_args + [page_size + 1, offset]).fetchall()
+        next_cursor = encode_cursor(rows[page_size - 1][0]) if len(rows) > page_size else None
+        return {"jobs": [json.loads(data) for _, data in rows[:page_size]], "page": page,
+                "page_size": page_size, "total": total, "next_cursor": next_cursor}
+
+    def job_details(self, job_url):
+        """(job_description, company_description) of the latest stored run that fetched the job, or None"""
+        job_id = job_id_from_url(job_url)
+        if not job_id:
+            return None
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM jobs WHERE job_id = ? ORDER BY id DESC LIMIT 10",
+                                      (job_id,)).fetchall()
+        for data, in rows:
+            job = json.loads(data)
+            if job.get("job_description"):
+                return job["job_description"], job.get("company_description", "")
+        return None
+
+    # --- SAVED SEARCHES ---
+    def add_search(self, name, parameters, interval_minutes):
+        search_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO saved_searches VALUES (?, ?, ?, ?, ?, NULL)",
+                               (search_id, name, json.dumps(parameters), interval_minutes,
+                                datetime.now().isoformat()))
+        return self.get_search(search_id)
+
+    def get_search(self, search_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM saved_searches WHERE id = ?", (search_id,)).fetchone()
+        return search_row(row) if row else None
+
+    def list_searches(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM saved_searches ORDER BY created_at").fetchall()
+        return [search_row(row) for row in rows]
+
+    def delete_search(self, search_id):
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM saved_searches WHERE id = ?", (search_id,)).rowcount > 0
+
+    def mark_search_run(self, search_id):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE saved_searches SET last_run_at = ? WHERE id = ?",
+                               (datetime.now().isoformat(), search_id))
+
+    def close(self):
+        self._conn.close()
+
+
+_job_store = None
+_job_store_lock = threading.Lock()
+
+
+def get_job_store():
+    """Process-wide JobStore, opened on first use"""
+    global _job_store
+    with _job_store_lock:
+        if _job_store is None:
+            _job_store = JobStore()
+        return _job_store
@@ -1,16 +1,34 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 from urllib.parse import quote_plus
 import time
 from datetime import datetime
+import json
+import os
 import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import http_engine
+import scrape_tasks
+from job_cache import get_company_cache, get_job_cache, normalize_company_url
+from parsers import DEFAULT_PARSER, PARSERS, get_parser
+from dedup import DedupIndex, dedup_key, get_seen_jobs_store
+from driver_pool import DriverPool, PoolExhausted
+from watermarks import get_watermark_store, query_key
+from job_store import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, get_job_store
+from compression import compress_response
+from scrape_scheduler import SCHEDULER_ENABLED, ScrapeScheduler
+from fetch_scheduler import CircuitOpen, FetchError, describe_error, fetch_once, get_fetch_scheduler
+import metrics
+from metrics import Timings, observe_stage, timed
 
 app = Flask(__name__)
+app.after_request(compress_response)
 
 # --- CONFIGURATION ---
 # DATE_POSTED codes:            # EXPERIENCE_LEVELS codes:          # WORKPLACE_TYPES codes:    
@@ -22,6 +40,9 @@ app = Flask(__name__)
                                 # ["5"] = Director                  
                                 # ["6"] = Executive
 
+# Site the searches run against; point it at fixture_server.py to scrape offline
+LINKEDIN_BASE_URL = os.getenv("LINKEDIN_BASE_URL", "https://www.linkedin.com")
+
 DEFAULT_CONFIG = {
     "job_keyword": "junior developer",
     "countries": ["Belgium", "Netherlands"],
@@ -34,19 +55,65 @@ DEFAULT_CONFIG = {
 MAX_SCROLL_ATTEMPTS = 200
 SCROLL_PAUSE = 5
 DETAIL_PAUSE = 2
+SCROLL_MODES = ["adaptive", "fixed"]
+SCROLL_MODE = "adaptive"     # "adaptive" polls for new cards, "fixed" sleeps SCROLL_PAUSE
+SCROLL_POLL_INTERVAL = 0.25  # Seconds between page checks in adaptive mode
+SCROLL_TIMEOUT = 2           # First wait for new cards, multiplied by SCROLL_BACKOFF after each miss
+SCROLL_BACKOFF = 2
+SCROLL_MAX_TIMEOUT = 10
+SCROLL_PLATEAU_ROUNDS = 3    # Stop after this many scrolls in a row that add no cards
+
+# --- DETAIL WORKERS ---
+DETAIL_WORKERS = 3        # Browsers fetching job detail pages in parallel
+MAX_DETAIL_WORKERS = 8
+
+# --- COUNTRY WORKERS ---
+COUNTRY_WORKERS = 2          # Countries searched at the same time within one scrape
+MAX_COUNTRY_WORKERS = 4
+MAX_CONCURRENT_SEARCHES = 4  # Search browsers open at once across all scrapes
+
+search_slots = threading.BoundedSemaphore(MAX_CONCURRENT_SEARCHES)
+
+# --- BROWSER PROFILE ---
+BROWSER_PROFILES = ["standard", "fast"]
+BROWSER_PROFILE = "standard"  # "fast" runs headless and skips images, CSS, fonts and trackers
+BLOCKED_RESOURCES = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+                     "*.css", "*.woff", "*.woff2", "*.ttf", "*.otf"]
+BLOCKED_TRACKERS = ["*doubleclick.net*", "*google-analytics.com*", "*googletagmanager.com*",
+                    "*px.ads.linkedin.com*", "*snap.licdn.com/li.lms-analytics*", "*bat.bing.com*",
+                    "*connect.facebook.net*", "*analytics.tiktok.com*"]
 
 logging.basicConfig(level=logging.INFO)
 
 # --- HELPER FUNCTIONS ---
-def setup_driver():
-    """Initialize Chrome WebDriver with options"""
+def setup_driver(profile=BROWSER_PROFILE):
+    """
+    Initialize Chrome WebDriver with options.
+
+    The "fast" profile runs headless with the eager page-load strategy (pages
+    count as loaded once the DOM is ready) and blocks images, stylesheets,
+    fonts and known trackers through the DevTools protocol. The scraper only
+    reads the DOM, so none of them change the cards or descriptions.
+    """
     options = Options()
-    options.add_argument("--start-maximized")
     options.add_argument("--incognito")
-    return webdriver.Chrome(options=options)
+    if profile != "fast":
+        options.add_argument("--start-maximized")
+        return webdriver.Chrome(options=options)
 
-def build_linkedin_url(keyword, location, exp_levels, workplace_types, date_posted):
-    """Build LinkedIn search URL with filters"""
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.page_load_strategy = "eager"
+    driver = webdriver.Chrome(options=options)
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_RESOURCES + BLOCKED_TRACKERS})
+    return driver
+
+def build_linkedin_url(keyword, location, exp_levels, workplace_types, date_posted, sort_by_date=False):
+    """Build LinkedIn search URL with filters, optionally sorted newest first"""
     exp_param = ",".join(exp_levels) if exp_levels else ""
     workplace_param = ",".join(workplace_types) if workplace_types else ""
     date_param = ""
@@ -54,18 +121,35 @@ def build_linkedin_url(keyword, location, exp_levels, workplace_types, date_post
     elif date_posted == "week": date_param = "r604800"
     elif date_posted == "month": date_param = "r2592000"
 
-    url = f"https://www.linkedin.com/jobs/search/?keywords={quote_plus(keyword)}&location={quote_plus(location)}"
+    url = f"{LINKEDIN_BASE_URL}/jobs/search/?keywords={quote_plus(keyword)}&location={quote_plus(location)}"
     if exp_param: url += f"&f_E={exp_param}"
     if workplace_param: url += f"&f_WT={workplace_param}"
     if date_param: url += f"&f_TPR={date_param}"
+    if sort_by_date: url += "&sortBy=DD"
     url += "&position=1&pageNum=0"
     return url
 
-def scroll_page(driver):
-    """Scroll through job listings to load all jobs"""
+PAGE_STATE_JS = """
+return [document.querySelectorAll('div.base-card').length, document.body.scrollHeight];
+"""
+
+SCROLL_AND_SHOW_MORE_JS = """
+window.scrollTo(0, document.body.scrollHeight);
+var button = document.querySelector('.infinite-scroller__show-more-button');
+if (button && button.offsetParent !== null && !button.disabled) {
+    button.click();
+    return true;
+}
+return false;
+"""
+
+def scroll_page_fixed(driver, timings=None):
+    """Scroll through job listings with fixed SCROLL_PAUSE sleeps"""
+    stats = {"mode": "fixed", "iterations": 0, "load_seconds": 0.0, "wait_seconds": 0.0}
     attempt = 0
     last_height = driver.execute_script("return document.body.scrollHeight")
     while attempt < MAX_SCROLL_ATTEMPTS:
+        started = time.perf_counter()
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
         time.sleep(SCROLL_PAUSE)
         try:
@@ -76,101 +160,928 @@ def scroll_page(driver):
             time.sleep(SCROLL_PAUSE)
         except:
             pass
+        # Fixed sleeps cannot tell when the page finished loading, so all of it counts as waiting
+        stats["wait_seconds"] += time.perf_counter() - started
+        stats["iterations"] += 1
         new_height = driver.execute_script("return document.body.scrollHeight")
+        observe_stage("scroll_iteration", time.perf_counter() - started, timings)
         if new_height == last_height:
             break
         last_height = new_height
         attempt += 1
+    return stats
 
-def fetch_job_details(driver, job_url):
-    """Fetch full job and company descriptions"""
-    job_desc = ""
-    company_desc = ""
-    if not job_url: 
-        return job_desc, company_desc
-    try:
-        driver.get(job_url)
+def adaptive_scroll_steps(driver, stats, timings=None):
+    """
+    Scroll through job listings, waiting only until new cards show up.
+
+    After each scroll (and show-more click) the card count and scrollHeight
+    are polled every SCROLL_POLL_INTERVAL seconds. Time until the page
+    changes is counted as loading; a poll that times out is counted as
+    waiting and backs the next timeout off. Scrolling stops once the card
+    count has not grown for SCROLL_PLATEAU_ROUNDS scrolls in a row.
+
+    Yields after every scroll so callers can pick up the new cards; timings
+    are accumulated in `stats`, and each scroll is observed as a
+    "scroll_iteration" stage (see metrics.py).
+    """
+    stats.update({"mode": "adaptive", "iterations": 0, "load_seconds": 0.0, "wait_seconds": 0.0})
+    cards, height = driver.execute_script(PAGE_STATE_JS)
+    timeout = SCROLL_TIMEOUT
+    plateau = 0
+    while stats["iterations"] < MAX_SCROLL_ATTEMPTS and plateau < SCROLL_PLATEAU_ROUNDS:
+        stats["iterations"] += 1
+        iteration_started = time.perf_counter()
+        driver.execute_script(SCROLL_AND_SHOW_MORE_JS)
+        started = time.perf_counter()
+        new_cards, new_height = cards, height
+        while time.perf_counter() - started < timeout:
+            time.sleep(SCROLL_POLL_INTERVAL)
+            new_cards, new_height = driver.execute_script(PAGE_STATE_JS)
+            if new_cards != cards or new_height != height:
+                break
+        elapsed = time.perf_counter() - started
+
+        if new_cards == cards and new_height == height:
+            stats["wait_seconds"] += elapsed
+            timeout = min(timeout * SCROLL_BACKOFF, SCROLL_MAX_TIMEOUT)
+        else:
+            stats["load_seconds"] += elapsed
+            timeout = SCROLL_TIMEOUT
+        plateau = plateau + 1 if new_cards <= cards else 0
+        cards, height = new_cards, new_height
+        stats["cards"] = cards
+        observe_stage("scroll_iteration", time.perf_counter() - iteration_started, timings)
+        yield
+
+    stats["cards"] = cards
+
+def scroll_page_adaptive(driver, timings=None):
+    """Scroll through job listings until no new cards load (see adaptive_scroll_steps)"""
+    stats = {}
+    for _ in adaptive_scroll_steps(driver, stats, timings):
+        pass
+    return stats
+
+def round_scroll_stats(stats):
+    stats["load_seconds"] = round(stats["load_seconds"], 3)
+    stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+    logging.info(f"Scrolled {stats['iterations']} times: {stats['load_seconds']}s loading, "
+                 f"{stats['wait_seconds']}s waiting")
+    return stats
+
+def scroll_page(driver, mode=SCROLL_MODE, timings=None):
+    """Scroll through job listings to load all jobs and return timing stats"""
+    stats = scroll_page_fixed(driver, timings) if mode == "fixed" else scroll_page_adaptive(driver, timings)
+    return round_scroll_stats(stats)
+
+# Returns the fields of every card not returned before and marks those cards,
+# so each call only serializes the cards that appeared since the last one.
+EXTRACT_NEW_CARDS_JS = """
+function text(el) { return el ? el.textContent.trim() : ''; }
+var cards = document.querySelectorAll('div.base-card:not([data-jobscope-seen])');
+var result = [];
+for (var i = 0; i < cards.length; i++) {
+    var card = cards[i];
+    card.setAttribute('data-jobscope-seen', '1');
+    var link = card.querySelector('a.base-card__full-link');
+    var subtitle = card.querySelector('h4.base-search-card__subtitle');
+    var company = subtitle ? subtitle.querySelector('a') : null;
+    var time = card.querySelector('time.job-search-card__listdate');
+    result.push({
+        job_title: link ? text(link.querySelector('span.sr-only')) : '',
+        company_name: text(company),
+        company_url: company ? (company.getAttribute('href') || '').trim() : '',
+        location: text(card.querySelector('span.job-search-card__location')),
+        benefit: text(card.querySelector('span.job-posting-benefits__text')),
+        posted: text(time),
+        posted_date: time ? (time.getAttribute('datetime') || '').trim() : '',
+        job_url: link ? (link.getAttribute('href') || '').trim() : ''
+    });
+}
+return result;
+"""
+
+CARD_FIELDS = ["job_title", "company_name", "company_url", "location", "benefit", "posted", "posted_date",
+               "job_url"]
+
+def extract_new_cards(driver):
+    """Fields of the cards that appeared since the last call, read in the browser"""
+    return [{field: card.get(field, "") for field in CARD_FIELDS}
+            for card in driver.execute_script(EXTRACT_NEW_CARDS_JS) or []]
+
+def iter_scrolled_cards(driver, stats, timings=None):
+    """
+    Scroll adaptively and yield each batch of newly loaded cards right away,
+    instead of parsing one page_source once scrolling is over.
+    """
+    with timed("extract_cards", timings):
+        batch = extract_new_cards(driver)
+    if batch:
+        yield batch
+    for _ in adaptive_scroll_steps(driver, stats, timings):
+        with timed("extract_cards", timings):
+            batch = extract_new_cards(driver)
+        if batch:
+            yield batch
+    round_scroll_stats(stats)
+
+def fetch_job_details(driver, job_url, with_company=True, parser=None, timings=None, scheduler=None):
+    """
+    Fetch full job and company descriptions. Loading goes through
+    `scheduler` (a FetchScheduler) when given; raises FetchError when the
+    page cannot be loaded.
+    """
+    if not job_url:
+        return "", ""
+
+    def load():
+        with timed("page_load", timings):
+            driver.get(job_url)
         time.sleep(DETAIL_PAUSE)
         WebDriverWait(driver, 5).until(
             EC.presence_of_element_located((By.CLASS_NAME, "description__text"))
         )
-        job_soup = BeautifulSoup(driver.page_source, "html.parser")
-        job_div = job_soup.find("div", class_="description__text")
-        job_desc = job_div.get_text(separator="\n", strip=True) if job_div else ""
-        company_div = job_soup.find("div", class_="show-more-less-html__markup")
-        company_desc = company_div.get_text(separator="\n", strip=True) if company_div else ""
-    except Exception as e:
-        logging.error(f"Failed to fetch job detail: {e}")
-    return job_desc, company_desc
 
-def scrape_linkedin_jobs(job_keyword, countries, experience_levels, workplace_types, date_posted):
-    """Main scraping function"""
-    driver = setup_driver()
-    all_jobs = []
-    
-    try:
-        for country in countries:
-            logging.info(f"Scraping LinkedIn Jobs for {country}")
-            url = build_linkedin_url(job_keyword, country, experience_levels, workplace_types, date_posted)
-            logging.info(f"URL: {url}")
-            driver.get(url)
-            scroll_page(driver)
-
-            html = driver.page_source
-            soup = BeautifulSoup(html, "html.parser")
-            job_cards = soup.find_all("div", class_="base-card") 
-            
-            for idx, card in enumerate(job_cards):
+    (scheduler.fetch if scheduler is not None else fetch_once)(job_url, load)
+    with timed("parse_details", timings):
+        return (parser or get_parser()).parse_job_details(driver.page_source, with_company)
+
+def fetch_job_details_http(session, job_url, with_company=True, parser=None, timings=None, scheduler=None):
+    """Fetch full job and company descriptions over plain HTTP (see fetch_job_details)"""
+    if not job_url:
+        return "", ""
+
+    def load():
+        with timed("page_load", timings):
+            return http_engine.fetch_page(session, job_url)
+
+    html = (scheduler.fetch if scheduler is not None else fetch_once)(job_url, load)
+    with timed("parse_details", timings):
+        return (parser or get_parser()).parse_job_details(html, with_company)
+
+# --- FETCH ENGINES ---
+# An engine opens one handle per worker (a driver or an HTTP session) and
+# returns raw HTML; both engines parse it with the same parser backend
+# (see parsers.py). Engines are built per request, and the stages they time
+# add up in their `timings` (a metrics.Timings). Page loads go through the
+# engine's `scheduler` (a FetchScheduler) when it has one.
+
+class SeleniumEngine:
+    """Fetch pages in Chrome, scrolling the result list to load every card"""
+
+    name = "selenium"
+
+    def __init__(self, driver_factory=setup_driver, scroll_mode=SCROLL_MODE, parser=None, pool=None,
+                 scheduler=None, profile=None):
+        self.driver_factory = driver_factory
+        self.scroll_mode = scroll_mode
+        self.parser = parser or get_parser()
+        self.pool = pool
+        self.profile = profile   # Browser profile of the drivers checked out of `pool`
+        self.scheduler = scheduler
+        self.timings = Timings()
+
+    def open(self):
+        """Check a warm driver out of `pool`, or start a fresh one without a pool"""
+        if self.pool is not None:
+            with timed("driver_checkout", self.timings):
+                return self.pool.checkout(kind=self.profile)
+        with timed("driver_startup", self.timings):
+            return self.driver_factory()
+
+    def close(self, driver):
+        if self.pool is not None:
+            self.pool.checkin(driver)
+        else:
+            driver.quit()
+
+    def note_page(self, driver, url):
+        if self.pool is not None:
+            self.pool.note_page(driver, url)
+
+    def iter_cards(self, driver, url, stats):
+        """
+        Yield batches of cards while scrolling, filling `stats` with scroll
+        timings. Fixed mode parses the whole page once scrolling is done.
+        """
+        self.note_page(driver, url)
+
+        def load():
+            with timed("page_load", self.timings):
+                driver.get(url)
+
+        if self.scheduler is not None:
+            self.scheduler.fetch(url, load)
+        else:
+            load()
+        if self.scroll_mode == "fixed":
+            stats.update(scroll_page(driver, "fixed", self.timings))
+            with timed("parse_cards", self.timings):
+                cards = self.parser.parse_job_cards(driver.page_source)
+            yield cards
+        else:
+            yield from iter_scrolled_cards(driver, stats, self.timings)
+
+    def fetch_details(self, driver, job_url, with_company=True):
+        self.note_page(driver, job_url)
+        with timed("fetch_details", self.timings):
+            return fetch_job_details(driver, job_url, with_company, self.parser, self.timings, self.scheduler)
+
+class HttpEngine:
+    """Fetch the public guest pages over pooled keep-alive HTTP connections"""
+
+    name = "http"
+
+    def __init__(self, parser=None, scheduler=None):
+        self.parser = parser or get_parser()
+        self.scheduler = scheduler
+        self.timings = Timings()
+
+    def open(self):
+        return http_engine.create_session()
+
+    def close(self, session):
+        session.close()
+
+    def iter_cards(self, session, url, stats):
+        """Yield the cards of each guest search page as it arrives, filling `stats`"""
+        started = page_started = time.perf_counter()
+        stats.update({"mode": "http", "pages": 0, "load_seconds": 0.0})
+        for html in http_engine.iter_search_pages(session, url, scheduler=self.scheduler):
+            observe_stage("page_load", time.perf_counter() - page_started, self.timings)
+            stats["pages"] += 1
+            stats["load_seconds"] = round(time.perf_counter() - started, 3)
+            with timed("parse_cards", self.timings):
+                cards = self.parser.parse_job_cards(html)
+            yield cards
+            page_started = time.perf_counter()
+
+    def fetch_details(self, session, job_url, with_company=True):
+        with timed("fetch_details", self.timings):
+            return fetch_job_details_http(session, job_url, with_company, self.parser, self.timings,
+                                          self.scheduler)
+
+ENGINES = ["selenium", "http"]
+DEFAULT_ENGINE = "selenium"
+
+driver_pool = None
+_driver_pool_lock = threading.Lock()
+
+def get_driver_pool():
+    """
+    Process-wide DriverPool shared by all /scrape requests, created on first
+    use; browsers of every profile count towards its one size limit
+    """
+    global driver_pool
+    with _driver_pool_lock:
+        if driver_pool is None:
+            driver_pool = DriverPool(setup_driver)
+        return driver_pool
+
+def create_engine(name=DEFAULT_ENGINE, scroll_mode=SCROLL_MODE, parser=DEFAULT_PARSER, pool=None, scheduler=None,
+                  profile=BROWSER_PROFILE):
+    """
+    Build the fetch engine selected on /scrape; Selenium drivers of
+    `profile` come from `pool` and page loads go through `scheduler` when
+    given
+    """
+    if name == "http":
+        return HttpEngine(parser=get_parser(parser), scheduler=scheduler)
+    return SeleniumEngine(scroll_mode=scroll_mode, parser=get_parser(parser), pool=pool, scheduler=scheduler,
+                          profile=profile)
+
+class DetailFetchPool:
+    """
+    Fetch job detail pages on a fixed number of engine handles.
+
+    Each worker thread opens one handle (a driver or an HTTP session) when
+    its first item arrives and pulls (index, job_url) items from a shared
+    queue; jobs can be submitted while the workers are already running.
+    Pooled drivers go back to the pool whenever the queue runs empty. Results are stored by index, so
+    the order of close() output matches the order of submit() calls no
+    matter which worker finished first.
+    `on_result(key, result)` is called from the worker as each fetch ends,
+    with the key given to submit() (the submission index by default).
+
+    With a `company_cache`, the company description is only parsed when the
+    job's company is not cached yet at the time the worker fetches it.
+
+    A page that cannot be loaded (FetchError) or parsed gets empty
+    descriptions and is listed in `failures` with its error, instead of
+    stopping the worker. A worker whose handle cannot be opened puts its
+    item back for the others and stops; items no worker was left to fetch
+    are listed in `failures` by close().
+    """
+
+    def __init__(self, workers=DETAIL_WORKERS, engine=None, on_result=None, company_cache=None):
+        self.workers = max(1, workers)
+        self.engine = engine or SeleniumEngine()
+        self.on_result = on_result
+        self.company_cache = company_cache
+        self.queue = queue.PriorityQueue()   # (0, index, item) before the (1, n, None) stop markers
+        self.results = {}
+        self.worker_stats = []
+        self.failures = []
+        self.submitted = 0
+        self.job_urls = []
+        self.worker_error = None   # Why the last worker that stopped early did
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        for worker_id in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(worker_id,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, job_url, key=None, company_url=""):
+        """Queue a detail fetch and return its result index (thread-safe)"""
+        with self._lock:
+            index = self.submitted
+            self.submitted += 1
+            self.job_urls.append(job_url)
+        self.queue.put((0, index, (index, job_url, index if key is None else key, company_url)))
+        return index
+
+    def close(self, cancel=False):
+        """
+        Wait for the queue to drain and return results in submission order.
+        With `cancel`, jobs that no worker has picked up yet are dropped;
+        otherwise jobs left unfetched because every worker stopped are
+        added to `failures`.
+        """
+        if cancel:
+            try:
+                while True:
+                    self.queue.get_nowait()
+            except queue.Empty:
+                pass
+        for n in range(len(self._threads)):
+            self.queue.put((1, n, None))
+        for thread in self._threads:
+            thread.join()
+        self.worker_stats.sort(key=lambda s: s["worker"])
+        if not cancel:
+            for index in range(self.submitted):
+                if index not in self.results:
+                    metrics.detail_fetch_errors.inc(engine=self.engine.name)
+                    self.failures.append({"job_url": self.job_urls[index], "attempts": 0,
+                                          "error": f"No detail worker left: {self.worker_error}"})
+        return [self.results.get(index, ("", "")) for index in range(self.submitted)]
+
+    def _next_item(self, handle):
+        """
+        The next queued item. A pooled handle is given back while the queue
+        is empty, so idle workers don't hold drivers other scrapes wait for.
+        """
+        if handle is None or getattr(self.engine, "pool", None) is None:
+            return self.queue.get()[2], handle
+        try:
+            return self.queue.get_nowait()[2], handle
+        except queue.Empty:
+            self.engine.close(handle)
+            return self.queue.get()[2], None
+
+    def _run(self, worker_id):
+        stats = {"worker": worker_id, "jobs": 0, "failed": 0, "startup_seconds": 0.0, "busy_seconds": 0.0}
+        handle = None
+        try:
+            while True:
+                item, handle = self._next_item(handle)
+                if item is None:
+                    break
+                if handle is None:
+                    started = time.perf_counter()
+                    try:
+                        handle = self.engine.open()
+                    except Exception:
+                        self.queue.put((0, item[0], item))   # Left for a worker that still has a handle
+                        raise
+                    stats["startup_seconds"] += time.perf_counter() - started
+                index, job_url, key, company_url = item
+                with_company = self.company_cache is None or self.company_cache.get(company_url) is None
+                started = time.perf_counter()
                 try:
-                    a_tag = card.find("a", class_="base-card__full-link")
-                    job_url = a_tag["href"].strip() if a_tag else ""
-                    job_title = a_tag.find("span", class_="sr-only").text.strip() if a_tag and a_tag.find("span", class_="sr-only") else ""
-                    company_tag = card.find("h4", class_="base-search-card__subtitle")
-                    company_a = company_tag.find("a") if company_tag else None
-                    company_name = company_a.text.strip() if company_a else ""
-                    company_url = company_a["href"].strip() if company_a else ""
-                    location = card.find("span", class_="job-search-card__location")
-                    location = location.text.strip() if location else ""
-                    benefit = card.find("span", class_="job-posting-benefits__text")
-                    benefit = benefit.text.strip() if benefit else ""
-                    posted = card.find("time", class_="job-search-card__listdate")
-                    posted = posted.text.strip() if posted else ""
-
-                    logging.info(f"Fetching job: {job_title}")
-                    job_description, company_description = fetch_job_details(driver, job_url)
-
-                    all_jobs.append({
-                        "country": country,
-                        "job_title": job_title,
-                        "company_name": company_name,
-                        "company_url": company_url,
-                        "location": location,
-                        "benefit": benefit,
-                        "posted": posted,
-                        "company_description": company_description,
-                        "job_url": job_url,
-                        "job_description": job_description
-                    })
+                    result = self.engine.fetch_details(handle, job_url, with_company)
                 except Exception as e:
-                    logging.error(f"Error processing job card: {e}")
-                    continue
-    finally:
-        driver.quit()
-    
+                    error, attempts = (e.reason, e.attempts) if isinstance(e, FetchError) else (describe_error(e), 1)
+                    logging.error(f"Failed to fetch job detail: {e}")
+                    metrics.detail_fetch_errors.inc(engine=self.engine.name)
+                    result = ("", "")
+                    stats["failed"] += 1
+                    with self._lock:
+                        self.failures.append({"job_url": job_url, "error": error, "attempts": attempts})
+                stats["busy_seconds"] += time.perf_counter() - started
+                stats["jobs"] += 1
+                with self._lock:
+                    self.results[index] = result
+                if self.on_result:
+                    try:
+                        self.on_result(key, result)
+                    except Exception as e:
+                        logging.error(f"Detail result callback failed: {e}")
+        except Exception as e:
+            logging.error(f"Detail worker {worker_id} stopped: {e}")
+            stats["error"] = describe_error(e)
+            with self._lock:
+                self.worker_error = stats["error"]
+        finally:
+            if handle is not None:
+                self.engine.close(handle)
+            stats["startup_seconds"] = round(stats["startup_seconds"], 3)
+            stats["busy_seconds"] = round(stats["busy_seconds"], 3)
+            with self._lock:
+                self.worker_stats.append(stats)
+
+def search_country(job_keyword, country, experience_levels, workplace_types, date_posted, engine=None,
+                   on_batch=None, sort_by_date=False):
+    """
+    Run the search phase for one country on its own engine handle.
+    Cards are passed to `on_batch(cards)` batch by batch as they load; when
+    it returns True no more results are loaded.
+    Returns (cards, search_stats).
+    """
+    engine = engine or SeleniumEngine()
+    cards = []
+    search_stats = {}
+    with search_slots:
+        logging.info(f"Scraping LinkedIn Jobs for {country}")
+        url = build_linkedin_url(job_keyword, country, experience_levels, workplace_types, date_posted,
+                                 sort_by_date)
+        logging.info(f"URL: {url}")
+        handle = engine.open()
+        try:
+            for batch in engine.iter_cards(handle, url, search_stats):
+                cards.extend(batch)
+                if on_batch and on_batch(batch):
+                    break
+        finally:
+            engine.close(handle)
+    return cards, search_stats
+
+def search_countries(job_keyword, countries, experience_levels, workplace_types, date_posted,
+                     country_workers=COUNTRY_WORKERS, engine=None, stats=None, on_batch=None,
+                     sort_by_date=False):
+    """
+    Search several countries at the same time.
+
+    Up to `country_workers` countries run in parallel for this call, and
+    search_slots caps the number of open searches across all calls.
+    `on_batch(country_index, cards)` receives cards as they load and can
+    return True to stop that country's search.
+    Returns (country, card) pairs in the order of `countries`.
+    """
+    def timed_search(country_index, country):
+        started = time.perf_counter()
+        batch_callback = (lambda batch: on_batch(country_index, batch)) if on_batch else None
+        cards, search_stats = search_country(job_keyword, country, experience_levels, workplace_types,
+                                             date_posted, engine, batch_callback, sort_by_date)
+        return cards, search_stats, round(time.perf_counter() - started, 3)
+
+    workers = max(1, min(country_workers, len(countries)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="country") as executor:
+        futures = [executor.submit(timed_search, index, country) for index, country in enumerate(countries)]
+        results = [future.result() for future in futures]
+
+    country_stats = []
+    all_cards = []
+    for country, (cards, search_stats, seconds) in zip(countries, results):
+        all_cards.extend((country, card) for card in cards)
+        country_stats.append({"country": country, "cards": len(cards), "seconds": seconds,
+                              "search": search_stats})
+    if stats is not None:
+        stats["countries"] = country_stats
+    return all_cards
+
+def build_job(country, card, details, countries=None):
+    """
+    Combine a search card and its (job, company) descriptions into a job dict.
+    `countries` lists every country the posting matched (default: [country]).
+    """
+    job_description, company_description = details
+    return {
+        "country": country,
+        "countries": countries or [country],
+        "job_title": card["job_title"],
+        "company_name": card["company_name"],
+        "company_url": card["company_url"],
+        "location": card["location"],
+        "benefit": card["benefit"],
+        "posted": card["posted"],
+        "posted_date": card["posted_date"],
+        "company_description": company_description,
+        "job_url": card["job_url"],
+        "job_description": job_description
+    }
+
+def scrape_linkedin_jobs(job_keyword, countries, experience_levels, workplace_types, date_posted,
+                         detail_workers=DETAIL_WORKERS, country_workers=COUNTRY_WORKERS,
+                         engine=None, cache=None, company_cache=None, dedup=None, watermarks=None,
+                         stats=None, on_cards=None, on_job=None):
+    """
+    Main scraping function
+
+    Countries are searched in parallel by search_countries. Cards are handed
+    to a DetailFetchPool of `detail_workers` handles as soon as they load,
+    so detail pages are fetched while the result lists are still scrolling.
+    The `engine` decides how pages are fetched (SeleniumEngine by default).
+    Jobs found in `cache` (a JobCache) are not fetched again, and company
+    descriptions found in `company_cache` (a CompanyCache) are not parsed
+    again for other postings of the same company. With a `dedup` index
+    (a DedupIndex) a posting found under several countries is kept and
+    fetched once and lists all of them in "countries"; postings an earlier
+    run returned reuse the details the index has stored for them.
+    With `watermarks` (a WatermarkStore) the scrape is incremental: results
+    are sorted by date, each country's search stops once it reaches postings
+    an earlier run of the same query returned, and only new postings are
+    fetched and returned; postings whose details could not be fetched are
+    returned again by the next run.
+    Pass a dict as `stats` to receive timings, the engine's per-stage
+    timing breakdown, cache hit/miss counts and the detail pages that could
+    not be loaded (`failed_details`; their jobs have empty descriptions).
+    `on_cards(count)` is called with the running card total as cards load and
+    `on_job(job)` every time a job's details arrive, in completion order.
+    Returned jobs are ordered by country, then by position in the results.
+    """
+    engine = engine or SeleniumEngine()
+    country_cards = [[] for _ in countries]
+    details = {}
+    cache_stats = {"hits": 0, "misses": 0}
+    company_stats = {"hits": 0, "misses": 0}
+    stats_lock = threading.Lock()
+    queries = [query_key(job_keyword, country, experience_levels, workplace_types, date_posted)
+               for country in countries]
+    marks = [watermarks.load(query) for query in queries] if watermarks is not None else None
+
+    def job_countries(key):
+        if dedup is None:
+            return None
+        return sorted(dedup.countries_for(key), key=countries.index)
+
+    def confirm_watermarks(card, result):
+        # A posting whose details could not be fetched stays new for the next run
+        if marks is not None and result[0]:
+            for mark in marks:
+                mark.confirm(dedup_key(card))
+
+    def on_result(key, result):
+        country_index, card_index = key
+        card = country_cards[country_index][card_index]
+        if company_cache is not None:
+            job_description, company_description = result
+            if company_description:
+                company_cache.put(card["company_url"], company_description)
+            else:
+                company_description = company_cache.get(card["company_url"]) or ""
+            with stats_lock:
+                company_stats["misses" if result[1] else "hits"] += 1
+            result = (job_description, company_description)
+        details[key] = result
+        confirm_watermarks(card, result)
+        if cache is not None:
+            cache.put(card["job_url"], result)
+        if on_job:
+            on_job(build_job(countries[country_index], card, result, job_countries(key)))
+
+    pool = DetailFetchPool(detail_workers, engine, on_result, company_cache).start()
+
+    def on_batch(country_index, batch):
+        if marks is not None:
+            batch = [card for card in batch if marks[country_index].is_new(card)]
+        new_cards = []
+        with stats_lock:
+            for card in batch:
+                key = (country_index, len(country_cards[country_index]))
+                if dedup is None or dedup.add(card, countries[country_index], key):
+                    country_cards[country_index].append(card)
+                    new_cards.append((key, card))
+            total = sum(len(cards) for cards in country_cards)
+        if on_cards:
+            on_cards(total)
+        for key, card in new_cards:
+            cached = cache.get(card["job_url"]) if cache is not None and card["job_url"] else None
+            with stats_lock:
+                cache_stats["hits" if cached else "misses"] += 1
+            if not cached and dedup is not None:
+                cached = dedup.known_details(key, card["job_url"])
+            if cached:
+                details[key] = cached
+                confirm_watermarks(card, cached)
+                if on_job:
+                    on_job(build_job(countries[country_index], card, cached, job_countries(key)))
+                continue
+            logging.info(f"Fetching job: {card['job_title']}")
+            pool.submit(card["job_url"], key, card["company_url"])
+        return marks is not None and marks[country_index].should_stop()
+
+    try:
+        search_countries(job_keyword, countries, experience_levels, workplace_types, date_posted,
+                         country_workers, engine, stats, on_batch, sort_by_date=marks is not None)
+    except Exception:
+        pool.close(cancel=True)
+        raise
+    pool.close()
+
+    all_jobs = []
+    for country_index, country in enumerate(countries):
+        for card_index, card in enumerate(country_cards[country_index]):
+            key = (country_index, card_index)
+            all_jobs.append(build_job(country, card, details.get(key, ("", "")), job_countries(key)))
+    if dedup is not None:
+        dedup.commit()
+    if marks is not None:
+        for query, mark in zip(queries, marks):
+            watermarks.save(query, mark)
+
+    if stats is not None:
+        stats["detail_workers"] = pool.worker_stats
+        stats["failed_details"] = pool.failures
+        stats["timings"] = engine.timings.to_dict()
+        if cache is not None:
+            stats["cache"] = cache_stats
+        if company_cache is not None:
+            stats["company_cache"] = company_stats
+        if dedup is not None:
+            stats["dedup"] = dedup.stats
+        if marks is not None:
+            stats["watermarks"] = [dict(mark.stats, country=country) for country, mark in zip(countries, marks)]
     return all_jobs
 
+JOB_FIELDS = ["country", "countries", "job_title", "company_name", "company_url", "location", "benefit",
+              "posted", "posted_date", "company_description", "job_url", "job_description"]
+DESCRIPTION_FIELDS = ["company_description", "job_description"]
+FIELD_SETS = {
+    "all": JOB_FIELDS,
+    "card": [field for field in JOB_FIELDS if field not in DESCRIPTION_FIELDS],
+}
+
+def read_fields(value):
+    """
+    Job fields selected by a `fields` option: a FIELD_SETS name, a
+    comma-separated string or a list of field names (None means all).
+    Raises ValueError for unknown fields.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        if value in FIELD_SETS:
+            return FIELD_SETS[value]
+        value = [field.strip() for field in value.split(",") if field.strip()]
+    if not isinstance(value, list) or not value or any(field not in JOB_FIELDS for field in value):
+        raise ValueError(value)
+    return value
+
+def project_jobs(jobs, fields):
+    """Keep only `fields` of every job (all of them when fields is None)"""
+    if fields is None:
+        return jobs
+    return [{field: job[field] for field in fields if field in job} for job in jobs]
+
+def compact_jobs(jobs):
+    """
+    Store each company once: returns (jobs, companies) where companies maps a
+    normalized company_url to its name and description, and every job keeps
+    only company_url as the reference. Jobs without a company_url are kept whole.
+    """
+    companies = {}
+    compact = []
+    for job in jobs:
+        key = normalize_company_url(job["company_url"])
+        if not key:
+            compact.append(job)
+            continue
+        company = companies.setdefault(key, {"company_name": job["company_name"], "company_description": ""})
+        if not company["company_description"]:
+            company["company_description"] = job["company_description"]
+        job = {k: v for k, v in job.items() if k not in ("company_name", "company_description")}
+        job["company_url"] = key
+        compact.append(job)
+    return compact, companies
+
+def read_scrape_parameters(data):
+    """
+    Apply defaults to a /scrape request body and validate it.
+    Returns (parameters, None) or (None, error_body).
+    """
+    parameters = {
+        "job_keyword": data.get('job_keyword', DEFAULT_CONFIG['job_keyword']),
+        "countries": data.get('countries', DEFAULT_CONFIG['countries']),
+        "date_posted": data.get('date_posted', DEFAULT_CONFIG['date_posted']),
+        "experience_levels": data.get('experience_levels', DEFAULT_CONFIG['experience_levels']),
+        "workplace_types": data.get('workplace_types', DEFAULT_CONFIG['workplace_types']),
+        "detail_workers": data.get('detail_workers', DETAIL_WORKERS),
+        "country_workers": data.get('country_workers', COUNTRY_WORKERS),
+        "scroll_mode": data.get('scroll_mode', SCROLL_MODE),
+        "engine": data.get('engine', DEFAULT_ENGINE),
+        "parser": data.get('parser', DEFAULT_PARSER),
+        "browser_profile": data.get('browser_profile', BROWSER_PROFILE),
+        "use_cache": data.get('use_cache', True),
+        "compact": data.get('compact', False),
+        "dedupe": data.get('dedupe', True),
+        "dedupe_across_runs": data.get('dedupe_across_runs', False),
+        "incremental": data.get('incremental', False),
+        "fields": data.get('fields'),
+        "page_size": data.get('page_size')
+    }
+
+    countries = parameters["countries"]
+    if not isinstance(countries, list) or len(countries) == 0:
+        return None, {
+            "error": "countries must be a non-empty list",
+            "code": "INVALID_COUNTRIES"
+        }
+
+    if parameters["date_posted"] not in ["any", "24h", "week", "month"]:
+        return None, {
+            "error": f"date_posted must be one of: any, 24h, week, month",
+            "code": "INVALID_DATE_POSTED"
+        }
+
+    detail_workers = parameters["detail_workers"]
+    if not isinstance(detail_workers, int) or isinstance(detail_workers, bool) \
+            or not 1 <= detail_workers <= MAX_DETAIL_WORKERS:
+        return None, {
+            "error": f"detail_workers must be an integer between 1 and {MAX_DETAIL_WORKERS}",
+            "code": "INVALID_DETAIL_WORKERS"
+        }
+
+    country_workers = parameters["country_workers"]
+    if not isinstance(country_workers, int) or isinstance(country_workers, bool) \
+            or not 1 <= country_workers <= MAX_COUNTRY_WORKERS:
+        return None, {
+            "error": f"country_workers must be an integer between 1 and {MAX_COUNTRY_WORKERS}",
+            "code": "INVALID_COUNTRY_WORKERS"
+        }
+
+    for flag in ["use_cache", "compact", "dedupe", "dedupe_across_runs", "incremental"]:
+        if not isinstance(parameters[flag], bool):
+            return None, {
+                "error": f"{flag} must be true or false",
+                "code": f"INVALID_{flag.upper()}"
+            }
+
+    if parameters["scroll_mode"] not in SCROLL_MODES:
+        return None, {
+            "error": f"scroll_mode must be one of: {', '.join(SCROLL_MODES)}",
+            "code": "INVALID_SCROLL_MODE"
+        }
+
+    if parameters["engine"] not in ENGINES:
+        return None, {
+            "error": f"engine must be one of: {', '.join(ENGINES)}",
+            "code": "INVALID_ENGINE"
+        }
+
+    if parameters["parser"] not in PARSERS:
+        return None, {
+            "error": f"parser must be one of: {', '.join(PARSERS)}",
+            "code": "INVALID_PARSER"
+        }
+
+    if parameters["browser_profile"] not in BROWSER_PROFILES:
+        return None, {
+            "error": f"browser_profile must be one of: {', '.join(BROWSER_PROFILES)}",
+            "code": "INVALID_BROWSER_PROFILE"
+        }
+
+    try:
+        parameters["fields"] = read_fields(parameters["fields"])
+    except ValueError:
+        return None, {
+            "error": f"fields must be one of: {', '.join(FIELD_SETS)}, or a list of: {', '.join(JOB_FIELDS)}",
+            "code": "INVALID_FIELDS"
+        }
+
+    page_size = parameters["page_size"]
+    if page_size is not None and (not isinstance(page_size, int) or isinstance(page_size, bool)
+                                  or not 1 <= page_size <= MAX_PAGE_SIZE):
+        return None, {
+            "error": f"page_size must be an integer between 1 and {MAX_PAGE_SIZE}",
+            "code": "INVALID_PAGE_SIZE"
+        }
+
+    return parameters, None
+
+def create_dedup_index(parameters):
+    """DedupIndex for the dedupe options of a /scrape request, or None"""
+    if not parameters["dedupe"]:
+        return None
+    if not parameters["dedupe_across_runs"]:
+        return DedupIndex()
+    return DedupIndex(get_seen_jobs_store(), get_job_store())
+
+def run_scrape(parameters, stats=None, on_cards=None, on_job=None, search_id=None):
+    """
+    Run scrape_linkedin_jobs with validated /scrape parameters and build the
+    response body. The run and its jobs are recorded in the job store.
+    """
+    logging.info(f"Starting scrape with keyword: {parameters['job_keyword']}, countries: {parameters['countries']}")
+    stats = {} if stats is None else stats
+    store = get_job_store()
+    run_id = store.start_run(parameters, search_id)
+    try:
+        with timed("scrape"):
+            jobs = scrape_with_parameters(parameters, stats, on_cards, on_job)
+    except Exception as e:
+        metrics.scrapes.inc(status="error")
+        store.finish_run(run_id, error=str(e))
+        raise
+    metrics.scrapes.inc(status="success")
+    metrics.jobs_scraped.inc(len(jobs))
+    store.finish_run(run_id, jobs)
+    response = {
+        "status": "success",
+        "timestamp": datetime.now().isoformat(),
+        "run_id": run_id,
+        "total_jobs": len(jobs),
+        "parameters": parameters,
+        "stats": stats,
+        "jobs": jobs
+    }
+    if parameters["page_size"]:
+        # Later pages are read from the job store with GET /jobs?run_id=...&cursor=...
+        first_page = store.query_jobs(run_id=run_id, page_size=parameters["page_size"])
+        response["jobs"], response["next_cursor"] = first_page["jobs"], first_page["next_cursor"]
+    if parameters["compact"]:
+        response["jobs"], response["companies"] = compact_jobs(response["jobs"])
+    response["jobs"] = project_jobs(response["jobs"], parameters["fields"])
+    return response
+
+def scrape_with_parameters(parameters, stats, on_cards=None, on_job=None):
+    """scrape_linkedin_jobs with the engine, caches and worker counts chosen by /scrape parameters"""
+    detail_workers, country_workers = parameters["detail_workers"], parameters["country_workers"]
+    pool = get_driver_pool() if parameters["engine"] == "selenium" else None
+    if pool is not None:
+        # Detail workers only hold a driver while jobs are queued, but a
+        # request alone must still leave room for its search drivers.
+        country_workers = min(country_workers, max(pool.size - 1, 1))
+        detail_workers = min(detail_workers, max(pool.size - country_workers, 1))
+    return scrape_linkedin_jobs(parameters["job_keyword"], parameters["countries"],
+                                parameters["experience_levels"], parameters["workplace_types"],
+                                parameters["date_posted"],
+                                detail_workers=detail_workers,
+                                country_workers=country_workers,
+                                engine=create_engine(parameters["engine"], parameters["scroll_mode"],
+                                                     parameters["parser"], pool, get_fetch_scheduler(),
+                                                     parameters["browser_profile"]),
+                                cache=get_job_cache() if parameters["use_cache"] else None,
+                                company_cache=get_company_cache() if parameters["use_cache"] else None,
+                                dedup=create_dedup_index(parameters),
+                                watermarks=get_watermark_store() if parameters["incremental"] else None,
+                                stats=stats, on_cards=on_cards, on_job=on_job)
+
+def run_saved_search(search):
+    """Scrape a saved search for the scheduler"""
+    parameters, error = read_scrape_parameters(search["parameters"])
+    if error:
+        raise ValueError(error["error"])
+    run_scrape(parameters, search_id=search["search_id"])
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """
+    Process-wide ScrapeScheduler for the saved searches in the job store,
+    created and (with SCHEDULER_ENABLED) started on first use
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ScrapeScheduler(get_job_store(), run_saved_search)
+            if SCHEDULER_ENABLED:
+                _scheduler.start()
+        return _scheduler
+
 
 # --- FLASK API ROUTES ---
+@app.before_request
+def start_scheduler():
+    # Whatever server runs the app, saved searches start running with the first request
+    get_scheduler()
+
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
     return jsonify({
         "status": "ok",
         "timestamp": datetime.now().isoformat(),
-        "service": "LinkedIn Job Scraper API"
+        "service": "LinkedIn Job Scraper API",
+        "driver_pool": driver_pool.to_dict() if driver_pool is not None else None,
+        "scheduler": get_scheduler().to_dict(),
+        "fetch_scheduler": get_fetch_scheduler().to_dict()
     }), 200
 
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage timing histograms and scrape counters in the Prometheus text format"""
+    return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route('/scrape', methods=['POST'])
 def scrape():
     """
@@ -182,8 +1093,25 @@ def scrape():
         "countries": ["Belgium", "Netherlands"],
         "date_posted": "24h",
         "experience_levels": [],
-        "workplace_types": ["2", "3"]
+        "workplace_types": ["2", "3"],
+        "detail_workers": 3,
+        "country_workers": 2,
+        "scroll_mode": "adaptive",
+        "engine": "selenium",
+        "parser": "lxml",
+        "browser_profile": "standard",
+        "use_cache": true,
+        "compact": false,
+        "dedupe": true,
+        "dedupe_across_runs": false,
+        "incremental": false,
+        "fields": "all",
+        "page_size": null,
+        "async": false
     }
+
+    With "async": true the scrape runs in the background and a job ID is
+    returned right away (202) for GET /scrape/<id> and /scrape/<id>/stream.
     """
     try:
         data = request.get_json()
@@ -194,45 +1122,34 @@ def scrape():
                 "code": "INVALID_REQUEST"
             }), 400
         
-        # Get parameters with defaults
-        job_keyword = data.get('job_keyword', DEFAULT_CONFIG['job_keyword'])
-        countries = data.get('countries', DEFAULT_CONFIG['countries'])
-        date_posted = data.get('date_posted', DEFAULT_CONFIG['date_posted'])
-        experience_levels = data.get('experience_levels', DEFAULT_CONFIG['experience_levels'])
-        workplace_types = data.get('workplace_types', DEFAULT_CONFIG['workplace_types'])
-        
-        # Validate parameters
-        if not isinstance(countries, list) or len(countries) == 0:
-            return jsonify({
-                "error": "countries must be a non-empty list",
-                "code": "INVALID_COUNTRIES"
-            }), 400
-        
-        if date_posted not in ["any", "24h", "week", "month"]:
+        parameters, error = read_scrape_parameters(data)
+        if error:
+            return jsonify(error), 400
+
+        if parameters["engine"] == "selenium" and get_driver_pool().is_full():
+            return pool_exhausted()
+
+        if data.get('async'):
+            task = scrape_tasks.submit(parameters, lambda task: run_scrape(
+                parameters, on_cards=task.on_cards, on_job=task.on_job))
             return jsonify({
-                "error": f"date_posted must be one of: any, 24h, week, month",
-                "code": "INVALID_DATE_POSTED"
-            }), 400
-        
-        logging.info(f"Starting scrape with keyword: {job_keyword}, countries: {countries}")
-        
-        # Execute scraping
-        jobs = scrape_linkedin_jobs(job_keyword, countries, experience_levels, workplace_types, date_posted)
-        
+                "status": "accepted",
+                "timestamp": datetime.now().isoformat(),
+                "job_id": task.id,
+                "status_url": f"/scrape/{task.id}",
+                "stream_url": f"/scrape/{task.id}/stream"
+            }), 202
+
+        return jsonify(run_scrape(parameters)), 200
+
+    except PoolExhausted:
+        return pool_exhausted()
+    except CircuitOpen as e:
         return jsonify({
-            "status": "success",
-            "timestamp": datetime.now().isoformat(),
-            "total_jobs": len(jobs),
-            "parameters": {
-                "job_keyword": job_keyword,
-                "countries": countries,
-                "date_posted": date_posted,
-                "experience_levels": experience_levels,
-                "workplace_types": workplace_types
-            },
-            "jobs": jobs
-        }), 200
-    
+            "error": str(e),
+            "code": "CIRCUIT_OPEN",
+            "timestamp": datetime.now().isoformat()
+        }), 503
     except Exception as e:
         logging.error(f"Scraping error: {str(e)}")
         return jsonify({
@@ -242,5 +1159,201 @@ def scrape():
         }), 500
 
 
+def pool_exhausted():
+    return jsonify({
+        "error": "All browsers are busy, try again later",
+        "code": "POOL_EXHAUSTED",
+        "timestamp": datetime.now().isoformat()
+    }), 503
+
+
+def not_found(message):
+    return jsonify({
+        "error": message,
+        "code": "NOT_FOUND",
+        "timestamp": datetime.now().isoformat()
+    }), 404
+
+
+def scrape_task_not_found():
+    return not_found("Scrape job not found")
+
+
+@app.route('/scrape/<job_id>', methods=['GET'])
+def scrape_status(job_id):
+    """Progress of a background scrape, with the full result once it has finished"""
+    task = scrape_tasks.get(job_id)
+    if not task:
+        return scrape_task_not_found()
+
+    data = task.to_dict()
+    if task.result:
+        data["result"] = task.result
+    return jsonify(data), 200
+
+
+@app.route('/scrape/<job_id>/stream', methods=['GET'])
+def scrape_stream(job_id):
+    """
+    Stream a background scrape as NDJSON.
+
+    Emits {"type": "job", "job": {...}} as soon as each job's details are
+    fetched, {"type": "progress", ...} while waiting, and a final
+    {"type": "done", ...} line with the task status.
+    """
+    task = scrape_tasks.get(job_id)
+    if not task:
+        return scrape_task_not_found()
+
+    def generate():
+        seen = 0
+        while True:
+            jobs, finished = task.wait_for_jobs(seen)
+            for job in jobs:
+                yield json.dumps({"type": "job", "job": job}) + "\n"
+            seen += len(jobs)
+            if finished:
+                yield json.dumps({"type": "done", **task.to_dict()}) + "\n"
+                return
+            if not jobs:
+                yield json.dumps({"type": "progress", **task.to_dict()["progress"]}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+def read_page_arguments():
+    """(page, page_size) from the query string, or None when they are not integers"""
+    try:
+        return int(request.args.get('page', 1)), int(request.args.get('page_size', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return None
+
+
+def invalid_page():
+    return jsonify({
+        "error": "page and page_size must be integers",
+        "code": "INVALID_PAGE"
+    }), 400
+
+
+@app.route('/jobs', methods=['GET'])
+def stored_jobs():
+    """
+    Page through stored jobs.
+
+    Query parameters (all optional): run_id, job_id, country,
+    posted_since (ISO date), page (from 1) or cursor (next_cursor of the
+    previous page), page_size (up to 200) and fields (see read_fields).
+    A run_id the store doesn't know (never recorded, or pruned by its
+    retention) is a 404 with code RUN_EXPIRED.
+    """
+    paging = read_page_arguments()
+    if paging is None:
+        return invalid_page()
+    page, page_size = paging
+    run_id = request.args.get('run_id')
+    if run_id and get_job_store().get_run(run_id) is None:
+        return jsonify({
+            "error": "Run not found; its results may have expired",
+            "code": "RUN_EXPIRED",
+            "timestamp": datetime.now().isoformat()
+        }), 404
+    try:
+        fields = read_fields(request.args.get('fields'))
+    except ValueError:
+        return jsonify({
+            "error": f"fields must be one of: {', '.join(FIELD_SETS)}, or a comma-separated list of job fields",
+            "code": "INVALID_FIELDS"
+        }), 400
+    try:
+        result = get_job_store().query_jobs(run_id=run_id, job_id=request.args.get('job_id'),
+                                            country=request.args.get('country'),
+                                            posted_since=request.args.get('posted_since'),
+                                            page=page, page_size=page_size, cursor=request.args.get('cursor'))
+    except ValueError:
+        return jsonify({
+            "error": "cursor is not a next_cursor returned by this API",
+            "code": "INVALID_CURSOR"
+        }), 400
+    result["jobs"] = project_jobs(result["jobs"], fields)
+    return jsonify({"status": "success", **result}), 200
+
+
+@app.route('/runs', methods=['GET'])
+def list_runs():
+    """Recorded scrape runs, newest first; filter with ?search_id= and page with page/page_size"""
+    paging = read_page_arguments()
+    if paging is None:
+        return invalid_page()
+    page, page_size = paging
+    result = get_job_store().list_runs(request.args.get('search_id'), page, page_size)
+    return jsonify({"status": "success", **result}), 200
+
+
+@app.route('/runs/<run_id>', methods=['GET'])
+def get_run(run_id):
+    run = get_job_store().get_run(run_id)
+    if not run:
+        return not_found("Run not found")
+    return jsonify({"status": "success", **run}), 200
+
+
+@app.route('/searches', methods=['GET'])
+def list_searches():
+    return jsonify({"status": "success", "searches": get_job_store().list_searches()}), 200
+
+
+@app.route('/searches', methods=['POST'])
+def create_search():
+    """
+    Save a search for the scheduler.
+
+    Request Body:
+    {
+        "name": "Remote juniors",
+        "interval_minutes": 60,
+        "parameters": {...same as POST /scrape...}
+    }
+    """
+    data = request.get_json(silent=True) or {}
+    parameters, error = read_scrape_parameters(data.get('parameters') or {})
+    if error:
+        return jsonify(error), 400
+
+    interval = data.get('interval_minutes')
+    if not isinstance(interval, int) or isinstance(interval, bool) or interval < 1:
+        return jsonify({
+            "error": "interval_minutes must be a positive integer",
+            "code": "INVALID_INTERVAL"
+        }), 400
+
+    search = get_job_store().add_search(data.get('name') or parameters["job_keyword"], parameters, interval)
+    get_scheduler().add(search)
+    return jsonify({"status": "success", **search}), 201
+
+
+@app.route('/searches/<search_id>', methods=['DELETE'])
+def delete_search(search_id):
+    if not get_job_store().delete_search(search_id):
+        return not_found("Saved search not found")
+    get_scheduler().remove(search_id)
+    return jsonify({"status": "success", "search_id": search_id}), 200
+
+
+@app.route('/searches/<search_id>/run', methods=['POST'])
+def run_search_now(search_id):
+    """Queue a saved search right away instead of waiting for its interval"""
+    if not get_job_store().get_search(search_id):
+        return not_found("Saved search not found")
+    queued = get_scheduler().enqueue(search_id)
+    return jsonify({"status": "accepted" if queued else "already_running", "search_id": search_id}), 202
+
+
 if __name__ == '__main__':
+    # With debug=True the reloader runs this file twice; only warm browsers and
+    # start the scheduler in the child process that actually serves requests.
+    # Under other servers the scheduler starts with the first request.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        threading.Thread(target=get_driver_pool().warm, kwargs={"kind": BROWSER_PROFILE}, daemon=True).start()
+        get_scheduler()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,147 @@
+"""
+Prometheus-style metrics and per-request stage timings
+
+Every timed stage of a scrape (driver startup, page loads, scroll
+iterations, parsing, detail fetches) is observed in the process-wide
+`jobscope_stage_seconds` histogram, exposed in the Prometheus text format
+on GET /metrics, and optionally added to a per-request Timings breakdown
+that /scrape returns in stats.timings.
+"""
+
+from contextlib import contextmanager
+import threading
+import time
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self.values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}_total{format_labels(self.labelnames, key)} {format_value(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=STAGE_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            bucket_counts, total, count = self.series.get(key, ((0,) * len(self.buckets), 0.0, 0))
+            bucket_counts = tuple(n + (value <= bound) for n, bound in zip(bucket_counts, self.buckets))
+            self.series[key] = (bucket_counts, total + value, count + 1)
+
+    def samples(self):
+        with self._lock:
+            series = dict(self.series)
+        names = self.labelnames + ("le",)
+        for key, (bucket_counts, total, count) in sorted(series.items()):
+            for bound, n in zip(self.buckets, bucket_counts):
+                yield f"{self.name}_bucket{format_labels(names, key + (format_value(bound),))} {n}"
+            yield f"{self.name}_bucket{format_labels(names, key + ('+Inf',))} {count}"
+            yield f"{self.name}_sum{format_labels(self.labelnames, key)} {total!r}"
+            yield f"{self.name}_count{format_labels(self.labelnames, key)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+stage_seconds = REGISTRY.register(Histogram(
+    "jobscope_stage_seconds", "Time spent in each scrape stage", ["stage"]))
+scrapes = REGISTRY.register(Counter(
+    "jobscope_scrapes", "Scrapes run, by outcome", ["status"]))
+jobs_scraped = REGISTRY.register(Counter(
+    "jobscope_jobs_scraped", "Jobs returned by scrapes"))
+detail_fetch_errors = REGISTRY.register(Counter(
+    "jobscope_detail_fetch_errors", "Job detail pages that could not be fetched or parsed", ["engine"]))
+
+
+class Timings:
+    """Per-request totals of the stages observed with observe_stage()"""
+
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            count, total, longest = self.stages.get(stage, (0, 0.0, 0.0))
+            self.stages[stage] = (count + 1, total + seconds, max(longest, seconds))
+
+    def to_dict(self):
+        with self._lock:
+            stages = dict(self.stages)
+        return {stage: {"count": count, "seconds": round(total, 3), "max_seconds": round(longest, 3)}
+                for stage, (count, total, longest) in stages.items()}
+
+
+def observe_stage(stage, seconds, timings=None):
+    """Record one run of a stage globally and, when given, in a request's Timings"""
+    stage_seconds.observe(seconds, stage=stage)
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def timed(stage, timings=None):
+    """Time the body of a with-block as one run of `stage`"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started, timings)
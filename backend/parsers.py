@@ -0,0 +1,213 @@
+"""
+HTML parser backends for LinkedIn search cards and job pages
+
+"bs4" is the original BeautifulSoup + html.parser implementation. "lxml"
+parses with libxml2 and pulls all fields of a card in a single walk over
+its elements instead of one find() per field. Both return identical dicts;
+benchmark.py compares them on the recorded fixtures.
+"""
+
+from bs4 import BeautifulSoup
+import logging
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # lxml is optional, the bs4 parser is always available
+    lxml = None
+
+
+# --- BEAUTIFULSOUP ---
+def parse_job_card(card):
+    """Extract the search-result fields of a single base-card"""
+    a_tag = card.find("a", class_="base-card__full-link")
+    job_url = a_tag["href"].strip() if a_tag else ""
+    job_title = a_tag.find("span", class_="sr-only").text.strip() if a_tag and a_tag.find("span", class_="sr-only") else ""
+    company_tag = card.find("h4", class_="base-search-card__subtitle")
+    company_a = company_tag.find("a") if company_tag else None
+    company_name = company_a.text.strip() if company_a else ""
+    company_url = company_a["href"].strip() if company_a else ""
+    location = card.find("span", class_="job-search-card__location")
+    location = location.text.strip() if location else ""
+    benefit = card.find("span", class_="job-posting-benefits__text")
+    benefit = benefit.text.strip() if benefit else ""
+    posted_tag = card.find("time", class_="job-search-card__listdate")
+    posted = posted_tag.text.strip() if posted_tag else ""
+    posted_date = posted_tag.get("datetime", "").strip() if posted_tag else ""
+    return {
+        "job_title": job_title,
+        "company_name": company_name,
+        "company_url": company_url,
+        "location": location,
+        "benefit": benefit,
+        "posted": posted,
+        "posted_date": posted_date,
+        "job_url": job_url,
+    }
+
+
+def parse_job_cards(html):
+    """Extract every base-card on a search results page"""
+    soup = BeautifulSoup(html, "html.parser")
+    cards = []
+    for card in soup.find_all("div", class_="base-card"):
+        try:
+            cards.append(parse_job_card(card))
+        except Exception as e:
+            logging.error(f"Error processing job card: {e}")
+            continue
+    return cards
+
+
+def parse_job_details(html, with_company=True):
+    """
+    Extract job and company descriptions from a job page.
+    The company description is skipped when `with_company` is False.
+    """
+    job_soup = BeautifulSoup(html, "html.parser")
+    job_div = job_soup.find("div", class_="description__text")
+    job_desc = job_div.get_text(separator="\n", strip=True) if job_div else ""
+    company_desc = ""
+    if with_company:
+        company_div = job_soup.find("div", class_="show-more-less-html__markup")
+        company_desc = company_div.get_text(separator="\n", strip=True) if company_div else ""
+    return job_desc, company_desc
+
+
+# --- LXML ---
+# BeautifulSoup's get_text() leaves out comments, <script>, <style> and
+# <template> contents; _strings() does the same so the output matches.
+SKIPPED_TEXT_TAGS = ("script", "style", "template")
+
+
+def _strings(element):
+    """Text nodes under an lxml element in document order, like BeautifulSoup"""
+    if isinstance(element.tag, str) and element.tag not in SKIPPED_TEXT_TAGS and element.text:
+        yield element.text
+    for child in element:
+        yield from _strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def _text(element):
+    return "".join(_strings(element))
+
+
+def _has_class(element, name):
+    return name in (element.get("class") or "").split()
+
+
+def _parse_html(html):
+    try:
+        return lxml.html.fromstring(html)
+    except (etree.ParserError, ValueError):
+        return None
+
+
+def parse_job_card_lxml(card):
+    """Extract the fields of a base-card in one walk over its elements"""
+    a_tag = title = company_tag = company_a = location = benefit = posted = None
+    for element in card.iter(tag=etree.Element):
+        tag = element.tag
+        if tag == "a":
+            if a_tag is None and _has_class(element, "base-card__full-link"):
+                a_tag = element
+            elif company_a is None and company_tag is not None and company_tag in element.iterancestors():
+                company_a = element
+        elif tag == "span":
+            if title is None and a_tag is not None and _has_class(element, "sr-only") \
+                    and a_tag in element.iterancestors():
+                title = element
+            elif location is None and _has_class(element, "job-search-card__location"):
+                location = element
+            elif benefit is None and _has_class(element, "job-posting-benefits__text"):
+                benefit = element
+        elif tag == "h4":
+            if company_tag is None and _has_class(element, "base-search-card__subtitle"):
+                company_tag = element
+        elif tag == "time":
+            if posted is None and _has_class(element, "job-search-card__listdate"):
+                posted = element
+
+    return {
+        "job_title": _text(title).strip() if title is not None else "",
+        "company_name": _text(company_a).strip() if company_a is not None else "",
+        "company_url": company_a.attrib["href"].strip() if company_a is not None else "",
+        "location": _text(location).strip() if location is not None else "",
+        "benefit": _text(benefit).strip() if benefit is not None else "",
+        "posted": _text(posted).strip() if posted is not None else "",
+        "posted_date": (posted.get("datetime") or "").strip() if posted is not None else "",
+        "job_url": a_tag.attrib["href"].strip() if a_tag is not None else "",
+    }
+
+
+def parse_job_cards_lxml(html):
+    """Extract every base-card on a search results page with lxml"""
+    root = _parse_html(html)
+    if root is None:
+        return []
+    cards = []
+    for card in root.iter("div"):
+        if not _has_class(card, "base-card"):
+            continue
+        try:
+            cards.append(parse_job_card_lxml(card))
+        except Exception as e:
+            logging.error(f"Error processing job card: {e}")
+            continue
+    return cards
+
+
+def parse_job_details_lxml(html, with_company=True):
+    """Extract job and company descriptions from a job page with lxml"""
+    root = _parse_html(html)
+    job_div = company_div = None
+    if root is not None:
+        for div in root.iter("div"):
+            if job_div is None and _has_class(div, "description__text"):
+                job_div = div
+            if with_company and company_div is None and _has_class(div, "show-more-less-html__markup"):
+                company_div = div
+            if job_div is not None and (company_div is not None or not with_company):
+                break
+
+    def get_text(element):
+        return "\n".join(s.strip() for s in _strings(element) if s.strip()) if element is not None else ""
+
+    return get_text(job_div), get_text(company_div)
+
+
+# --- BACKENDS ---
+class SoupParser:
+    """BeautifulSoup with Python's html.parser"""
+
+    name = "bs4"
+
+    def parse_job_cards(self, html):
+        return parse_job_cards(html)
+
+    def parse_job_details(self, html, with_company=True):
+        return parse_job_details(html, with_company)
+
+
+class LxmlParser:
+    """libxml2 via lxml, single pass per card"""
+
+    name = "lxml"
+
+    def parse_job_cards(self, html):
+        return parse_job_cards_lxml(html)
+
+    def parse_job_details(self, html, with_company=True):
+        return parse_job_details_lxml(html, with_company)
+
+
+PARSERS = {"bs4": SoupParser()}
+if lxml is not None:
+    PARSERS["lxml"] = LxmlParser()
+DEFAULT_PARSER = "lxml" if "lxml" in PARSERS else "bs4"
+
+
+def get_parser(name=DEFAULT_PARSER):
+    return PARSERS[name]
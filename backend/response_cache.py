@@ -0,0 +1,156 @@
+"""
+Cache of chat answers for identical prompts
+
+Many users ask the same questions ("which of these jobs are remote?") about
+the same jobs, so answers are cached by a hash of everything that shapes
+them: the system prompt context, the jobs sent with the message, the
+conversation history so far and the normalized message. Entries expire
+RESPONSE_CACHE_TTL seconds after they were stored and the least recently
+used are evicted above RESPONSE_CACHE_SIZE entries or RESPONSE_CACHE_BYTES
+of answer text.
+
+Identical requests arriving while the first one is still waiting for Gemini
+are coalesced: they wait for its answer (or its error) instead of making
+their own call. A streamed answer is coalesced too: the requests waiting for
+it get it in one piece once the stream has ended.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import Future
+import threading
+import time
+
+from chat_sessions import context_key
+
+RESPONSE_CACHE_SIZE = 500                  # Answers kept before the least recently used is evicted
+RESPONSE_CACHE_BYTES = 16 * 1024 * 1024   # Total size of the cached answers (UTF-8) at most
+RESPONSE_CACHE_TTL = 3600                  # Seconds an answer is reused after it was generated
+
+
+def normalize_message(message):
+    """Case, spacing and trailing punctuation don't change the question"""
+    return " ".join(message.casefold().split()).rstrip("?!. ")
+
+
+def response_key(context, jobs_context, history, message):
+    """Cache key of a message sent with `jobs_context` after `history` in a chat with system prompt `context`"""
+    turns = [(entry["role"], entry["content"]) for entry in history]
+    return context_key(context, jobs_context, turns, normalize_message(message))
+
+
+class ResponseCache:
+    """Answers by response key, with TTL, LRU eviction and coalescing of in-flight requests"""
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE, max_bytes=RESPONSE_CACHE_BYTES, ttl=RESPONSE_CACHE_TTL,
+                 clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()   # key -> (answer, size, stored at)
+        self.in_flight = {}            # key -> Future of the answer being generated
+        self.bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evicted": 0, "expired": 0}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """The cached answer, or None; counts a hit or a miss"""
+        with self._lock:
+            answer = self._lookup(key)
+            self.stats["hits" if answer is not None else "misses"] += 1
+            return answer
+
+    def get_or_create(self, key, create):
+        """
+        (answer, source): the cached answer ("hit"), the answer of an
+        identical request in flight ("coalesced"), or create()'s, which is
+        then cached ("miss"). An error of create() is raised to every
+        request waiting for it and nothing is cached.
+        """
+        answer, source = self.claim(key)
+        if source == "hit":
+            return answer, source
+        if source == "coalesced":
+            return answer.result(), source
+
+        try:
+            answer = create()
+        except BaseException as e:
+            self.fail(key, e)
+            raise
+        self.finish(key, answer)
+        return answer, "miss"
+
+    def claim(self, key):
+        """
+        Like get_or_create() for callers that generate the answer
+        themselves, e.g. while streaming it: (cached answer, "hit"),
+        (Future of the answer in flight, "coalesced") or (None, "miss"),
+        after which the caller must finish() or fail() the key.
+        """
+        with self._lock:
+            answer = self._lookup(key)
+            if answer is not None:
+                self.stats["hits"] += 1
+                return answer, "hit"
+            future = self.in_flight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return future, "coalesced"
+            self.in_flight[key] = Future()
+            self.stats["misses"] += 1
+            return None, "miss"
+
+    def finish(self, key, answer):
+        """Cache the answer of a claimed key and hand it to the requests waiting for it"""
+        with self._lock:
+            future = self.in_flight.pop(key, None)
+            self._store(key, answer)
+        if future is not None:
+            future.set_result(answer)
+
+    def fail(self, key, error):
+        """Raise `error` to the requests waiting for a claimed key; nothing is cached"""
+        with self._lock:
+            future = self.in_flight.pop(key, None)
+        if future is not None:
+            future.set_exception(error)
+
+    def put(self, key, answer):
+        with self._lock:
+            self._store(key, answer)
+
+    def _lookup(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        answer, _, stored_at = entry
+        if self.clock() - stored_at > self.ttl:
+            self._remove(key)
+            self.stats["expired"] += 1
+            return None
+        self.entries.move_to_end(key)
+        return answer
+
+    def _store(self, key, answer):
+        size = len(answer.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (answer, size, self.clock())
+        self.bytes += size
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.stats["evicted"] += 1
+
+    def _remove(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.bytes -= size
+
+    def to_dict(self):
+        with self._lock:
+            answered = self.stats["hits"] + self.stats["coalesced"]
+            requests = answered + self.stats["misses"]
+            return dict(self.stats, entries=len(self.entries), bytes=self.bytes, in_flight=len(self.in_flight),
+                        hit_rate=round(answered / requests, 3) if requests else 0.0)
@@ -0,0 +1,104 @@
+"""
+Scheduled runs of saved searches
+
+Each saved search is registered with `schedule` at its interval. A
+background thread checks for due searches every SCHEDULER_TICK seconds and
+hands them to a pool of SCHEDULER_WORKERS threads. A search that is still
+queued or running when it comes due again is skipped, so slow scrapes never
+pile up. Set SCHEDULER_ENABLED=false to keep saved searches from running in
+a process (for example in all but one worker of a multi-process server).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import threading
+
+import schedule
+
+SCHEDULER_WORKERS = 2   # Saved searches scraping at the same time
+SCHEDULER_TICK = 1      # Seconds between checks for due searches
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() not in ("0", "false", "no")
+
+
+class ScrapeScheduler:
+    """Run the saved searches of a JobStore with `run_search(search)`"""
+
+    def __init__(self, store, run_search, workers=SCHEDULER_WORKERS, tick=SCHEDULER_TICK):
+        self.store = store
+        self.run_search = run_search
+        self.workers = workers
+        self.tick = tick
+        self.jobs = schedule.Scheduler()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scheduled-scrape")
+        self.pending = set()
+        self._lock = threading.Lock()
+        self._jobs_lock = threading.Lock()   # `schedule` is not thread-safe: guards self.jobs
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Schedule every saved search and start checking for due ones; later calls do nothing"""
+        with self._lock:
+            if self._thread is not None:
+                return self
+            self._thread = threading.Thread(target=self._loop, name="scrape-scheduler", daemon=True)
+        for search in self.store.list_searches():
+            self.add(search)
+        self._thread.start()
+        return self
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def stop(self):
+        self._stop.set()
+        self.executor.shutdown(wait=False)
+
+    def add(self, search):
+        with self._jobs_lock:
+            self.jobs.every(search["interval_minutes"]).minutes.do(self.enqueue, search["search_id"]) \
+                .tag(search["search_id"])
+
+    def remove(self, search_id):
+        with self._jobs_lock:
+            self.jobs.clear(search_id)
+
+    def enqueue(self, search_id):
+        """Queue a run of a saved search; returns False if one is already queued or running"""
+        with self._lock:
+            if search_id in self.pending:
+                logging.info(f"Saved search {search_id} is still running, skipping this run")
+                return False
+            self.pending.add(search_id)
+        self.executor.submit(self._run, search_id)
+        return True
+
+    def _run(self, search_id):
+        try:
+            search = self.store.get_search(search_id)
+            if search is None:
+                self.remove(search_id)
+                return
+            self.store.mark_search_run(search_id)
+            self.run_search(search)
+        except Exception as e:
+            logging.error(f"Scheduled scrape of {search_id} failed: {e}")
+        finally:
+            with self._lock:
+                self.pending.discard(search_id)
+
+    def _loop(self):
+        while not self._stop.wait(self.tick):
+            # Due jobs only queue runs (enqueue takes self._lock, not this one), so the lock is held briefly
+            with self._jobs_lock:
+                self.jobs.run_pending()
+
+    def to_dict(self):
+        with self._lock:
+            pending = len(self.pending)
+        with self._jobs_lock:
+            scheduled = len(self.jobs.get_jobs())
+        return {"workers": self.workers, "scheduled": scheduled, "pending": pending,
+                "running": self.running}
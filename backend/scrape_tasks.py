@@ -0,0 +1,122 @@
+"""
+Background scrape tasks
+
+POST /scrape with "async": true hands the scrape to a small executor and
+returns a task ID straight away. The task records progress (cards found,
+details fetched, ETA) for GET /scrape/<id> and keeps every finished job so
+GET /scrape/<id>/stream can emit them as soon as they are fetched.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import logging
+import threading
+import time
+import uuid
+
+SCRAPE_TASK_WORKERS = 2   # Scrapes running in the background at the same time
+MAX_FINISHED_TASKS = 50   # Finished tasks kept for polling before the oldest are dropped
+STREAM_POLL_TIMEOUT = 15  # Seconds a stream waits for a job before sending a heartbeat
+
+executor = ThreadPoolExecutor(max_workers=SCRAPE_TASK_WORKERS, thread_name_prefix="scrape-task")
+tasks = {}
+tasks_lock = threading.Lock()
+
+
+class ScrapeTask:
+    """Progress and results of one background scrape"""
+
+    def __init__(self, parameters):
+        self.id = uuid.uuid4().hex
+        self.parameters = parameters
+        self.status = "queued"
+        self.created_at = datetime.now().isoformat()
+        self.finished_at = None
+        self.error = None
+        self.result = None
+        self.cards_found = 0
+        self.jobs = []
+        self._started = None
+        self._details_started = None
+        self._cond = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ("success", "error")
+
+    def on_cards(self, count):
+        """Called with the running number of cards found as result lists load"""
+        with self._cond:
+            self.cards_found = count
+            if self._details_started is None:
+                self._details_started = time.perf_counter()
+
+    def on_job(self, job):
+        """Called every time a job's details have been fetched"""
+        with self._cond:
+            self.jobs.append(job)
+            self._cond.notify_all()
+
+    def eta_seconds(self):
+        """Remaining detail-fetch time extrapolated from the rate so far"""
+        done = len(self.jobs)
+        if not done or self._details_started is None or self.finished:
+            return None
+        elapsed = time.perf_counter() - self._details_started
+        return round(elapsed / done * max(self.cards_found - done, 0), 1)
+
+    def run(self, scrape):
+        self.status = "running"
+        self._started = time.perf_counter()
+        try:
+            self.result = scrape(self)
+            status = "success"
+        except Exception as e:
+            logging.error(f"Scrape task {self.id} failed: {e}")
+            self.error = str(e)
+            status = "error"
+        with self._cond:
+            self.status = status
+            self.finished_at = datetime.now().isoformat()
+            self._cond.notify_all()
+
+    def wait_for_jobs(self, seen, timeout=STREAM_POLL_TIMEOUT):
+        """Block until there are more than `seen` jobs or the task finished"""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.jobs) > seen or self.finished, timeout)
+            return self.jobs[seen:], self.finished
+
+    def to_dict(self):
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "parameters": self.parameters,
+            "progress": {
+                "cards_found": self.cards_found,
+                "details_fetched": len(self.jobs),
+                "elapsed_seconds": round(time.perf_counter() - self._started, 1) if self._started else 0,
+                "eta_seconds": self.eta_seconds(),
+            },
+        }
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+def submit(parameters, scrape):
+    """Queue `scrape(task)` on the background executor and return the task"""
+    task = ScrapeTask(parameters)
+    with tasks_lock:
+        tasks[task.id] = task
+        finished = [t for t in tasks.values() if t.finished]
+        for old in finished[:max(len(finished) - MAX_FINISHED_TASKS, 0)]:
+            del tasks[old.id]
+    executor.submit(task.run, scrape)
+    return task
+
+
+def get(task_id):
+    with tasks_lock:
+        return tasks.get(task_id)
@@ -0,0 +1,466 @@
+"""
+Offline tests for the AI chat service
+
+Gemini is never called, so no API key or network access is needed:
+
+    python -m pytest test_ai_service.py
+"""
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import ai_service
+from chat_sessions import ChatSessionCache
+from conversation_store import MemoryConversationStore, SqliteConversationStore
+from history_summary import HistoryCompactor
+from job_index import JobIndex, estimate_tokens
+from response_cache import ResponseCache
+
+
+class FinishChunk:
+    """A streamed chunk with only a finish reason, whose text raises like Gemini's"""
+
+    @property
+    def text(self):
+        raise ValueError("no text parts")
+
+
+class FakeChat:
+    """Stand-in for a Gemini ChatSession that answers with a canned reply"""
+
+    fail_after = None   # Chunks streamed before raising, to simulate a broken stream
+
+    def __init__(self, history):
+        self.history = list(history)
+        self.sent = []
+
+    def send_message(self, message, stream=False, **kwargs):
+        self.sent.append(message)
+        text = f"Answer {len(self.history) // 2 + 1}: {message}"
+        if stream:
+            return self._stream(message, text)
+        self.history += [{"role": "user", "parts": [message]}, {"role": "model", "parts": ["..."]}]
+        return SimpleNamespace(text=text)
+
+    def _stream(self, message, text):
+        words = text.split(" ")
+        for n, word in enumerate(words):
+            if n == self.fail_after:
+                raise RuntimeError("stream broken")
+            yield SimpleNamespace(text=word if n == 0 else " " + word)
+        yield FinishChunk()
+        # Like Gemini, the exchange joins the history once the stream is consumed
+        self.history += [{"role": "user", "parts": [message]}, {"role": "model", "parts": [text]}]
+
+
+class FakeModel:
+    """Stand-in for genai.GenerativeModel that records the chats it starts"""
+
+    def __init__(self, model_name, system_instruction):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.started = []
+        self.chats = []
+
+    def start_chat(self, history):
+        self.started.append(history)
+        self.chats.append(FakeChat(history))
+        return self.chats[-1]
+
+    def generate_content(self, prompt):
+        return SimpleNamespace(text=f"Summary of {prompt.count('User: ')} user messages")
+
+
+def conversation(turns):
+    history = []
+    for n in range(turns):
+        history.append({"role": "user", "content": f"question {n}", "timestamp": "2025-12-07T10:00:00"})
+        history.append({"role": "assistant", "content": f"answer {n}", "timestamp": "2025-12-07T10:00:01"})
+    return {"history": history, "created_at": "2025-12-07T10:00:00"}
+
+
+@pytest.fixture(autouse=True)
+def memory_store(monkeypatch):
+    store = MemoryConversationStore()
+    monkeypatch.setattr(ai_service, "get_conversation_store", lambda: store)
+    return store
+
+
+@pytest.fixture(autouse=True)
+def response_cache(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(ai_service, "get_response_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    """Replace the Gemini client with FakeModel; returns the models built"""
+    models = []
+
+    def generative_model(**kwargs):
+        models.append(FakeModel(**kwargs))
+        return models[-1]
+
+    sessions = ChatSessionCache(ai_service.create_model)
+    monkeypatch.setattr(ai_service, "genai", SimpleNamespace(GenerativeModel=generative_model))
+    monkeypatch.setattr(ai_service, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(ai_service, "get_chat_sessions", lambda: sessions)
+    return models
+
+
+JOBS = [{"job_title": "Junior Python Developer", "company_name": "Acme Software", "job_description": "Python"}]
+
+
+def test_memory_store_evicts_expires_and_caps_turns():
+    now = [0.0]
+    store = MemoryConversationStore(max_conversations=2, ttl=60, max_turns=3, clock=lambda: now[0])
+    store.save("a", conversation(5))
+    store.save("b", conversation(1))
+    assert [m["content"] for m in store.get("a")["history"]][:2] == ["question 2", "answer 2"]
+    store.save("c", conversation(1))   # "b" is now the least recently used
+
+    assert store.get("b") is None and store.get("a") is not None
+    assert store.stats()["evicted"] == 1 and store.stats()["conversations"] == 2
+    assert store.stats()["bytes"] == sum(len(data.encode("utf-8")) for data, _ in store.conversations.values())
+
+    now[0] = 61
+    assert store.get("c") is None and store.stats()["expired"] == 1
+    assert store.delete("a") and not store.delete("a")
+    assert store.stats()["bytes"] == 0
+
+
+def test_sqlite_store_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "conversations.db")
+    first, second = SqliteConversationStore(path, max_conversations=2, max_turns=2), SqliteConversationStore(path)
+    first.save("a", conversation(4))
+    assert len(second.get("a")["history"]) == 4
+
+    first.save("b", conversation(1))
+    first.save("c", conversation(1))
+    assert second.get("a") is None and first.stats()["evicted"] == 1
+    assert second.stats()["conversations"] == 2
+    rows = second._conn.execute("SELECT data FROM conversations").fetchall()
+    assert second.stats()["bytes"] == sum(len(data.encode("utf-8")) for data, in rows)
+
+
+def test_conversation_routes_use_the_store(memory_store):
+    client = ai_service.app.test_client()
+    memory_store.save("conv_1", conversation(1))
+
+    assert client.get("/conversation/conv_1").get_json()["history"][1]["content"] == "answer 0"
+    assert client.get("/health").get_json()["conversations"]["conversations"] == 1
+    assert client.delete("/conversation/conv_1").status_code == 200
+    assert client.get("/conversation/conv_1").status_code == 404
+
+
+def test_chat_reuses_model_and_session_until_context_changes(gemini, memory_store):
+    client = ai_service.app.test_client()
+
+    def send(message, jobs=JOBS):
+        response = client.post("/chat", json={"conversation_id": "c1", "message": message, "jobs": jobs})
+        assert response.status_code == 200
+        return response.get_json()
+
+    assert send("Which jobs use Python?")["message"].endswith("Message: Which jobs use Python?")
+    assert send("Which are remote?")["history_length"] == 4
+    assert len(gemini) == 1 and gemini[0].started == [[]]
+    assert "1 jobs" in gemini[0].system_instruction
+
+    send("And now?", jobs=JOBS + [{"job_title": "Backend Engineer"}])
+    assert len(gemini) == 2 and len(gemini[1].started[0]) == 4
+
+    # Another worker answered in between: the stored history no longer matches the session
+    conversation = memory_store.get("c1")
+    conversation["history"] += conversation["history"][:2]
+    memory_store.save("c1", conversation)
+    send("Still there?", jobs=JOBS + [{"job_title": "Backend Engineer"}])
+    assert len(gemini) == 2 and len(gemini[1].started) == 2 and len(gemini[1].started[1]) == 8
+
+    stats = client.get("/health").get_json()["chat_sessions"]
+    assert stats == {"models_built": 2, "models": 2, "sessions": 1, "sessions_started": 3, "sessions_reused": 1}
+
+
+def posting(n, title, description, location="Brussels"):
+    return {"job_url": f"https://www.linkedin.com/jobs/view/{n}", "job_title": title, "company_name": f"Company {n}",
+            "location": location, "job_description": description}
+
+
+def test_job_index_ranks_jobs_and_updates_incrementally():
+    jobs = [posting(1, "Accountant", "Bookkeeping and payroll"),
+            posting(2, "Java Developer", "Spring Boot microservices, some Python scripting"),
+            posting(3, "Senior Python Developer", "Django, PostgreSQL and Python APIs"),
+            posting(4, "Nurse", "Night shifts", location="Ghent")]
+    index = JobIndex()
+    index.update(jobs)
+
+    assert [position for position, _ in index.search("python developer")] == [2, 1]
+    assert index.search("ghent")[0][0] == 3 and index.search("c++ haskell") == []
+    assert [position for position, _ in index.relevant_jobs("haskell", k=2)] == [0, 1]
+    assert not index.update(list(jobs))
+
+    vocabulary = len(index.vocabulary)
+    assert index.update(jobs[1:] + [posting(5, "Rust Engineer", "Embedded Rust")])
+    assert index.stats == {"builds": 3, "added": 5, "removed": 1, "compactions": 0}
+    assert len(index.vocabulary) == vocabulary + 4   # Only the new job was tokenized
+    assert index.relevant_jobs("rust")[0][0] == 3 and index.jobs[3]["job_title"] == "Rust Engineer"
+    assert index.search("bookkeeping") == []
+
+    duplicated = index.jobs + [dict(jobs[2])]
+    assert index.update(duplicated) and len(index) == 5
+    assert [position for position, _ in index.search("django")] == [1, 4]
+    assert len(index.vocabulary) == vocabulary + 4   # The duplicate reused its tokens
+
+    duplicated[1] = dict(duplicated[1], job_description="Django, PostgreSQL and Haskell APIs")
+    assert index.update(duplicated) and index.stats["removed"] == 2
+    assert [position for position, _ in index.search("haskell")] == [1]
+
+
+def test_job_index_skips_unchanged_jobs_and_compacts_its_vocabulary():
+    jobs = [posting(1, "Java Developer", "Spring Boot microservices"),
+            posting(2, "Senior Python Developer", "Django, PostgreSQL and Python APIs")]
+    index = JobIndex()
+    index.update(jobs)
+
+    copies = [dict(job, job_url="https://example.com/moved") for job in jobs]
+    assert not index.update(copies) and index.stats["builds"] == 2
+    assert index.jobs[0] is copies[0]   # Same texts, but the new dicts are the ones returned
+
+    assert index.update(jobs[1:] + [posting(3, "Welder", "Steel and aluminium")])
+    assert index.stats["compactions"] == 0   # A few unused terms are left in place
+    assert index.update([posting(4, "Nurse", "Night shifts", location="Ghent"), posting(5, "Welder", "Steel")])
+    assert index.stats["compactions"] == 1
+    used = {int(i) for _, (ids, _) in index.docs.values() for i in ids}
+    assert used == set(range(len(index.vocabulary))) and "python" not in index.vocabulary
+    assert [position for position, _ in index.search("night nurse")] == [0]
+    assert [position for position, _ in index.search("welder")] == [1] and index.search("django") == []
+
+
+def test_chat_sends_only_relevant_jobs_within_token_budget(gemini, memory_store, monkeypatch):
+    jobs = [posting(n, "Warehouse Operator", "Forklift " * 200) for n in range(300)]
+    jobs[217] = posting(217, "Kotlin Developer", "Android apps in Kotlin")
+    monkeypatch.setattr(ai_service, "JOB_CONTEXT_TOKENS", 1000)
+    client = ai_service.app.test_client()
+
+    response = client.post("/chat", json={"conversation_id": "c1", "message": "Any Kotlin jobs?", "jobs": jobs})
+    assert response.status_code == 200
+    chat = gemini[0].chats[0]
+    assert "Job 218:" in chat.sent[0] and "Kotlin Developer" in chat.sent[0]
+    assert chat.history[0] == {"role": "user", "parts": ["Any Kotlin jobs?"]}
+
+    client.post("/chat", json={"conversation_id": "c1", "message": "Which warehouse jobs pay best?", "jobs": jobs})
+    context = chat.sent[1].split("\n\nMessage:")[0]
+    assert "Job 218:" not in context and 1 < context.count("Warehouse Operator") < 20
+    assert estimate_tokens(context) <= 1000 + 50
+    assert memory_store.get("c1")["history"][2]["content"] == "Which warehouse jobs pay best?"
+    assert client.get("/health").get_json()["job_indexes"] == {"indexes": 1, "jobs": 300}
+
+
+def test_chat_streams_chunks_and_stores_the_assembled_answer(gemini, memory_store, monkeypatch):
+    client = ai_service.app.test_client()
+    response = client.post("/chat", json={"conversation_id": "c1", "message": "Which jobs are remote?",
+                                          "jobs": JOBS, "stream": True})
+    assert response.status_code == 200 and response.mimetype == "application/x-ndjson"
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    *chunks, done = events
+    assert {event["type"] for event in chunks} == {"chunk"} and len(chunks) > 3
+    assert done["type"] == "done" and done["message"] == "".join(event["text"] for event in chunks)
+    assert done["message"].endswith("Message: Which jobs are remote?") and done["history_length"] == 2
+    assert 0 <= done["time_to_first_token"] <= done["generation_seconds"]
+    assert memory_store.get("c1")["history"][1]["content"] == done["message"]
+
+    # The streamed exchange leaves the session reusable, with only the user's message in its history
+    client.post("/chat", json={"conversation_id": "c1", "message": "Thanks", "jobs": JOBS})
+    chat = gemini[0].chats[0]
+    assert len(gemini[0].chats) == 1 and chat.history[0] == {"role": "user", "parts": ["Which jobs are remote?"]}
+
+    monkeypatch.setattr(FakeChat, "fail_after", 2)
+    response = client.post("/chat", json={"conversation_id": "c1", "message": "More?", "jobs": JOBS, "stream": True})
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [event["type"] for event in events] == ["chunk", "chunk", "error"]
+    assert events[-1]["code"] == "GENERATION_ERROR" and len(memory_store.get("c1")["history"]) == 4
+    assert ai_service.get_chat_sessions().sessions["c1"].chat is None
+
+
+def test_response_cache_expires_evicts_and_coalesces_identical_requests():
+    now = [0.0]
+    cache = ResponseCache(max_entries=2, max_bytes=10, ttl=60, clock=lambda: now[0])
+    assert cache.get_or_create("a", lambda: "1234") == ("1234", "miss")
+    assert cache.get_or_create("a", lambda: "other") == ("1234", "hit")
+    cache.put("b", "56789")
+    cache.put("c", "xy")   # Over 10 bytes: "a" is evicted
+    assert cache.get("a") is None and cache.bytes == 7 and cache.stats["evicted"] == 1
+    now[0] = 61
+    assert cache.get("b") is None and cache.stats["expired"] == 1
+
+    release, calls = threading.Event(), []
+
+    def slow_answer():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = [executor.submit(cache.get_or_create, "q", slow_answer) for _ in range(4)]
+        while cache.stats["coalesced"] < 3:
+            time.sleep(0.01)
+        release.set()
+    assert len(calls) == 1 and sorted(result.result()[1] for result in results) == ["coalesced"] * 3 + ["miss"]
+
+    def failing():
+        raise RuntimeError("quota")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_create("r", failing)
+    assert cache.get("r") is None and not cache.in_flight
+
+
+def test_chat_answers_identical_questions_from_the_cache(gemini):
+    client = ai_service.app.test_client()
+
+    def send(conversation_id, message, stream=False):
+        response = client.post("/chat", json={"conversation_id": conversation_id, "message": message, "jobs": JOBS,
+                                              "stream": stream})
+        assert response.status_code == 200
+        if stream:
+            return json.loads(response.get_data(as_text=True).splitlines()[-1])
+        return response.get_json()
+
+    first = send("c1", "Which of these jobs are remote?")
+    assert first["cache"] == "miss"
+    assert send("c2", "which of these  jobs are REMOTE")["cache"] == "hit"
+    streamed = send("c3", "Which of these jobs are remote?", stream=True)
+    assert streamed["cache"] == "hit" and streamed["message"] == first["message"]
+    assert sum(len(chat.sent) for model in gemini for chat in model.chats) == 1
+
+    # A follow-up has a different history, so it is not served from the cache
+    assert send("c2", "Thanks")["cache"] == "miss"
+    assert len(ai_service.get_conversation_store().get("c2")["history"]) == 4
+    stats = client.get("/health").get_json()["response_cache"]
+    assert stats["hits"] == 2 and stats["misses"] == 2 and stats["hit_rate"] == 0.5
+
+
+def test_chat_coalesces_identical_streamed_questions(gemini, response_cache, monkeypatch):
+    release = threading.Event()
+    stream = FakeChat._stream
+
+    def slow_stream(self, message, text):
+        release.wait(5)
+        yield from stream(self, message, text)
+
+    monkeypatch.setattr(FakeChat, "_stream", slow_stream)
+    client = ai_service.app.test_client()
+
+    def ask(conversation_id):
+        response = client.post("/chat", json={"conversation_id": conversation_id, "message": "Any remote jobs?",
+                                              "jobs": JOBS, "stream": True})
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(ask, "c1")
+        while not response_cache.in_flight:
+            time.sleep(0.01)
+        follower = executor.submit(ask, "c2")
+        while response_cache.stats["coalesced"] < 1:
+            time.sleep(0.01)
+        release.set()
+    leader, follower = leader.result(), follower.result()
+
+    assert sum(len(chat.sent) for model in gemini for chat in model.chats) == 1
+    assert leader[-1]["cache"] == "miss" and len(leader) > 3
+    assert [event["type"] for event in follower] == ["chunk", "done"] and follower[-1]["cache"] == "coalesced"
+    assert follower[0]["text"] == follower[-1]["message"] == leader[-1]["message"]
+    assert ai_service.get_conversation_store().get("c2")["history"][1]["content"] == leader[-1]["message"]
+    assert not response_cache.in_flight and len(response_cache.entries) == 1
+
+
+def test_compactor_folds_old_turns_into_a_running_summary():
+    calls = []
+
+    def summarize(summary, messages):
+        calls.append((summary, len(messages)))
+        return f"summary {len(calls)}"
+
+    compactor = HistoryCompactor(summarize, token_budget=20, keep_turns=1)
+    small = conversation(1)
+    assert not compactor.compact(small) and compactor.session_history(small)[2] == 0
+
+    long = conversation(5)
+    folded_tokens = sum(len(message["content"]) // 4 + 1 for message in long["history"][:8])
+    assert compactor.compact(long)
+    assert calls == [("", 8)] and len(long["history"]) == 10 and long["summarized_upto"] == 8
+    assert long["summary"]["messages"] == 8 and long["summary"]["tokens"] == folded_tokens
+
+    history, tokens, saved = compactor.session_history(long)
+    assert history[0]["content"].endswith("summary 1") and [m["content"] for m in history[2:]] == ["question 4",
+                                                                                                  "answer 4"]
+    assert saved == folded_tokens - sum(len(m["content"]) // 4 + 1 for m in history[:2])
+
+    long["history"] += conversation(2)["history"]
+    assert compactor.compact(long) and calls[1] == ("summary 1", 4) and long["summary"]["messages"] == 12
+    assert long["summarized_upto"] == 12 and len(long["history"]) == 14
+
+    compactor.summarize = lambda summary, messages: 1 / 0
+    long["history"] += conversation(2)["history"]
+    assert not compactor.compact(long) and long["summarized_upto"] == 12
+    assert compactor.to_dict()["compactions"] == 2 and compactor.to_dict()["failures"] == 1
+
+
+def test_compactor_summarizes_stored_conversations_in_the_background():
+    store = MemoryConversationStore(max_turns=5)
+    store.save("c1", conversation(5))
+    release = threading.Event()
+
+    def summarize(summary, messages):
+        release.wait(5)
+        return f"summary of {len(messages)}"
+
+    compactor = HistoryCompactor(summarize, token_budget=20, keep_turns=1)
+    future = compactor.compact_later(store, "c1")
+    assert compactor.compact_later(store, "c1") is future   # Already under way
+
+    # An exchange stored meanwhile is kept, and trims the two oldest messages
+    stored = store.get("c1")
+    stored["history"] += [{"role": "user", "content": "question 5", "timestamp": "2025-12-07T10:05:00"},
+                          {"role": "assistant", "content": "answer 5", "timestamp": "2025-12-07T10:05:01"}]
+    store.save("c1", stored)
+    release.set()
+    compactor.join()
+
+    assert future.result() and not compactor.pending
+    compacted = store.get("c1")
+    assert compacted["summary"]["text"] == "summary of 8" and len(compacted["history"]) == 10
+    assert [m["content"] for m in compacted["history"][compacted["summarized_upto"]:]] == [
+        "question 4", "answer 4", "question 5", "answer 5"]
+
+
+def test_chat_replays_summary_instead_of_old_turns(gemini, memory_store, monkeypatch):
+    compactor = HistoryCompactor(ai_service.summarize_history, token_budget=60, keep_turns=1)
+    monkeypatch.setattr(ai_service, "get_history_compactor", lambda: compactor)
+    client = ai_service.app.test_client()
+
+    questions = [f"Question {n}: " + "tell me more " * 10 for n in range(4)]
+    responses = []
+    for question in questions:
+        responses.append(client.post("/chat", json={"conversation_id": "c1", "message": question}).get_json())
+        compactor.join()   # Summaries are written after the answer, for the next turn
+    assert [response["tokens_saved"] for response in responses[:2]] == [0, 0]
+    assert responses[2]["history_length"] == 6 and responses[2]["tokens_saved"] > 0
+
+    # Each compaction restarted the session from the summary and the last turn
+    model = gemini[0]
+    assert len(model.started) == 3 and len(model.started[-1]) == 4
+    assert model.started[-1][0]["parts"][0] == "Summary of our conversation so far:\nSummary of 1 user messages"
+    replayed = questions[:3] + [response["message"] for response in responses[:3]]
+    assert responses[3]["history_tokens"] + responses[3]["tokens_saved"] == sum(len(m) // 4 + 1 for m in replayed)
+
+    # The last answer was folded in for the next turn, and every turn is still stored
+    stored = client.get("/conversation/c1").get_json()
+    assert stored["summary"]["messages"] == 6 and stored["summarized_upto"] == 6 and len(stored["history"]) == 8
+    stats = client.get("/health").get_json()["history_summary"]
+    assert stats["compactions"] == 3 and stats["tokens_saved"] == sum(r["tokens_saved"] for r in responses)
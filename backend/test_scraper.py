@@ -0,0 +1,731 @@
+"""
+Offline tests for the LinkedIn scraper
+
+Pages come from fixture_server.py and the browser is replaced by
+FixtureDriver, so no Chrome or network access is needed:
+
+    python -m pytest test_scraper.py
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from urllib.request import urlopen
+
+import pytest
+import requests
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import NoSuchElementException
+
+import benchmark
+import linkedin
+import parsers
+from fixture_server import FIXTURES_DIR, FixtureServer
+from driver_pool import DriverPool, PoolExhausted
+from dedup import DedupIndex, SeenJobsStore, dedup_key
+import watermarks
+from watermarks import WatermarkStore
+from job_store import JobStore
+from scrape_scheduler import ScrapeScheduler
+from job_cache import CompanyCache, JobCache, job_key
+from fetch_scheduler import CircuitOpen, FetchError, FetchScheduler
+
+
+class FixtureElement:
+    """Enough of a WebElement for the expected_conditions the scraper uses"""
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def click(self):
+        pass
+
+
+class FixtureDriver:
+    """Stand-in for a Chrome WebDriver that loads pages over plain HTTP"""
+
+    def __init__(self):
+        self.page_source = ""
+        self.visited = []
+        self.extracted = 0
+        self.cdp = []
+        self.closed = False
+
+    def get(self, url):
+        self.visited.append(url)
+        self.extracted = 0
+        if url == "about:blank":
+            self.page_source = ""
+            return
+        with urlopen(url) as response:
+            self.page_source = response.read().decode("utf-8")
+
+    def find_element(self, by, value):
+        if not BeautifulSoup(self.page_source, "html.parser").find(class_=value):
+            raise NoSuchElementException(value)
+        return FixtureElement()
+
+    def execute_script(self, script, *args):
+        if script == linkedin.PAGE_STATE_JS:
+            return [self.page_source.count('class="base-card '), len(self.page_source)]
+        if script == linkedin.EXTRACT_NEW_CARDS_JS:
+            cards = parsers.parse_job_cards(self.page_source)[self.extracted:]
+            self.extracted += len(cards)
+            return cards
+        return None
+
+    def execute_cdp_cmd(self, cmd, args):
+        self.cdp.append((cmd, args))
+
+    def quit(self):
+        self.closed = True
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = FixtureServer(latency=0.05, guest_page_size=2).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch, server, tmp_path):
+    store = JobStore(str(tmp_path / "job_store.db"))
+    scheduler = ScrapeScheduler(store, linkedin.run_saved_search)
+    monkeypatch.setattr(linkedin, "get_job_store", lambda: store)
+    monkeypatch.setattr(linkedin, "get_scheduler", lambda: scheduler)
+    fetch_scheduler = FetchScheduler(rate=0)
+    monkeypatch.setattr(linkedin, "get_fetch_scheduler", lambda: fetch_scheduler)
+    monkeypatch.setattr(linkedin, "get_job_cache", lambda: JobCache(str(tmp_path / "job_cache.db")))
+    monkeypatch.setattr(linkedin, "get_company_cache", lambda: CompanyCache(str(tmp_path / "job_cache.db")))
+    monkeypatch.setattr(linkedin, "get_seen_jobs_store", lambda: SeenJobsStore(str(tmp_path / "job_cache.db")))
+    monkeypatch.setattr(linkedin, "get_watermark_store", lambda: WatermarkStore(str(tmp_path / "job_cache.db")))
+    monkeypatch.setattr(linkedin, "DETAIL_PAUSE", 0)
+    monkeypatch.setattr(linkedin, "SCROLL_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(linkedin, "SCROLL_TIMEOUT", 0.02)
+    monkeypatch.setattr(linkedin, "SCROLL_MAX_TIMEOUT", 0.05)
+    monkeypatch.setattr(linkedin, "LINKEDIN_BASE_URL", server.base_url)
+
+
+def search_cards(server):
+    driver = FixtureDriver()
+    driver.get(f"{server.base_url}/jobs/search/")
+    soup = BeautifulSoup(driver.page_source, "html.parser")
+    return [parsers.parse_job_card(card) for card in soup.find_all("div", class_="base-card")]
+
+
+def test_parse_job_card(server):
+    cards = search_cards(server)
+    assert len(cards) == 3
+    assert cards[0] == {
+        "job_title": "Junior Python Developer",
+        "company_name": "Acme Software",
+        "company_url": f"{server.base_url}/company/acme-software?trk=public_jobs_jserp-result_job-search-card-subtitle",
+        "location": "Brussels, Brussels Region, Belgium",
+        "benefit": "Actively Hiring",
+        "posted": "1 day ago",
+        "posted_date": "2025-12-03",
+        "job_url": f"{server.base_url}/jobs/view/junior-python-developer-3790000001?refId=abc&trackingId=xyz",
+    }
+    assert cards[1]["benefit"] == ""
+
+
+def test_lxml_parser_matches_bs4(server):
+    search_html = FixtureDriver()
+    search_html.get(f"{server.base_url}/jobs/search/")
+    tricky_card = """
+        <div class="base-card"><a class="base-card__full-link" href=" /jobs/view/x-1 ">
+          <span class="sr-only"> Dev <!-- hidden --> &amp; Ops<script>x()</script></span></a>
+          <h4 class="base-search-card__subtitle">Acme <a href="/company/acme">Acme <b>BV</b></a></h4>
+          <span class="job-search-card__location">Gent</span></div>
+        <div class="base-card"><a class="base-card__full-link">No href</a></div>
+    """
+    for html in (search_html.page_source, tricky_card, ""):
+        assert parsers.parse_job_cards_lxml(html) == parsers.parse_job_cards(html)
+
+    for name in os.listdir(os.path.join(FIXTURES_DIR, "jobs")):
+        with open(os.path.join(FIXTURES_DIR, "jobs", name), encoding="utf-8") as f:
+            html = f.read()
+        for with_company in (True, False):
+            assert parsers.parse_job_details_lxml(html, with_company) == parsers.parse_job_details(html, with_company)
+
+
+def test_detail_pool_keeps_submission_order(server):
+    urls = [card["job_url"] for card in search_cards(server)] * 4
+    drivers = []
+
+    def factory():
+        drivers.append(FixtureDriver())
+        return drivers[-1]
+
+    pool = linkedin.DetailFetchPool(workers=3, engine=linkedin.SeleniumEngine(factory)).start()
+    for url in urls:
+        pool.submit(url)
+    details = pool.close()
+
+    assert len(drivers) == 3 and all(driver.closed for driver in drivers)
+    assert [job_desc.splitlines()[0] for job_desc, _ in details] == [
+        "We are looking for a junior Python developer to join our platform team.",
+        "Join us as a frontend developer working on React and TypeScript.",
+        "Design and operate the services behind our route planning product.",
+    ] * 4
+    assert [s["worker"] for s in pool.worker_stats] == [0, 1, 2]
+    assert sum(s["jobs"] for s in pool.worker_stats) == len(urls)
+
+
+def test_scrape_linkedin_jobs_end_to_end(server):
+    stats = {}
+    jobs = linkedin.scrape_linkedin_jobs("junior developer", ["Belgium", "Netherlands"], [], [], "24h",
+                                         detail_workers=2, engine=linkedin.SeleniumEngine(FixtureDriver),
+                                         stats=stats)
+
+    assert [job["country"] for job in jobs] == ["Belgium"] * 3 + ["Netherlands"] * 3
+    assert list(jobs[0]) == ["country", "countries", "job_title", "company_name", "company_url", "location", "benefit",
+                             "posted", "posted_date", "company_description", "job_url", "job_description"]
+    assert jobs[1]["job_description"].startswith("Join us as a frontend developer")
+    assert len(stats["detail_workers"]) == 2
+
+
+def test_http_engine_matches_selenium_engine(server):
+    selenium_jobs = linkedin.scrape_linkedin_jobs("developer", ["Belgium"], [], [], "any",
+                                                  engine=linkedin.SeleniumEngine(FixtureDriver))
+    stats = {}
+    http_jobs = linkedin.scrape_linkedin_jobs("developer", ["Belgium"], [], [], "any",
+                                              engine=linkedin.HttpEngine(), stats=stats)
+
+    assert http_jobs == selenium_jobs
+    assert stats["countries"][0]["search"]["pages"] == 2
+
+
+def test_search_countries_runs_in_parallel(server):
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    class SlowDriver(FixtureDriver):
+        def get(self, url):
+            with lock:
+                active.append(self)
+                peak.append(len(active))
+            time.sleep(0.2)
+            super().get(url)
+            with lock:
+                active.remove(self)
+
+    stats = {}
+    cards = linkedin.search_countries("developer", ["Belgium", "Netherlands", "France"], [], [], "any",
+                                      country_workers=2, engine=linkedin.SeleniumEngine(SlowDriver),
+                                      stats=stats)
+
+    assert max(peak) == 2
+    assert [country for country, _ in cards] == ["Belgium"] * 3 + ["Netherlands"] * 3 + ["France"] * 3
+    assert [s["country"] for s in stats["countries"]] == ["Belgium", "Netherlands", "France"]
+
+
+def test_adaptive_scroll_stops_when_cards_plateau():
+    class ScrollingDriver(FixtureDriver):
+        """Adds 25 cards 5 ms after each of the first four scrolls"""
+
+        def __init__(self):
+            super().__init__()
+            self.scrolls = []
+
+        def execute_script(self, script, *args):
+            if script == linkedin.SCROLL_AND_SHOW_MORE_JS:
+                self.scrolls.append(time.perf_counter())
+                return False
+            loaded = sum(1 for t in self.scrolls[:4] if time.perf_counter() - t > 0.005)
+            return [25 * (loaded + 1), 1000 * (loaded + 1)]
+
+    stats = linkedin.scroll_page(ScrollingDriver(), "adaptive")
+
+    assert stats["cards"] == 125
+    assert stats["iterations"] == 4 + linkedin.SCROLL_PLATEAU_ROUNDS
+    assert stats["load_seconds"] > 0 and stats["wait_seconds"] > 0
+
+
+def test_async_scrape_streams_jobs(server):
+    client = linkedin.app.test_client()
+    response = client.post("/scrape", json={"countries": ["Belgium"], "engine": "http", "async": True})
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+
+    lines = [json.loads(line) for line in client.get(f"/scrape/{job_id}/stream").get_data(as_text=True).splitlines()]
+    jobs = [line["job"] for line in lines if line["type"] == "job"]
+    assert len(jobs) == 3
+    assert lines[-1]["type"] == "done" and lines[-1]["status"] == "success"
+
+    status = client.get(f"/scrape/{job_id}").get_json()
+    assert status["progress"]["cards_found"] == 3
+    assert status["progress"]["details_fetched"] == 3
+    assert sorted(job["job_url"] for job in status["result"]["jobs"]) == sorted(job["job_url"] for job in jobs)
+    assert client.get("/scrape/unknown").status_code == 404
+
+
+def test_job_cache_skips_known_postings(server, tmp_path):
+    cache = JobCache(str(tmp_path / "cache.db"))
+    first, second = {}, {}
+    jobs = linkedin.scrape_linkedin_jobs("developer", ["Belgium"], [], [], "any",
+                                         engine=linkedin.HttpEngine(), cache=cache, stats=first)
+    cached_jobs = linkedin.scrape_linkedin_jobs("developer", ["Belgium"], [], [], "any",
+                                                engine=linkedin.HttpEngine(), cache=cache, stats=second)
+
+    assert first["cache"] == {"hits": 0, "misses": 3}
+    assert second["cache"] == {"hits": 3, "misses": 0}
+    assert sum(worker["jobs"] for worker in second["detail_workers"]) == 0
+    assert cached_jobs == jobs
+
+
+def test_job_cache_ttl_and_lru_eviction(tmp_path):
+    cache = JobCache(str(tmp_path / "cache.db"), ttl=60, max_entries=2)
+    urls = [f"https://www.linkedin.com/jobs/view/job-{n}?trk=x" for n in range(3)]
+    for url in urls:
+        cache.put(url, (f"job {url}", "company"))
+
+    assert len(cache) == 2 and cache.get(urls[0]) is None
+    assert cache.get(urls[2] + "&refId=other") == (f"job {urls[2]}", "company")
+    assert job_key(urls[1]) == "id:1"
+
+    cache.ttl = -1
+    assert cache.get(urls[2]) is None
+
+
+def test_company_description_shared_across_postings(server, tmp_path):
+    stats = {}
+    jobs = linkedin.scrape_linkedin_jobs("developer", ["Belgium"], [], [], "any", detail_workers=1,
+                                         engine=linkedin.HttpEngine(),
+                                         company_cache=CompanyCache(str(tmp_path / "cache.db")), stats=stats)
+
+    assert stats["company_cache"] == {"hits": 1, "misses": 2}
+    assert jobs[2]["company_description"] == jobs[0]["company_description"] != ""
+
+    compact, companies = linkedin.compact_jobs(jobs)
+    assert len(companies) == 2
+    assert compact[0]["company_url"] == compact[2]["company_url"] == f"{server.base_url}/company/acme-software"
+    assert "company_description" not in compact[0] and "company_name" not in compact[0]
+    assert companies[compact[1]["company_url"]]["company_name"] == "Blue Fjord"
+
+
+def test_dedup_merges_countries_and_reuses_earlier_runs(server, tmp_path):
+    store, job_store = SeenJobsStore(str(tmp_path / "cache.db")), JobStore(str(tmp_path / "store.db"))
+    first, second = {}, {}
+    jobs = linkedin.scrape_linkedin_jobs("developer", ["Belgium", "Netherlands"], [], [], "any",
+                                         engine=linkedin.HttpEngine(), dedup=DedupIndex(store, job_store),
+                                         stats=first)
+    job_store.finish_run(job_store.start_run({}), jobs)
+    again = linkedin.scrape_linkedin_jobs("developer", ["Belgium", "France"], [], [], "any",
+                                          engine=linkedin.HttpEngine(), dedup=DedupIndex(store, job_store),
+                                          stats=second)
+
+    assert [job["countries"] for job in jobs] == [["Belgium", "Netherlands"]] * 3
+    assert first["dedup"] == {"unique": 3, "duplicates": 3, "seen_before": 0, "reused": 0}
+    assert sum(worker["jobs"] for worker in first["detail_workers"]) == 3
+    # Postings from the earlier run are still returned, with the stored details instead of a new fetch
+    assert [job["countries"] for job in again] == [["Belgium", "France"]] * 3
+    descriptions = {job["job_url"]: job["job_description"] for job in jobs}
+    assert all(job["job_description"] == descriptions[job["job_url"]] != "" for job in again)
+    assert second["dedup"] == {"unique": 3, "duplicates": 3, "seen_before": 3, "reused": 3}
+    assert sum(worker["jobs"] for worker in second["detail_workers"]) == 0
+
+    store._conn.execute("UPDATE seen_jobs SET last_seen = last_seen - ?", (store.ttl + 1,))
+    assert not store.contains(dedup_key(jobs[0]))
+    store.add(["id:1"])
+    assert store._conn.execute("SELECT key FROM seen_jobs").fetchall() == [("id:1",)]
+
+    card = {"job_title": "Data  Engineer", "company_name": "Acme", "location": "Ghent", "job_url": ""}
+    assert dedup_key(card) == dedup_key(dict(card, job_title="data engineer")) != dedup_key(dict(card, location="Lyon"))
+
+
+def test_driver_pool_reuses_and_recycles_drivers(server, monkeypatch):
+    drivers = []
+
+    def factory():
+        drivers.append(FixtureDriver())
+        return drivers[-1]
+
+    pool = DriverPool(factory, size=2, max_pages=4, checkout_timeout=0)
+    engine = linkedin.SeleniumEngine(pool=pool)
+    for _ in range(2):
+        jobs = linkedin.scrape_linkedin_jobs("developer", ["Belgium"], [], [], "any", detail_workers=1,
+                                             country_workers=1, engine=engine)
+        assert len(jobs) == 3
+
+    assert pool.stats["created"] == 2 and pool.stats["reused"] == 2
+    assert pool.stats["recycled"] >= 1 and all(driver.closed for driver in drivers if driver not in pool.idle)
+    assert all(driver.visited[-1] == "about:blank" for driver in pool.idle)
+    assert all(driver.cdp[-2:] == [("Network.clearBrowserCookies", {}),
+                                   ("Storage.clearDataForOrigin", {"origin": server.base_url, "storageTypes": "all"})]
+               for driver in pool.idle)
+
+    held = [pool.checkout(), pool.checkout()]
+    assert pool.is_full()
+    with pytest.raises(PoolExhausted):
+        pool.checkout()
+    monkeypatch.setattr(linkedin, "get_driver_pool", lambda: pool)
+    response = linkedin.app.test_client().post("/scrape", json={"countries": ["Belgium"]})
+    assert response.status_code == 503 and response.get_json()["code"] == "POOL_EXHAUSTED"
+
+    for driver in held:
+        pool.checkin(driver)
+    pool.close()
+    assert all(driver.closed for driver in drivers) and pool.stats["rejected"] == 1
+
+
+def test_driver_pool_caps_browsers_across_profiles():
+    drivers = []
+
+    def factory(profile):
+        drivers.append((profile, FixtureDriver()))
+        return drivers[-1][1]
+
+    pool = DriverPool(factory, size=2, checkout_timeout=0)
+    standard = pool.checkout(kind="standard")
+    pool.checkin(pool.checkout(kind="fast"))
+    second = pool.checkout(kind="standard")
+    with pytest.raises(PoolExhausted):
+        pool.checkout(kind="fast")
+
+    assert [profile for profile, _ in drivers] == ["standard", "fast", "standard"]
+    assert drivers[1][1].closed and pool.alive == 2 and pool.to_dict()["kinds"] == {"standard": 2}
+    pool.checkin(second)
+    assert pool.checkout(kind="standard") is second and pool.stats["reused"] == 1
+
+
+def test_concurrent_scrapes_share_a_small_driver_pool(server):
+    pool = DriverPool(FixtureDriver, size=3, checkout_timeout=2)
+    results, errors = [], []
+
+    def scrape():
+        try:
+            results.append(linkedin.scrape_linkedin_jobs("developer", ["Belgium"], [], [], "any", detail_workers=2,
+                                                         country_workers=1, engine=linkedin.SeleniumEngine(pool=pool)))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=scrape) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.close()
+
+    assert errors == [] and pool.stats["rejected"] == 0
+    assert [len(jobs) for jobs in results] == [3, 3]
+    assert all(job["job_description"] for jobs in results for job in jobs)
+
+
+def test_fast_browser_profile_blocks_resources(monkeypatch):
+    class FakeChrome:
+        def __init__(self, options):
+            self.options = options
+            self.cdp = []
+
+        def execute_cdp_cmd(self, cmd, args):
+            self.cdp.append((cmd, args))
+
+    monkeypatch.setattr(linkedin.webdriver, "Chrome", FakeChrome)
+    standard, fast = linkedin.setup_driver("standard"), linkedin.setup_driver("fast")
+
+    assert "--start-maximized" in standard.options.arguments and not standard.cdp
+    assert "--headless=new" in fast.options.arguments and fast.options.page_load_strategy == "eager"
+    blocked = dict(fast.cdp)["Network.setBlockedURLs"]["urls"]
+    assert "*.css" in blocked and "*.woff2" in blocked and "*doubleclick.net*" in blocked
+
+    response = linkedin.app.test_client().post("/scrape", json={"countries": ["Belgium"], "browser_profile": "x"})
+    assert response.status_code == 400 and response.get_json()["code"] == "INVALID_BROWSER_PROFILE"
+
+
+def test_scrape_rejects_invalid_parameters():
+    client = linkedin.app.test_client()
+    for body, code in [({"detail_workers": True}, "INVALID_DETAIL_WORKERS"),
+                       ({"detail_workers": 0}, "INVALID_DETAIL_WORKERS"),
+                       ({"country_workers": False}, "INVALID_COUNTRY_WORKERS"),
+                       ({"use_cache": "false"}, "INVALID_USE_CACHE"),
+                       ({"incremental": 1}, "INVALID_INCREMENTAL")]:
+        response = client.post("/scrape", json=dict(body, countries=["Belgium"]))
+        assert response.status_code == 400 and response.get_json()["code"] == code
+
+
+def test_incremental_scrape_returns_only_new_postings(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(watermarks, "WATERMARK_STOP_AFTER", 2)
+    store = WatermarkStore(str(tmp_path / "cache.db"))
+    first, second = {}, {}
+    jobs = linkedin.scrape_linkedin_jobs("developer", ["Belgium"], [], [], "24h",
+                                         engine=linkedin.HttpEngine(), watermarks=store, stats=first)
+    again = linkedin.scrape_linkedin_jobs("Developer", ["Belgium"], [], [], "24h",
+                                          engine=linkedin.HttpEngine(), watermarks=store, stats=second)
+
+    assert len(jobs) == 3 and jobs[0]["posted_date"] == "2025-12-03"
+    assert first["watermarks"] == [{"new": 3, "known": 0, "stopped_early": False, "country": "Belgium"}]
+    assert again == []
+    assert second["watermarks"] == [{"new": 0, "known": 2, "stopped_early": True, "country": "Belgium"}]
+    assert second["countries"][0]["search"]["pages"] == 1
+    assert sum(worker["jobs"] for worker in second["detail_workers"]) == 0
+
+    query = watermarks.query_key("developer", "Belgium", [], [], "24h")
+    assert store.load(query).newest_posted == "2025-12-04"
+    assert store.load(watermarks.query_key("developer", "Belgium", [], [], "week")).keys == set()
+
+
+def test_incremental_scrape_retries_failed_postings(server, tmp_path):
+    failing = search_cards(server)[0]["job_url"]
+
+    class FailingEngine(linkedin.HttpEngine):
+        def fetch_details(self, session, job_url, with_company=True):
+            if job_url == failing:
+                raise FetchError(job_url, "HTTPError: 503")
+            return super().fetch_details(session, job_url, with_company)
+
+    store = WatermarkStore(str(tmp_path / "cache.db"))
+    first = {}
+    jobs = linkedin.scrape_linkedin_jobs("developer", ["Belgium"], [], [], "24h",
+                                         engine=FailingEngine(), watermarks=store, stats=first)
+    assert len(jobs) == 3 and [failure["job_url"] for failure in first["failed_details"]] == [failing]
+    assert len(store.load(watermarks.query_key("developer", "Belgium", [], [], "24h")).keys) == 2
+
+    again = linkedin.scrape_linkedin_jobs("developer", ["Belgium"], [], [], "24h",
+                                          engine=linkedin.HttpEngine(), watermarks=store)
+    assert [job["job_url"] for job in again] == [failing] and again[0]["job_description"]
+
+
+def test_saved_search_runs_into_paginated_job_store(server):
+    client = linkedin.app.test_client()
+    response = client.post("/searches", json={"name": "Remote", "interval_minutes": 30,
+                                              "parameters": {"countries": ["Belgium"], "engine": "http"}})
+    assert response.status_code == 201
+    search_id = response.get_json()["search_id"]
+    scheduler = linkedin.get_scheduler()
+    assert scheduler.to_dict()["scheduled"] == 1
+
+    assert client.post(f"/searches/{search_id}/run").get_json()["status"] == "accepted"
+    scheduler.executor.shutdown(wait=True)
+
+    runs = client.get(f"/runs?search_id={search_id}").get_json()["runs"]
+    assert len(runs) == 1 and runs[0]["status"] == "success" and runs[0]["total_jobs"] == 3
+    first = client.get(f"/jobs?run_id={runs[0]['run_id']}&page_size=2").get_json()
+    second = client.get(f"/jobs?run_id={runs[0]['run_id']}&page_size=2&page=2").get_json()
+    assert first["total"] == 3 and len(first["jobs"]) == 2 and len(second["jobs"]) == 1
+    assert client.get("/jobs?job_id=3790000002").get_json()["jobs"][0]["company_name"] == "Blue Fjord"
+    assert client.get("/jobs?posted_since=2025-12-04").get_json()["total"] == 2
+    assert client.get("/jobs?page=x").status_code == 400
+
+    assert client.post("/searches", json={"interval_minutes": 0, "parameters": {"countries": ["Belgium"]}}) \
+        .get_json()["code"] == "INVALID_INTERVAL"
+    assert client.delete(f"/searches/{search_id}").status_code == 200
+    assert scheduler.to_dict()["scheduled"] == 0 and client.get(f"/runs/{runs[0]['run_id']}").status_code == 200
+
+
+def test_scheduler_starts_once():
+    store = linkedin.get_job_store()
+    store.add_search("Daily", {"countries": ["Belgium"]}, 60)
+    scheduler = ScrapeScheduler(store, lambda search: None, tick=60)
+    assert not scheduler.to_dict()["running"]
+    scheduler.start()
+    thread = scheduler._thread
+    scheduler.start()
+    assert scheduler._thread is thread and scheduler.to_dict()["scheduled"] == 1 and scheduler.to_dict()["running"]
+    scheduler.stop()
+
+
+def test_job_store_prunes_old_runs(tmp_path):
+    store = JobStore(str(tmp_path / "store.db"), max_runs=2, retention_days=30)
+    jobs = [{"job_url": "https://www.linkedin.com/jobs/view/x-1", "country": "Belgium",
+             "countries": ["Belgium", "France"]}]
+    old = store.start_run({}, "daily")
+    store._conn.execute("UPDATE runs SET started_at = '2000-01-01T00:00:00' WHERE id = ?", (old,))
+    store.finish_run(old, jobs)
+    running = store.start_run({}, "daily")
+    daily = [store.start_run({}, "daily") for _ in range(3)]
+    for run_id in daily:
+        store.finish_run(run_id, jobs)
+    adhoc = store.start_run({})
+    store.finish_run(adhoc, jobs)
+
+    assert [run["run_id"] for run in store.list_runs("daily")["runs"]] == [daily[2], daily[1], running]
+    assert store.get_run(adhoc) is not None and store.query_jobs()["total"] == 3
+    assert store.query_jobs(country="France")["total"] == 3 and store.query_jobs(country="Spain")["total"] == 0
+    assert store._conn.execute("SELECT COUNT(*) FROM job_countries").fetchone()[0] == 6
+
+
+def test_scrape_pages_projects_and_compresses_results(server):
+    client = linkedin.app.test_client()
+    data = client.post("/scrape", json={"countries": ["Belgium"], "engine": "http", "fields": "card",
+                                        "page_size": 2}).get_json()
+    assert data["total_jobs"] == 3 and len(data["jobs"]) == 2 and data["next_cursor"]
+    assert sorted(data["jobs"][0]) == sorted(linkedin.FIELD_SETS["card"])
+
+    rest = client.get(f"/jobs?run_id={data['run_id']}&cursor={data['next_cursor']}&fields=job_title").get_json()
+    assert rest["jobs"] == [{"job_title": "Backend Engineer"}] and rest["next_cursor"] is None
+    lazy = client.get(f"/jobs?run_id={data['run_id']}&job_id=3790000001&fields=job_description").get_json()
+    assert lazy["jobs"][0]["job_description"].startswith("We are looking for a junior Python developer")
+    assert client.get("/jobs?cursor=bogus").get_json()["code"] == "INVALID_CURSOR"
+    expired = client.get("/jobs?run_id=pruned")
+    assert expired.status_code == 404 and expired.get_json()["code"] == "RUN_EXPIRED"
+    assert client.get("/jobs?fields=salary").get_json()["code"] == "INVALID_FIELDS"
+
+    response = client.get(f"/jobs?run_id={data['run_id']}", headers={"Accept-Encoding": "gzip, zstd;q=0"})
+    assert response.headers["Content-Encoding"] == "gzip" and "Accept-Encoding" in response.headers["Vary"]
+    assert json.loads(gzip.decompress(response.get_data()))["total"] == 3
+    assert "Content-Encoding" not in client.get(f"/jobs?run_id={data['run_id']}").headers
+
+
+def test_benchmark_scrapes_synthetic_infinite_scroller():
+    big = FixtureServer(cards=25, guest_page_size=10, scroll_page_size=10).start()
+    try:
+        search_page = FixtureDriver()
+        search_page.get(f"{big.base_url}/jobs/search/")
+        assert search_page.page_source.count('class="base-card ') == 10
+        assert "infinite-scroller__show-more-button" in search_page.page_source
+        search_page.get(f"{big.base_url}/jobs/view/backend-engineer-4000000002?refId=abc")
+        assert "description__text" in search_page.page_source
+
+        result = benchmark.run_scrape_config("http", parsers.DEFAULT_PARSER, 2, big.base_url)
+    finally:
+        big.stop()
+    assert result["jobs"] == 25 and result["pages"] == 3 + 25
+    assert result["jobs_per_second"] > 0 and result["p95_page"] >= result["p50_page"] > 0
+
+
+def test_scrape_reports_stage_timings_and_metrics(server):
+    client = linkedin.app.test_client()
+    timings = client.post("/scrape", json={"countries": ["Belgium"], "engine": "http"}).get_json()["stats"]["timings"]
+    assert timings["page_load"]["count"] == 2 + 3 and timings["fetch_details"]["count"] == 3
+    assert timings["parse_cards"]["count"] == 2 and timings["parse_details"]["seconds"] >= 0
+
+    engine = linkedin.SeleniumEngine(FixtureDriver)
+    linkedin.scrape_linkedin_jobs("developer", ["Belgium"], [], [], "any", engine=engine)
+    assert {"driver_startup", "page_load", "scroll_iteration", "extract_cards"} <= set(engine.timings.to_dict())
+
+    response = client.get("/metrics")
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert "# TYPE jobscope_stage_seconds histogram" in text
+    assert 'jobscope_stage_seconds_bucket{stage="fetch_details",le="+Inf"}' in text
+    assert 'jobscope_scrapes_total{status="success"}' in text
+
+
+def test_details_start_while_results_still_scroll(server):
+    events = []
+
+    class GrowingDriver(FixtureDriver):
+        """Search page that reveals one more card per scroll"""
+
+        def get(self, url):
+            super().get(url)
+            if "/jobs/view/" in url:
+                events.append(("detail", time.perf_counter()))
+            self.cards = parsers.parse_job_cards(self.page_source)
+            self.visible = 1
+
+        def execute_script(self, script, *args):
+            if script == linkedin.SCROLL_AND_SHOW_MORE_JS:
+                events.append(("scroll", time.perf_counter()))
+                self.visible = min(self.visible + 1, len(self.cards))
+                return True
+            if script == linkedin.PAGE_STATE_JS:
+                return [self.visible, 100 * self.visible]
+            if script == linkedin.EXTRACT_NEW_CARDS_JS:
+                batch = self.cards[self.extracted:self.visible]
+                self.extracted = self.visible
+                return batch
+            return None
+
+    stats = {}
+    jobs = linkedin.scrape_linkedin_jobs("developer", ["Belgium"], [], [], "any",
+                                         engine=linkedin.SeleniumEngine(GrowingDriver), stats=stats)
+
+    first_detail = min(t for kind, t in events if kind == "detail")
+    last_scroll = max(t for kind, t in events if kind == "scroll")
+    assert first_detail < last_scroll
+    assert [job["job_title"] for job in jobs] == ["Junior Python Developer", "Frontend Developer (React)",
+                                                  "Backend Engineer"]
+    assert stats["countries"][0]["search"]["cards"] == 3
+
+
+def test_fetch_scheduler_rate_limits_retries_and_opens_circuit():
+    now, sleeps = [0.0], []
+    scheduler = FetchScheduler(rate=2, burst=2, retries=2, base_delay=1, breaker_threshold=3, breaker_cooldown=60,
+                               clock=lambda: now[0], sleep=sleeps.append)
+    for _ in range(4):
+        scheduler.fetch("http://jobs.test/a", lambda: None)
+    assert sleeps == [0.5, 1.0]
+
+    throttled = requests.Response()
+    throttled.status_code, throttled.headers["Retry-After"] = 429, "3"
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise requests.HTTPError(response=throttled)
+        return "page"
+
+    sleeps.clear()
+    scheduler = FetchScheduler(rate=0, retries=2, base_delay=1, breaker_threshold=3, breaker_cooldown=60,
+                               clock=lambda: now[0], sleep=sleeps.append)
+    assert scheduler.fetch("http://jobs.test/b", flaky) == "page"
+    assert sleeps == [3.0, 3.0] and scheduler.stats["throttled"] == 2 and scheduler.stats["retries"] == 2
+
+    def timeout():
+        raise requests.Timeout("read timed out")
+
+    with pytest.raises(FetchError) as error:
+        scheduler.fetch("http://jobs.test/c", timeout)
+    assert error.value.attempts == 3 and error.value.reason == "Timeout: read timed out"
+    with pytest.raises(CircuitOpen):
+        scheduler.fetch("http://jobs.test/d", lambda: "page")
+    assert scheduler.to_dict()["hosts"] == {"jobs.test": "open"}
+
+    now[0] += 61
+    assert scheduler.fetch("http://jobs.test/d", lambda: "page") == "page"
+    assert scheduler.to_dict()["hosts"] == {"jobs.test": "closed"}
+
+
+def test_failed_detail_pages_are_reported(server):
+    engine = linkedin.HttpEngine(scheduler=FetchScheduler(rate=0))
+    pool = linkedin.DetailFetchPool(workers=1, engine=engine).start()
+    missing = f"{server.base_url}/jobs/view/missing-posting-1"
+    pool.submit(missing)
+    pool.submit(search_cards(server)[0]["job_url"])
+    details = pool.close()
+
+    assert details[0] == ("", "") and details[1][0].startswith("We are looking for a junior Python developer")
+    assert [(failure["job_url"], failure["attempts"]) for failure in pool.failures] == [(missing, 1)]
+    assert pool.failures[0]["error"].startswith("HTTPError: 404")
+    assert pool.worker_stats[0]["failed"] == 1 and pool.worker_stats[0]["jobs"] == 2
+
+
+def test_crashed_detail_workers_report_every_job(server):
+    urls = [card["job_url"] for card in search_cards(server)]
+    starts = []
+
+    def factory():
+        starts.append(len(starts))
+        if len(starts) > 1:
+            raise RuntimeError("Chrome failed to start\nstack trace")
+        return FixtureDriver()
+
+    class BrokenParser(linkedin.SeleniumEngine):
+        def fetch_details(self, driver, job_url, with_company=True):
+            if job_url == urls[1]:
+                raise ValueError("unexpected page layout")
+            return super().fetch_details(driver, job_url, with_company)
+
+    pool = linkedin.DetailFetchPool(workers=3, engine=BrokenParser(factory)).start()
+    for url in urls:
+        pool.submit(url)
+    details = pool.close()
+
+    assert [bool(job_description) for job_description, _ in details] == [True, False, True]
+    assert pool.failures == [{"job_url": urls[1], "error": "ValueError: unexpected page layout", "attempts": 1}]
+
+    pool = linkedin.DetailFetchPool(workers=2, engine=linkedin.SeleniumEngine(factory)).start()
+    for url in urls:
+        pool.submit(url)
+    assert pool.close() == [("", "")] * 3
+    assert [(failure["job_url"], failure["attempts"]) for failure in pool.failures] == [(url, 0) for url in urls]
+    assert pool.failures[0]["error"] == "No detail worker left: RuntimeError: Chrome failed to start"
@@ -0,0 +1,140 @@
+"""
+Watermarks for incremental ("new since last run") scrapes
+
+A watermark remembers, per search query (keyword, country and filters), the
+postings earlier runs returned and the newest `posted_date` among them.
+Incremental scrapes sort results by date, skip the postings they already
+know, and stop loading results once WATERMARK_STOP_AFTER cards in a row are
+known or older than the watermark, so only new postings are fetched. A new
+posting is only added to the watermark once its details were fetched (or
+found in a cache), so a failed detail page is tried again by the next run.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+from dedup import dedup_key
+from job_cache import CACHE_DB_PATH
+
+WATERMARK_MAX_KEYS = 5000  # Posting keys remembered per query, most recent first
+WATERMARK_STOP_AFTER = 5   # Known cards in a row before a search stops loading results
+
+
+def query_key(job_keyword, country, experience_levels, workplace_types, date_posted):
+    """Identify a search query regardless of case and filter order"""
+    return json.dumps([job_keyword.strip().lower(), country.strip().lower(),
+                       sorted(experience_levels), sorted(workplace_types), date_posted])
+
+
+class Watermark:
+    """Postings returned by earlier runs of one query, and the newest posted date among them"""
+
+    def __init__(self, keys=(), newest_posted=""):
+        self.keys = set(keys)
+        self.newest_posted = newest_posted
+        self.new_keys = []
+        self.pending = {}   # key -> posted date of new postings whose details are not in yet
+        self.known_run = 0
+        self.stats = {"new": 0, "known": 0, "stopped_early": False}
+        self._lock = threading.Lock()
+
+    def is_new(self, card):
+        """
+        True when an earlier run did not return the card's posting. Also
+        tracks the run of consecutive cards that are known or older than the
+        watermark, for should_stop().
+        """
+        key = dedup_key(card)
+        new = key not in self.keys
+        older = bool(self.newest_posted) and bool(card.get("posted_date")) \
+            and card["posted_date"] < self.newest_posted
+        self.known_run = self.known_run + 1 if not new or older else 0
+        if self.known_run >= WATERMARK_STOP_AFTER:
+            self.stats["stopped_early"] = True
+        if new:
+            self.keys.add(key)
+            with self._lock:
+                self.pending[key] = card.get("posted_date") or ""
+            self.stats["new"] += 1
+        else:
+            self.stats["known"] += 1
+        return new
+
+    def confirm(self, key):
+        """Mark a new posting's details as fetched, so save() records it (thread-safe)"""
+        with self._lock:
+            if key in self.pending:
+                self.new_keys.append((key, self.pending.pop(key)))
+
+    def should_stop(self):
+        """True once WATERMARK_STOP_AFTER cards in a row were known or older than the watermark"""
+        return self.stats["stopped_early"]
+
+
+class WatermarkStore:
+    """Watermarks of all incremental queries, stored in SQLite"""
+
+    def __init__(self, path=CACHE_DB_PATH, max_keys=WATERMARK_MAX_KEYS):
+        self.path = path
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS watermark_queries (
+                    query TEXT PRIMARY KEY,
+                    newest_posted TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS watermark_keys (
+                    query TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    seen_at REAL NOT NULL,
+                    PRIMARY KEY (query, key)
+                )
+            """)
+
+    def load(self, query):
+        with self._lock:
+            row = self._conn.execute("SELECT newest_posted FROM watermark_queries WHERE query = ?",
+                                     (query,)).fetchone()
+            keys = [key for key, in self._conn.execute("SELECT key FROM watermark_keys WHERE query = ?", (query,))]
+        return Watermark(keys, row[0] if row else "")
+
+    def save(self, query, watermark):
+        """Add the new postings `watermark` confirmed and move its date forward"""
+        now = time.time()
+        newest = max([watermark.newest_posted] + [posted for _, posted in watermark.new_keys])
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO watermark_keys VALUES (?, ?, ?)",
+                                   [(query, key, now) for key, _ in watermark.new_keys])
+            self._conn.execute("""
+                INSERT INTO watermark_queries VALUES (?, ?, ?)
+                ON CONFLICT(query) DO UPDATE SET newest_posted = excluded.newest_posted,
+                                                 updated_at = excluded.updated_at
+            """, (query, newest, now))
+            self._conn.execute("""
+                DELETE FROM watermark_keys WHERE query = ? AND key NOT IN (
+                    SELECT key FROM watermark_keys WHERE query = ? ORDER BY seen_at DESC LIMIT ?
+                )
+            """, (query, query, self.max_keys))
+
+    def close(self):
+        self._conn.close()
+
+
+_watermark_store = None
+_watermark_lock = threading.Lock()
+
+
+def get_watermark_store():
+    """Process-wide WatermarkStore, opened on first use"""
+    global _watermark_store
+    with _watermark_lock:
+        if _watermark_store is None:
+            _watermark_store = WatermarkStore()
+        return _watermark_store
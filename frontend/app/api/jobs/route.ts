@@ -0,0 +1,25 @@
+import { NextRequest, NextResponse } from "next/server";
+
+const BACKEND_URL = process.env.BACKEND_URL || "http://localhost:5000";
+
+// Forward paginated job queries (run_id, country, page, ...) to the Flask job store
+export async function GET(request: NextRequest) {
+  try {
+    const response = await fetch(`${BACKEND_URL}/jobs?${request.nextUrl.searchParams.toString()}`, {
+      method: "GET",
+    });
+    const data = await response.json();
+    return NextResponse.json(data, { status: response.status });
+  } catch (error) {
+    console.error("API error:", error);
+    return NextResponse.json(
+      {
+        status: "error",
+        timestamp: new Date().toISOString(),
+        error: error instanceof Error ? error.message : "Internal server error",
+        code: "INTERNAL_ERROR",
+      },
+      { status: 500 }
+    );
+  }
+}
@@ -1,5 +1,5 @@
 import { NextRequest, NextResponse } from "next/server";
-import { SearchParams, ScrapingResponse } from "@/lib/types";
+import { SearchParams } from "@/lib/types";
 
 const BACKEND_URL = process.env.BACKEND_URL || "http://localhost:5000";
 
@@ -32,6 +32,8 @@ export async function POST(request: NextRequest) {
         date_posted: body.date_posted || "24h",
         experience_levels: body.experience_levels || [],
         workplace_types: body.workplace_types || [],
+        fields: body.fields,
+        page_size: body.page_size,
       }),
     });
 
@@ -48,8 +50,12 @@ export async function POST(request: NextRequest) {
       );
     }
 
-    const data: ScrapingResponse = await response.json();
-    return NextResponse.json(data);
+    // Stream the body through instead of parsing and re-serializing a possibly
+    // multi-MB payload; fetch has already undone the backend's gzip/zstd encoding
+    return new NextResponse(response.body, {
+      status: response.status,
+      headers: { "Content-Type": response.headers.get("Content-Type") || "application/json" },
+    });
   } catch (error) {
     console.error("API error:", error);
     return NextResponse.json(
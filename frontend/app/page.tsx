@@ -63,7 +63,7 @@ export default function Home() {
         setTotalJobs(data.total_jobs || data.jobs.length);
 
         // Add to history
-        const newHistory = historyService.addSearch(params, data.jobs, data.total_jobs || data.jobs.length, data.timestamp);
+        const newHistory = historyService.addSearch(params, data.run_id, data.total_jobs || data.jobs.length, data.timestamp);
         setHistory((prev) => [newHistory, ...prev]);
       }
     } catch (err) {
@@ -1,7 +1,7 @@
 "use client";
 
 import { useState, useEffect } from "react";
-import { SearchHistory } from "@/lib/types";
+import { Job, SearchHistory } from "@/lib/types";
 import { historyService } from "@/lib/services/historyService";
 import { JobCard } from "./JobCard";
 import { Trash2, ChevronDown, ChevronUp } from "lucide-react";
@@ -10,6 +10,11 @@ export function HistoryTab() {
   const [historyItems, setHistoryItems] = useState<SearchHistory[]>([]);
   const [expandedId, setExpandedId] = useState<string | null>(null);
   const [isLoading, setIsLoading] = useState(true);
+  // Jobs fetched so far per history entry, page by page from the backend job store
+  const [loadedJobs, setLoadedJobs] = useState<
+    Record<string, { jobs: Job[]; page: number; total: number; expired?: boolean }>
+  >({});
+  const [loadingJobsId, setLoadingJobsId] = useState<string | null>(null);
 
   useEffect(() => {
     // Load history from localStorage
@@ -31,8 +36,38 @@ export function HistoryTab() {
     }
   };
 
-  const toggleExpanded = (id: string) => {
-    setExpandedId(expandedId === id ? null : id);
+  const loadJobs = async (item: SearchHistory) => {
+    if (!item.runId) {
+      // Older entries carry their jobs in localStorage
+      const jobs = item.jobs || [];
+      setLoadedJobs((prev) => ({ ...prev, [item.id]: { jobs, page: 1, total: jobs.length } }));
+      return;
+    }
+    const page = (loadedJobs[item.id]?.page || 0) + 1;
+    setLoadingJobsId(item.id);
+    const data = await historyService.fetchJobs(item.runId, page);
+    if (data.status === "success" && data.jobs) {
+      setLoadedJobs((prev) => ({
+        ...prev,
+        [item.id]: {
+          jobs: [...(prev[item.id]?.jobs || []), ...data.jobs!],
+          page,
+          total: data.total ?? item.totalJobs,
+        },
+      }));
+    } else if (data.code === "RUN_EXPIRED") {
+      // The backend pruned this run from its job store
+      setLoadedJobs((prev) => ({ ...prev, [item.id]: { jobs: [], page, total: 0, expired: true } }));
+    }
+    setLoadingJobsId(null);
+  };
+
+  const toggleExpanded = (item: SearchHistory) => {
+    const expanding = expandedId !== item.id;
+    setExpandedId(expanding ? item.id : null);
+    if (expanding && !loadedJobs[item.id]) {
+      loadJobs(item);
+    }
   };
 
   if (isLoading) {
@@ -136,9 +171,9 @@ export function HistoryTab() {
               </div>
 
               {/* Expand/Collapse Button */}
-              {item.jobs.length > 0 && (
+              {(item.runId || item.jobs) && item.totalJobs > 0 && (
                 <button
-                  onClick={() => toggleExpanded(item.id)}
+                  onClick={() => toggleExpanded(item)}
                   className="mt-3 w-full flex items-center justify-center gap-2 py-2 text-sm font-medium text-blue-600 dark:text-blue-400 hover:bg-blue-50 dark:hover:bg-blue-900/20 rounded transition-colors"
                 >
                   {expandedId === item.id ? (
@@ -149,7 +184,7 @@ export function HistoryTab() {
                   ) : (
                     <>
                       <ChevronDown className="w-4 h-4" />
-                      Show {item.jobs.length} Jobs
+                      Show {item.totalJobs} Jobs
                     </>
                   )}
                 </button>
@@ -157,15 +192,32 @@ export function HistoryTab() {
             </div>
 
             {/* Jobs List */}
-            {expandedId === item.id && item.jobs.length > 0 && (
+            {expandedId === item.id && (
               <div className="border-t border-zinc-200 dark:border-zinc-800 bg-zinc-50 dark:bg-zinc-800/50 p-4">
+                {loadedJobs[item.id]?.expired && (
+                  <div className="text-center text-sm text-zinc-500 dark:text-zinc-400">
+                    These results have expired and are no longer stored. Run the search again to get fresh results.
+                  </div>
+                )}
                 <div className="grid gap-3 md:grid-cols-2 lg:grid-cols-3">
-                  {item.jobs.map((job, idx) => (
+                  {(loadedJobs[item.id]?.jobs || []).map((job, idx) => (
                     <div key={idx} className="scale-95 origin-top-left">
-                      <JobCard job={job} />
+                      <JobCard job={job} runId={item.runId} />
                     </div>
                   ))}
                 </div>
+                {loadingJobsId === item.id ? (
+                  <div className="mt-3 text-center text-sm text-zinc-500 dark:text-zinc-400">Loading jobs...</div>
+                ) : (
+                  loadedJobs[item.id] && loadedJobs[item.id].jobs.length < loadedJobs[item.id].total && (
+                    <button
+                      onClick={() => loadJobs(item)}
+                      className="mt-3 w-full py-2 text-sm font-medium text-blue-600 dark:text-blue-400 hover:bg-blue-50 dark:hover:bg-blue-900/20 rounded transition-colors"
+                    >
+                      Load more ({loadedJobs[item.id].total - loadedJobs[item.id].jobs.length} left)
+                    </button>
+                  )
+                )}
               </div>
             )}
           </div>
@@ -1,13 +1,28 @@
 "use client";
 
+import { useState } from "react";
 import { Job } from "@/lib/types";
+import { historyService } from "@/lib/services/historyService";
 import { ExternalLink, Building2, MapPin, Clock } from "lucide-react";
 
 interface JobCardProps {
   job: Job;
+  // Run the job was stored under; lets a card loaded without descriptions fetch them on demand
+  runId?: string;
 }
 
-export function JobCard({ job }: JobCardProps) {
+export function JobCard({ job: initialJob, runId }: JobCardProps) {
+  const [job, setJob] = useState<Job>(initialJob);
+  const [isLoadingDetails, setIsLoadingDetails] = useState(false);
+  const canLoadDetails = runId && job.job_description === undefined;
+
+  const loadDetails = async () => {
+    setIsLoadingDetails(true);
+    const details = await historyService.fetchJobDescriptions(runId!, job.job_url);
+    setJob({ ...job, job_description: "", company_description: "", ...details });
+    setIsLoadingDetails(false);
+  };
+
   return (
     <div className="border border-zinc-200 rounded-lg p-6 hover:shadow-md transition-shadow dark:border-zinc-800 dark:hover:bg-zinc-900/50">
       <div className="flex flex-col gap-4">
@@ -59,6 +74,16 @@ export function JobCard({ job }: JobCardProps) {
           </div>
         )}
 
+        {canLoadDetails && (
+          <button
+            onClick={loadDetails}
+            disabled={isLoadingDetails}
+            className="text-sm font-medium text-blue-600 dark:text-blue-400 hover:underline self-start disabled:opacity-50"
+          >
+            {isLoadingDetails ? "Loading description..." : "Show description"}
+          </button>
+        )}
+
         {/* Job Description Preview */}
         {job.job_description && (
           <div className="text-sm text-zinc-600 dark:text-zinc-400 line-clamp-3">
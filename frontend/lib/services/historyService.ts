@@ -1,17 +1,19 @@
-import { SearchHistory, SearchParams, Job } from "@/lib/types";
+import { Job, SearchHistory, SearchParams, StoredJobsResponse } from "@/lib/types";
+import { jobIdFromUrl } from "@/lib/utils";
 
 const HISTORY_STORAGE_KEY = "job_search_history";
 const MAX_HISTORY_ITEMS = 50;
+export const HISTORY_PAGE_SIZE = 30;
 
 export const historyService = {
-  // Add a new search to history
-  addSearch(searchParams: SearchParams, jobs: Job[], totalJobs: number, timestamp: string): SearchHistory {
+  // Add a new search to history. Only the run ID is kept; its jobs stay in the backend job store
+  addSearch(searchParams: SearchParams, runId: string | undefined, totalJobs: number, timestamp: string): SearchHistory {
     const history = this.getHistory();
     
     const newEntry: SearchHistory = {
       id: Date.now().toString(),
       searchParams,
-      jobs,
+      runId,
       totalJobs,
       timestamp,
       dateAdded: new Date(),
@@ -38,9 +40,11 @@ export const historyService = {
       if (!stored) return [];
       
       const parsed = JSON.parse(stored);
-      // Convert dateAdded strings back to Date objects
-      return parsed.map((item: any) => ({
+      // Convert dateAdded strings back to Date objects. Entries saved before runs were stored in the
+      // backend have no runId and keep their job arrays, as those are the only copy of their jobs
+      return parsed.map(({ jobs, ...item }: any) => ({
         ...item,
+        ...(item.runId ? {} : { jobs }),
         dateAdded: new Date(item.dateAdded),
       }));
     } catch (error) {
@@ -79,6 +83,47 @@ export const historyService = {
     }
   },
 
+  // Fetch one page of a search's jobs from the backend job store
+  async fetchJobs(runId: string, page = 1, pageSize = HISTORY_PAGE_SIZE): Promise<StoredJobsResponse> {
+    try {
+      // Cards only; descriptions are fetched per job with fetchJobDescriptions
+      const params = new URLSearchParams({
+        run_id: runId,
+        page: String(page),
+        page_size: String(pageSize),
+        fields: "card",
+      });
+      const response = await fetch(`/api/jobs?${params.toString()}`);
+      return await response.json();
+    } catch (error) {
+      console.error("Error fetching stored jobs:", error);
+      return {
+        status: "error",
+        error: error instanceof Error ? error.message : "Unknown error occurred",
+        code: "CLIENT_ERROR",
+      };
+    }
+  },
+
+  // Fetch the job and company descriptions of one stored job
+  async fetchJobDescriptions(runId: string, jobUrl: string): Promise<Partial<Job> | null> {
+    const jobId = jobIdFromUrl(jobUrl);
+    if (!jobId) return null;
+    try {
+      const params = new URLSearchParams({
+        run_id: runId,
+        job_id: jobId,
+        fields: "job_description,company_description",
+      });
+      const response = await fetch(`/api/jobs?${params.toString()}`);
+      const data: StoredJobsResponse = await response.json();
+      return data.jobs?.[0] || null;
+    } catch (error) {
+      console.error("Error fetching job descriptions:", error);
+      return null;
+    }
+  },
+
   // Format date for display
   formatDate(date: Date): string {
     return new Intl.DateTimeFormat("en-US", {
@@ -17,6 +17,8 @@ export async function scrapeJobs(
         date_posted: params.date_posted || "24h",
         experience_levels: params.experience_levels || [],
         workplace_types: params.workplace_types || [],
+        fields: params.fields,
+        page_size: params.page_size,
       }),
     });
 
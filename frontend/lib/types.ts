@@ -1,11 +1,13 @@
 export interface Job {
   country: string;
+  countries?: string[];
   job_title: string;
   company_name: string;
   company_url: string;
   location: string;
   benefit: string;
   posted: string;
+  posted_date?: string;
   company_description: string;
   job_url: string;
   job_description: string;
@@ -17,22 +19,38 @@ export interface SearchParams {
   date_posted?: "any" | "24h" | "week" | "month";
   experience_levels?: string[];
   workplace_types?: string[];
+  fields?: "all" | "card" | string[]; // "card" leaves out the descriptions
+  page_size?: number; // Later pages come from /api/jobs?run_id=...&cursor=...
 }
 
 export interface ScrapingResponse {
   status: "success" | "error";
   timestamp: string;
+  run_id?: string;
   total_jobs?: number;
+  next_cursor?: string | null;
   parameters?: SearchParams;
   jobs?: Job[];
   error?: string;
   code?: string;
 }
 
+export interface StoredJobsResponse {
+  status: "success" | "error";
+  jobs?: Job[];
+  page?: number;
+  page_size?: number;
+  total?: number;
+  next_cursor?: string | null;
+  error?: string;
+  code?: string;
+}
+
 export interface SearchHistory {
   id: string;
   searchParams: SearchParams;
-  jobs: Job[];
+  runId?: string; // Jobs are loaded page by page from the backend job store
+  jobs?: Job[]; // Only entries saved before runs were stored in the backend keep their jobs here
   totalJobs: number;
   timestamp: string;
   dateAdded: Date;
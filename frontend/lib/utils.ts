@@ -4,3 +4,9 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs: ClassValue[]) {
   return twMerge(clsx(inputs))
 }
+
+// LinkedIn job ID in a job URL (/jobs/view/<slug>-<id> or ?currentJobId=<id>), as the backend extracts it
+export function jobIdFromUrl(jobUrl: string): string | null {
+  const match = jobUrl.match(/\/jobs\/view\/(?:[^/?#]*-)?(\d+)/) || jobUrl.match(/[?&]currentJobId=(\d+)/)
+  return match ? match[1] : null
+}